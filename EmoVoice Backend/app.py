@@ -1,38 +1,148 @@
+from services.startup_timer import StartupTimer
+
+# Time each startup phase, starting before the heavy imports
+startup_timer = StartupTimer()
+
 import os
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 import uuid
 import datetime
+import io
+import csv
 import json
+import atexit
 
 # Import services
-from services.database_service import DatabaseService
+from services.database_service import DatabaseService, resolve_date_range
 from services.emotion_detection_service import EmotionDetectionService
 from services.recording_service import RecordingService
 from services.report_service import ReportService
 from services.user_service import UserService
 from services.insight_service import InsightService
 from services.smart_home_service import SmartHomeService
+from services.analysis_worker_pool import AnalysisWorkerPool
+from services.feature_cache import FeatureCache
+from services.job_service import JobService, JobQueueFull
+from services.chart_renderer import ChartRenderer
+from services.live_emotion_service import LiveEmotionService, LiveSessionLimitReached
+from services.process_memory import read_memory
+
+startup_timer.phase('imports')
 
 # Create Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# Maximum number of files accepted by the batch analysis endpoint
+MAX_BATCH_ANALYZE_FILES = 64
+
+# Bytes read from an upload stream, or sent in a streamed export, at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Largest page size accepted by paginated list endpoints
+MAX_PAGE_SIZE = 200
+
+# Seconds clients may cache a report chart before revalidating it
+REPORT_CHART_MAX_AGE = 7 * 24 * 60 * 60
+
+# Largest body accepted per live analysis frames request
+MAX_LIVE_FRAME_BYTES = 256 * 1024
+
 # Initialize services
-db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'emovoice.db')
+db_path = os.environ.get('EMOVOICE_DB_PATH') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'emovoice.db'
+)
 db_service = DatabaseService(db_path)
-emotion_service = EmotionDetectionService()
-recording_service = RecordingService(db_service, emotion_service)
-report_service = ReportService(db_service)
+atexit.register(db_service.close)
+startup_timer.phase('database')
+
+# Content-addressed cache of extracted audio features
+feature_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'feature_cache')
+feature_cache = FeatureCache(
+    feature_cache_dir,
+    max_memory_bytes=int(os.environ.get('EMOVOICE_FEATURE_CACHE_MEMORY_MB', 64)) * 1024 * 1024,
+    max_disk_bytes=int(os.environ.get('EMOVOICE_FEATURE_CACHE_DISK_MB', 512)) * 1024 * 1024
+)
+# The model loads on first inference unless EMOVOICE_PRELOAD_MODEL is set;
+# EMOVOICE_MODEL_MMAP=r memory-maps its arrays read-only
+model_mmap_mode = os.environ.get('EMOVOICE_MODEL_MMAP') or None
+emotion_service = EmotionDetectionService(feature_cache=feature_cache, mmap_mode=model_mmap_mode)
+
+# Process pool for upload analysis (EMOVOICE_ANALYSIS_WORKERS=0 analyzes inline)
+analysis_pool = None
+analysis_workers = int(os.environ.get('EMOVOICE_ANALYSIS_WORKERS', 2))
+if analysis_workers > 0:
+    analysis_pool = AnalysisWorkerPool(
+        processes=analysis_workers,
+        max_queue_depth=int(os.environ.get('EMOVOICE_ANALYSIS_QUEUE_DEPTH', 8)),
+        job_timeout=int(os.environ.get('EMOVOICE_ANALYSIS_TIMEOUT', 60)),
+        max_jobs_per_worker=int(os.environ.get('EMOVOICE_ANALYSIS_JOBS_PER_WORKER', 50)),
+        retry_after=int(os.environ.get('EMOVOICE_ANALYSIS_RETRY_AFTER', 5)),
+        feature_cache_dir=feature_cache_dir,
+        feature_cache_disk_bytes=feature_cache.max_disk_bytes,
+        model_mmap_mode=model_mmap_mode
+    )
+    atexit.register(analysis_pool.close)
+
+recording_service = RecordingService(db_service, emotion_service, analysis_pool)
+
+# Report charts are rendered in a thread pool and memoized by their input data
+chart_renderer = ChartRenderer(
+    max_workers=int(os.environ.get('EMOVOICE_CHART_WORKERS', 2)),
+    cache_size=int(os.environ.get('EMOVOICE_CHART_CACHE_SIZE', 128))
+)
+atexit.register(chart_renderer.shutdown)
+report_service = ReportService(db_service, chart_renderer)
 user_service = UserService(db_service)
 insight_service = InsightService(db_service)
 smart_home_service = SmartHomeService(db_service)
+job_service = JobService(
+    db_service,
+    recording_service,
+    insight_service,
+    smart_home_service,
+    max_workers=int(os.environ.get('EMOVOICE_JOB_WORKERS', 2)),
+    max_pending=int(os.environ.get('EMOVOICE_JOB_QUEUE_DEPTH', 32)),
+    retry_after=int(os.environ.get('EMOVOICE_ANALYSIS_RETRY_AFTER', 5))
+)
+atexit.register(job_service.shutdown)
+
+# Sliding-window analysis of live audio sessions
+live_emotion_service = LiveEmotionService(
+    emotion_service,
+    max_sessions=int(os.environ.get('EMOVOICE_LIVE_MAX_SESSIONS', 32)),
+    session_ttl=int(os.environ.get('EMOVOICE_LIVE_SESSION_TTL', 60)),
+    update_interval_ms=int(os.environ.get('EMOVOICE_LIVE_UPDATE_MS', 500))
+)
+
+# Process uploads in the background unless the client asks otherwise
+ASYNC_UPLOADS_DEFAULT = os.environ.get('EMOVOICE_ASYNC_UPLOADS', 'false').lower() == 'true'
+
+startup_timer.phase('services')
 
 # Ensure database is initialized
 try:
     db_service.init_database()
+    
+    # Jobs queued by a previous run of the server will never finish
+    interrupted_jobs = job_service.fail_interrupted_jobs()
+    if interrupted_jobs:
+        print(f"Marked {interrupted_jobs} interrupted background jobs as failed")
 except Exception as e:
     print(f"Error initializing database: {e}")
+startup_timer.phase('migrations')
+
+if os.environ.get('EMOVOICE_PRELOAD_MODEL', 'false').lower() == 'true':
+    emotion_service.load_model()
+    startup_timer.phase('model')
+
+print(startup_timer.summary())
+
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Hand the request thread's database connection back to the service"""
+    db_service.release_connection()
 
 # Routes
 @app.route('/api/health', methods=['GET'])
@@ -40,7 +150,17 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'ok',
-        'timestamp': datetime.datetime.now().isoformat()
+        'timestamp': datetime.datetime.now().isoformat(),
+        'startup': startup_timer.report()
+    })
+
+@app.route('/api/health/memory', methods=['GET'])
+def memory_check():
+    """Shared and private memory of the worker process answering the request"""
+    return jsonify({
+        'status': 'ok',
+        'pid': os.getpid(),
+        'memory': read_memory()
     })
 
 # User routes
@@ -113,9 +233,80 @@ def upload_recording():
         }), 400
     
     audio_file = request.files['audio']
-    audio_data = audio_file.read()
     
-    result = recording_service.save_recording(user_id, audio_data, audio_file.filename)
+    return _process_upload(user_id, iter_chunks(audio_file.stream), audio_file.filename)
+
+@app.route('/api/recordings/stream', methods=['POST'])
+def stream_recording():
+    """Upload a recording as a raw (optionally chunked) WAV request body"""
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({
+            'status': 'error',
+            'message': 'User ID is required'
+        }), 400
+    
+    # Analyzed in the worker pool after the upload unless incremental=true
+    return _process_upload(user_id, iter_chunks(request.stream), request.args.get('filename'))
+
+def iter_chunks(stream, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Yield a stream in fixed-size chunks so uploads are never fully buffered"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+def _flag(name, default):
+    """Read a boolean flag from the query string or form"""
+    value = request.values.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+def _process_upload(user_id, audio_chunks, filename):
+    """Save an uploaded recording and run the post-upload pipeline"""
+    # Async mode: persist the bytes, then finish the pipeline in the background
+    if _flag('async', ASYNC_UPLOADS_DEFAULT):
+        try:
+            stored = job_service.submit_upload(user_id, audio_chunks, filename)
+        except JobQueueFull as e:
+            response = jsonify({
+                'status': 'error',
+                'message': str(e),
+                'retry_after': e.retry_after
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        
+        if stored.get('status') != 'success':
+            return jsonify(stored), 500
+        
+        job = stored['job']
+        response = jsonify({
+            'status': 'accepted',
+            'job_id': job['id'],
+            'recording_id': stored['recording_id'],
+            'status_url': f"/api/jobs/{job['id']}"
+        })
+        response.status_code = 202
+        response.headers['Location'] = f"/api/jobs/{job['id']}"
+        return response
+    
+    result = recording_service.save_recording(
+        user_id,
+        audio_chunks,
+        filename,
+        incremental=_flag('incremental', False)
+    )
+    
+    # Analysis workers are saturated or the job timed out, tell the client when to retry
+    if 'retry_after' in result:
+        response = jsonify(result)
+        response.status_code = 503
+        response.headers['Retry-After'] = str(result['retry_after'])
+        return response
     
     # Generate insights based on the new recording
     if result.get('status') == 'success' and 'recording_id' in result:
@@ -127,18 +318,61 @@ def upload_recording():
     
     return jsonify(result)
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status of a background job"""
+    job = job_service.get_job(job_id)
+    
+    if not job:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job not found'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'job': job
+    })
+
 @app.route('/api/users/<user_id>/recordings', methods=['GET'])
 def get_user_recordings(user_id):
     """Get recordings for a user"""
-    limit = request.args.get('limit', 50, type=int)
+    limit, cursor = _page_args(50)
     
-    recordings = db_service.get_recordings(user_id, limit)
+    try:
+        recordings, next_cursor = db_service.page_recordings(user_id, limit, cursor)
+    except ValueError as e:
+        return _bad_request(e)
     
     return jsonify({
         'status': 'success',
-        'recordings': recordings
+        'recordings': recordings,
+        'next_cursor': next_cursor
     })
 
+def _page_args(default_limit):
+    """Read the limit (clamped to MAX_PAGE_SIZE) and cursor of a paginated request"""
+    limit = request.args.get('limit', default_limit, type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE)), request.args.get('cursor')
+
+def _range_args(default_time_range):
+    """
+    Read the date range of a request: start_date/end_date (YYYY-MM-DD, end
+    exclusive) when given, otherwise a named time_range; resolved to
+    [start, end) dates, raising ValueError when malformed
+    """
+    start_date = request.args.get('start_date')
+    if start_date:
+        return resolve_date_range((start_date, request.args.get('end_date')))
+    return resolve_date_range(request.args.get('time_range', default_time_range))
+
+def _bad_request(error):
+    """Response for a malformed query parameter such as a page cursor or date range"""
+    return jsonify({
+        'status': 'error',
+        'message': str(error)
+    }), 400
+
 @app.route('/api/recordings/<recording_id>', methods=['GET'])
 def get_recording(recording_id):
     """Get a specific recording"""
@@ -172,13 +406,63 @@ def get_recording_audio(recording_id):
 @app.route('/api/users/<user_id>/emotions', methods=['GET'])
 def get_user_emotions(user_id):
     """Get emotions for a user"""
-    time_range = request.args.get('time_range', 'week')
+    limit, cursor = _page_args(100)
     
-    emotions = db_service.get_emotions(user_id, time_range)
+    try:
+        date_range = _range_args('week')
+        emotions, next_cursor = db_service.page_emotions(user_id, date_range, limit, cursor)
+    except ValueError as e:
+        return _bad_request(e)
     
     return jsonify({
         'status': 'success',
-        'emotions': emotions
+        'emotions': emotions,
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/users/<user_id>/emotions/export', methods=['GET'])
+def export_user_emotions(user_id):
+    """Stream a user's emotion timeline as CSV"""
+    try:
+        start, end = _range_args('year')
+    except ValueError as e:
+        return _bad_request(e)
+    
+    columns = ('recorded_at', 'recording_id', 'primary_emotion', 'primary_confidence',
+               'secondary_emotion', 'secondary_confidence', 'intensity')
+    rows = db_service.iter_emotion_timeline(user_id, (start, end), columns=columns)
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            # Send the buffer in chunks so the export runs in constant memory
+            if buffer.tell() >= UPLOAD_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+    
+    # Keep the request context, and its database connection, until the export is sent
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename=emotions_{user_id}_{start}_{end}.csv'
+    return response
+
+@app.route('/api/users/<user_id>/emotions/summary', methods=['GET'])
+def get_user_emotion_summary(user_id):
+    """Get emotion counts and averages for a date range, from the daily rollup"""
+    try:
+        start, end = _range_args('week')
+    except ValueError as e:
+        return _bad_request(e)
+    
+    summary = report_service.get_emotion_summary(user_id, start_date=start, end_date=end)
+    
+    return jsonify({
+        'status': 'success',
+        'summary': summary
     })
 
 @app.route('/api/emotions/analyze', methods=['POST'])
@@ -200,6 +484,114 @@ def analyze_emotion():
         'emotion': result
     })
 
+@app.route('/api/emotions/analyze/batch', methods=['POST'])
+def analyze_emotion_batch():
+    """Analyze emotions for several audio files in one request"""
+    audio_files = request.files.getlist('audio')
+    if not audio_files:
+        return jsonify({
+            'status': 'error',
+            'message': 'No audio files provided'
+        }), 400
+
+    if len(audio_files) > MAX_BATCH_ANALYZE_FILES:
+        return jsonify({
+            'status': 'error',
+            'message': f'At most {MAX_BATCH_ANALYZE_FILES} files can be analyzed per request'
+        }), 400
+
+    results = emotion_service.analyze_batch([f.read() for f in audio_files])
+    for audio_file, item in zip(audio_files, results):
+        item['filename'] = audio_file.filename
+
+    return jsonify({
+        'status': 'success',
+        'results': results
+    })
+
+# Live emotion routes
+@app.route('/api/emotions/live', methods=['POST'])
+def create_live_session():
+    """Start a live emotion analysis session"""
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        result = live_emotion_service.create_session(
+            user_id=data.get('user_id'),
+            sample_rate=data.get('sample_rate'),
+            channels=data.get('channels', 1),
+            encoding=data.get('encoding', 'pcm_s16le')
+        )
+    except LiveSessionLimitReached as e:
+        response = jsonify({
+            'status': 'error',
+            'message': str(e),
+            'retry_after': e.retry_after
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    
+    if result.get('status') != 'success':
+        return jsonify(result), 400
+    
+    response = jsonify(result)
+    response.status_code = 201
+    response.headers['Location'] = f"/api/emotions/live/{result['session_id']}"
+    return response
+
+@app.route('/api/emotions/live/<session_id>/frames', methods=['POST'])
+def push_live_frames(session_id):
+    """Send audio frames to a live session and get any interim emotion"""
+    if request.content_length is not None and request.content_length > MAX_LIVE_FRAME_BYTES:
+        return jsonify({
+            'status': 'error',
+            'message': f'At most {MAX_LIVE_FRAME_BYTES} bytes can be sent per request'
+        }), 413
+    
+    data = request.stream.read(MAX_LIVE_FRAME_BYTES + 1)
+    if len(data) > MAX_LIVE_FRAME_BYTES:
+        return jsonify({
+            'status': 'error',
+            'message': f'At most {MAX_LIVE_FRAME_BYTES} bytes can be sent per request'
+        }), 413
+    
+    result = live_emotion_service.push_frames(session_id, data)
+    if result is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Live session not found'
+        }), 404
+    
+    if result.get('status') != 'success':
+        return jsonify(result), 400
+    
+    return jsonify(result)
+
+@app.route('/api/emotions/live/<session_id>', methods=['GET'])
+def get_live_session(session_id):
+    """Get the latest interim emotion of a live session"""
+    result = live_emotion_service.get_session(session_id)
+    if result is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Live session not found'
+        }), 404
+    
+    return jsonify(result)
+
+@app.route('/api/emotions/live/<session_id>', methods=['DELETE'])
+def close_live_session(session_id):
+    """End a live session and get the emotion of its final window"""
+    result = live_emotion_service.close_session(session_id)
+    if result is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Live session not found'
+        }), 404
+    
+    return jsonify(result)
+
 # Report routes
 @app.route('/api/reports', methods=['POST'])
 def create_report():
@@ -216,7 +608,9 @@ def create_report():
         data['user_id'],
         data.get('time_range', 'week'),
         data.get('title'),
-        data.get('description')
+        data.get('description'),
+        start_date=data.get('start_date'),
+        end_date=data.get('end_date')
     )
     
     return jsonify(result)
@@ -224,11 +618,17 @@ def create_report():
 @app.route('/api/users/<user_id>/reports', methods=['GET'])
 def get_user_reports(user_id):
     """Get reports for a user"""
-    reports = db_service.get_reports(user_id)
+    limit, cursor = _page_args(20)
+    
+    try:
+        reports, next_cursor = db_service.page_reports(user_id, limit, cursor)
+    except ValueError as e:
+        return _bad_request(e)
     
     return jsonify({
         'status': 'success',
-        'reports': reports
+        'reports': reports,
+        'next_cursor': next_cursor
     })
 
 @app.route('/api/reports/<report_id>', methods=['GET'])
@@ -247,6 +647,23 @@ def get_report(report_id):
         'report': report
     })
 
+@app.route('/api/reports/<report_id>/charts/<name>', methods=['GET'])
+def get_report_chart(report_id, name):
+    """Get a report chart as a PNG"""
+    path, digest = report_service.get_chart(report_id, name)
+    
+    if not path:
+        return jsonify({
+            'status': 'error',
+            'message': 'Chart not found'
+        }), 404
+    
+    # Charts never change once written, so clients may cache them and revalidate by ETag
+    response = send_file(path, mimetype='image/png', conditional=True, etag=digest, max_age=REPORT_CHART_MAX_AGE)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
 @app.route('/api/reports/<report_id>/share', methods=['POST'])
 def share_report(report_id):
     """Share a report"""
@@ -278,13 +695,18 @@ def get_shared_report(access_token):
 def get_user_insights(user_id):
     """Get insights for a user"""
     category = request.args.get('category')
-    limit = request.args.get('limit', 10, type=int)
+    unread_only = request.args.get('unread_only', 'false').lower() in ('1', 'true', 'yes')
+    limit, cursor = _page_args(10)
     
-    insights = insight_service.get_insights(user_id, category, limit)
+    try:
+        insights, next_cursor = insight_service.page_insights(user_id, unread_only, category, limit, cursor)
+    except ValueError as e:
+        return _bad_request(e)
     
     return jsonify({
         'status': 'success',
-        'insights': insights
+        'insights': insights,
+        'next_cursor': next_cursor
     })
 
 @app.route('/api/insights/<insight_id>/read', methods=['POST'])
@@ -0,0 +1,78 @@
+"""
+Benchmark classification with scikit-learn's RandomForestClassifier against
+services.forest_evaluator.FlatForest. Parity between the two is covered by
+tests/test_forest_evaluator.py.
+
+Uses models/emotion_model.joblib when it exists, otherwise a forest trained
+like train_model.py on random data of the same width. Run from the backend
+directory:
+
+    python benchmarks/forest_evaluator.py [rows ...]
+"""
+import gc
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.forest_evaluator import FlatForest
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'emotion_model.joblib')
+DEFAULT_SIZES = [1, 8, 64]
+REPEATS = 50
+
+# Shape of the synthetic training set: the 13 x 174 mfcc_matrix features, 7 emotions
+N_FEATURES = 2262
+N_CLASSES = 7
+N_SAMPLES = 1000
+
+def load_forest():
+    """
+    The trained model if there is one, otherwise a forest fitted on random data
+    """
+    if os.path.exists(MODEL_PATH):
+        import joblib
+        return joblib.load(MODEL_PATH), 'models/emotion_model.joblib'
+    
+    from sklearn.ensemble import RandomForestClassifier
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(N_SAMPLES, N_FEATURES))
+    y = rng.integers(0, N_CLASSES, N_SAMPLES)
+    forest = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1).fit(X, y)
+    return forest, f'synthetic forest ({N_SAMPLES} x {N_FEATURES}, {N_CLASSES} classes)'
+
+def best_time(function, X):
+    """
+    Best wall time of REPEATS calls with the garbage collector paused, in milliseconds
+    """
+    times = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            function(X)
+            times.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return min(times) * 1000
+
+def main(sizes):
+    forest, source = load_forest()
+    flat = FlatForest.from_sklearn(forest)
+    print(f'{source}: {len(forest.estimators_)} trees, {len(flat.feature)} nodes, depth {flat.depth}')
+    
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(max(sizes), forest.n_features_in_))
+    
+    print(f"{'rows':>6} {'sklearn ms':>11} {'flat ms':>9} {'speedup':>8}")
+    for n in sizes:
+        sklearn_ms = best_time(forest.predict_proba, X[:n])
+        flat_ms = best_time(flat.predict_proba, X[:n])
+        print(f'{n:>6} {sklearn_ms:>11.3f} {flat_ms:>9.3f} {sklearn_ms / flat_ms:>7.1f}x')
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
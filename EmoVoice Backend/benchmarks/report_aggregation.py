@@ -0,0 +1,163 @@
+"""
+Benchmark report aggregation: the per-row Python loops reports and insights
+used to run against what they run now, which is counts and averages from the
+daily rollup plus the services.emotion_aggregation sequence functions over
+the recordings in order.
+
+Run from the backend directory:
+
+    python benchmarks/report_aggregation.py [rows ...]
+"""
+import gc
+import os
+import sys
+import time
+import random
+import datetime
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import emotion_aggregation
+from services.insight_service import DAY_PERIODS
+
+EMOTIONS = ['Anger', 'Disgust', 'Fear', 'Joy', 'Sadness', 'Surprise', 'Calm']
+DEFAULT_SIZES = [1000, 10000, 100000]
+REPEATS = 5
+
+def make_rows(n, seed=0):
+    """
+    Synthetic timeline rows (recorded_at, primary_emotion, intensity,
+    primary_confidence, recording_id), oldest first
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2024, 1, 1)
+    rows = []
+    for i in range(n):
+        timestamp = start + datetime.timedelta(minutes=17 * i)
+        # Emotions persist for a few recordings so streaks are realistic
+        emotion = rows[-1][1] if rows and rng.random() < 0.6 else rng.choice(EMOTIONS)
+        rows.append((timestamp.strftime('%Y-%m-%d %H:%M:%S'), emotion, rng.random(), rng.random(), str(i)))
+    return rows
+
+def loop_aggregate(rows):
+    """
+    Per-row Python implementation the services used before vectorization
+    """
+    timeline = [{
+        'timestamp': row[0],
+        'emotion': row[1],
+        'intensity': row[2],
+        'confidence': row[3],
+        'recording_id': row[4]
+    } for row in rows]
+    
+    emotion_counts = Counter()
+    intensities = {}
+    confidences = {}
+    for entry in timeline:
+        emotion_counts[entry['emotion']] += 1
+        intensities.setdefault(entry['emotion'], []).append(entry['intensity'])
+        confidences.setdefault(entry['emotion'], []).append(entry['confidence'])
+    avg_intensities = {e: sum(vals) / len(vals) for e, vals in intensities.items()}
+    avg_confidences = {e: sum(vals) / len(vals) for e, vals in confidences.items()}
+    
+    consecutive_count = 1
+    current_emotion = timeline[0]['emotion']
+    max_consecutive = 1
+    max_emotion = current_emotion
+    for i in range(1, len(timeline)):
+        if timeline[i]['emotion'] == current_emotion:
+            consecutive_count += 1
+            if consecutive_count > max_consecutive:
+                max_consecutive = consecutive_count
+                max_emotion = current_emotion
+        else:
+            consecutive_count = 1
+            current_emotion = timeline[i]['emotion']
+    
+    pattern = None
+    for i in range(len(timeline) - 2):
+        if (timeline[i]['emotion'] == timeline[i + 2]['emotion'] and
+                timeline[i]['emotion'] != timeline[i + 1]['emotion']):
+            pattern = (timeline[i]['emotion'], timeline[i + 1]['emotion'])
+            break
+    
+    hour_emotions = {}
+    for entry in timeline:
+        hour = datetime.datetime.fromisoformat(entry['timestamp']).hour
+        hour_emotions.setdefault(hour, []).append(entry['emotion'])
+    by_period = {}
+    for period, hours in DAY_PERIODS:
+        period_emotions = []
+        for hour in hours:
+            period_emotions.extend(hour_emotions.get(hour, []))
+        if period_emotions:
+            by_period[period] = Counter(period_emotions).most_common(1)[0][0]
+    
+    return emotion_counts, avg_intensities, avg_confidences, (max_emotion, max_consecutive), pattern, by_period
+
+def make_rollup(rows):
+    """
+    The daily rollup rows save_emotion would have maintained for rows
+    """
+    rollup = {}
+    for recorded_at, emotion, intensity, confidence, _ in rows:
+        day = rollup.setdefault((recorded_at[:10], emotion), {
+            'day': recorded_at[:10], 'emotion': emotion, 'count': 0, 'intensity_sum': 0.0, 'confidence_sum': 0.0
+        })
+        day['count'] += 1
+        day['intensity_sum'] += intensity
+        day['confidence_sum'] += confidence
+    return list(rollup.values())
+
+def service_aggregate(rows, rollup):
+    """
+    The same results the way ReportService and InsightService compute them
+    """
+    counts, avg_intensities, avg_confidences = emotion_aggregation.summarize_rollup(rollup)
+    
+    timeline = [{
+        'timestamp': row[0],
+        'emotion': row[1],
+        'intensity': row[2],
+        'confidence': row[3],
+        'recording_id': row[4]
+    } for row in rows]
+    emotions = [entry['emotion'] for entry in timeline]
+    timestamps = [entry['timestamp'] for entry in timeline]
+    
+    streak = emotion_aggregation.longest_streak(emotions)
+    pattern = emotion_aggregation.find_return_pattern(emotions)
+    by_period = emotion_aggregation.dominant_by_period(timestamps, emotions, DAY_PERIODS)
+    
+    return counts, avg_intensities, avg_confidences, streak, pattern, by_period
+
+def best_time(function, *args):
+    """
+    Best wall time of REPEATS runs with the garbage collector paused, in milliseconds
+    """
+    times = []
+    for _ in range(REPEATS):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            function(*args)
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return min(times) * 1000
+
+def main(sizes):
+    print(f"{'rows':>8} {'loop ms':>10} {'service ms':>11} {'speedup':>8}")
+    for n in sizes:
+        rows = make_rows(n)
+        rollup = make_rollup(rows)
+        
+        loop_ms = best_time(loop_aggregate, rows)
+        service_ms = best_time(service_aggregate, rows, rollup)
+        print(f'{n:>8} {loop_ms:>10.1f} {service_ms:>11.1f} {loop_ms / service_ms:>7.1f}x')
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
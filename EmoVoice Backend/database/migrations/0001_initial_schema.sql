@@ -83,4 +83,4 @@ CREATE TABLE IF NOT EXISTS smart_home_integrations (
     settings TEXT, -- JSON string of integration settings
     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id)
-);
\ No newline at end of file
+);
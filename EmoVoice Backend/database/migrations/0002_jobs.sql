@@ -0,0 +1,15 @@
+-- Background jobs table
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    recording_id TEXT,
+    job_type TEXT NOT NULL, -- 'recording_pipeline'
+    status TEXT DEFAULT 'queued', -- 'queued', 'running', 'succeeded', 'failed'
+    stage TEXT, -- current pipeline stage
+    result TEXT, -- JSON string of the job result
+    error TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (recording_id) REFERENCES recordings(id)
+);
@@ -0,0 +1,7 @@
+-- Indexes for hot queries (checked by DatabaseService.verify_query_plans)
+CREATE INDEX IF NOT EXISTS idx_recordings_user_created ON recordings (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_emotions_recording ON emotions (recording_id);
+CREATE INDEX IF NOT EXISTS idx_reports_user_created ON reports (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_report_shares_access_token ON report_shares (access_token);
+CREATE INDEX IF NOT EXISTS idx_insights_user_read_created ON insights (user_id, is_read, created_at);
+CREATE INDEX IF NOT EXISTS idx_smart_home_integrations_user ON smart_home_integrations (user_id);
@@ -0,0 +1,20 @@
+-- Per-user daily emotion totals, maintained by DatabaseService.save_emotion
+-- (days are the UTC date of the recording, like recordings.created_at)
+CREATE TABLE IF NOT EXISTS emotion_daily_rollup (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL, -- YYYY-MM-DD
+    emotion TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    intensity_sum REAL NOT NULL DEFAULT 0,
+    confidence_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, emotion)
+) WITHOUT ROWID;
+
+-- Backfill from existing emotions
+INSERT OR REPLACE INTO emotion_daily_rollup
+(user_id, day, emotion, count, intensity_sum, confidence_sum)
+SELECT r.user_id, date(r.created_at), e.primary_emotion,
+       COUNT(*), TOTAL(e.intensity), TOTAL(e.primary_confidence)
+FROM emotions e
+JOIN recordings r ON e.recording_id = r.id
+GROUP BY r.user_id, date(r.created_at), e.primary_emotion;
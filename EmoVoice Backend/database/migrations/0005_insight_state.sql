@@ -0,0 +1,9 @@
+-- Incremental insight engine state per user (JSON): decayed emotion counts,
+-- hour-of-day histograms, the last few timeline entries and the
+-- fingerprints of insights already emitted
+CREATE TABLE IF NOT EXISTS insight_state (
+    user_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
@@ -0,0 +1,11 @@
+-- Keyset pagination orders by (created_at, id); extend the per-user
+-- indexes with id so pages are read straight from the index
+DROP INDEX IF EXISTS idx_recordings_user_created;
+CREATE INDEX IF NOT EXISTS idx_recordings_user_created_id ON recordings (user_id, created_at, id);
+
+DROP INDEX IF EXISTS idx_reports_user_created;
+CREATE INDEX IF NOT EXISTS idx_reports_user_created_id ON reports (user_id, created_at, id);
+
+DROP INDEX IF EXISTS idx_insights_user_read_created;
+CREATE INDEX IF NOT EXISTS idx_insights_user_read_created_id ON insights (user_id, is_read, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_insights_user_created_id ON insights (user_id, created_at, id);
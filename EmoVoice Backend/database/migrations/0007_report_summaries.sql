@@ -0,0 +1,14 @@
+-- Report listings read only summary columns; store the top emotion
+-- alongside them so lists never parse the data JSON
+ALTER TABLE reports ADD COLUMN top_emotion TEXT;
+
+UPDATE reports SET top_emotion = (
+    SELECT key FROM json_each(reports.data, '$.emotion_counts')
+    ORDER BY value DESC, key
+    LIMIT 1
+)
+WHERE json_valid(data);
+
+-- Covering index for the report list, so pages skip the table rows
+DROP INDEX IF EXISTS idx_reports_user_created_id;
+CREATE INDEX IF NOT EXISTS idx_reports_user_summary ON reports (user_id, created_at, id, title, time_range, top_emotion);
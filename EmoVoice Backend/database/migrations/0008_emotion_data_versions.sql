@@ -0,0 +1,6 @@
+-- Per-user counter bumped whenever a user's emotion data changes, so
+-- cached aggregates can be keyed by it; a missing row means version 0
+CREATE TABLE IF NOT EXISTS emotion_data_versions (
+    user_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
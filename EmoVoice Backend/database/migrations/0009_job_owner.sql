@@ -0,0 +1,5 @@
+-- Process that queued each job, so jobs left unfinished by a process that
+-- has exited can be told apart from jobs another worker is still running
+ALTER TABLE jobs ADD COLUMN owner_pid INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_unfinished ON jobs (status) WHERE status IN ('queued', 'running');
@@ -0,0 +1,22 @@
+import os
+
+bind = os.environ.get('EMOVOICE_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('EMOVOICE_SERVER_WORKERS', '4'))
+threads = int(os.environ.get('EMOVOICE_SERVER_THREADS', '4'))
+timeout = int(os.environ.get('EMOVOICE_SERVER_TIMEOUT', '120'))
+
+# Load the app, model and librosa once in the master; workers share them copy-on-write
+preload_app = True
+
+def post_worker_init(worker):
+    """
+    Log each worker's shared and private memory once it is ready
+    """
+    from services.process_memory import read_memory
+    
+    memory = read_memory()
+    if memory is not None:
+        worker.log.info(
+            "Worker %s memory: rss %d kB, shared %d kB, private %d kB",
+            worker.pid, memory['rss_kb'], memory['shared_kb'], memory['private_kb']
+        )
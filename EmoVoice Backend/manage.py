@@ -0,0 +1,75 @@
+import os
+import argparse
+
+from services.database_service import DatabaseService
+from services.process_memory import worker_memory
+
+DB_PATH = os.environ.get('EMOVOICE_DB_PATH') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'emovoice.db'
+)
+
+def migrate(db_service, args):
+    """
+    Apply pending schema migrations
+    """
+    applied = db_service.init_database(dry_run=args.dry_run)
+    
+    if not applied:
+        print("Database is already at the latest schema version")
+    elif args.dry_run:
+        print("Pending migrations:")
+        for version, name in applied:
+            print(f"  {version:04d}_{name}")
+
+def rebuild_rollup(db_service, args):
+    """
+    Recompute the daily emotion rollup from the emotions table
+    """
+    db_service.init_database()
+    rows = db_service.rebuild_emotion_rollup(args.user)
+    
+    target = f"user {args.user}" if args.user else "all users"
+    print(f"Rebuilt {rows} emotion rollup rows for {target}")
+
+def memory(db_service, args):
+    """
+    Print shared and private memory of a server master and its workers
+    """
+    report = worker_memory(args.pid)
+    if not report:
+        print(f"No memory information for process {args.pid}")
+        return
+    
+    print(f"{'PID':>8} {'ROLE':<7} {'RSS kB':>10} {'SHARED kB':>10} {'PRIVATE kB':>10} {'PSS kB':>10}")
+    for row in report:
+        print(f"{row['pid']:>8} {row['role']:<7} {row['rss_kb']:>10} {row['shared_kb']:>10} "
+              f"{row['private_kb']:>10} {row['pss_kb']:>10}")
+    
+    print(f"Total PSS: {sum(row['pss_kb'] for row in report)} kB")
+
+def main():
+    parser = argparse.ArgumentParser(description='EmoVoice maintenance commands')
+    parser.add_argument('--db', default=DB_PATH, help='Path to the SQLite database')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    migrate_parser = subparsers.add_parser('migrate', help='Apply pending schema migrations')
+    migrate_parser.add_argument('--dry-run', action='store_true', help='List pending migrations without applying them')
+    migrate_parser.set_defaults(handler=migrate)
+    
+    rollup_parser = subparsers.add_parser('rebuild-rollup', help='Recompute the daily emotion rollup')
+    rollup_parser.add_argument('--user', help='Only rebuild rows for this user ID')
+    rollup_parser.set_defaults(handler=rebuild_rollup)
+    
+    memory_parser = subparsers.add_parser('memory', help='Report per-worker shared and private memory')
+    memory_parser.add_argument('pid', type=int, help='PID of the gunicorn master')
+    memory_parser.set_defaults(handler=memory)
+    
+    args = parser.parse_args()
+    db_service = DatabaseService(args.db)
+    try:
+        args.handler(db_service, args)
+    finally:
+        db_service.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import os
+import uuid
+import signal
+import threading
+import multiprocessing
+
+# Per-process emotion service, created once when a worker starts
+_worker_emotion_service = None
+
+# Queue on which workers report (job id, pid) as they start a job
+_worker_started_jobs = None
+
+def _init_worker(started_jobs, feature_cache_dir=None, model_mmap_mode=None, feature_cache_disk_bytes=None):
+    """
+    Load the emotion detection service once per worker process
+    """
+    global _worker_emotion_service, _worker_started_jobs
+    _worker_started_jobs = started_jobs
+    from services.emotion_detection_service import EmotionDetectionService
+    from services.feature_cache import FeatureCache, DEFAULT_MAX_DISK_BYTES
+    
+    feature_cache = None
+    if feature_cache_dir:
+        feature_cache = FeatureCache(feature_cache_dir, max_disk_bytes=feature_cache_disk_bytes or DEFAULT_MAX_DISK_BYTES)
+    _worker_emotion_service = EmotionDetectionService(feature_cache=feature_cache, mmap_mode=model_mmap_mode)
+
+def _analyze_in_worker(job_id, audio_path):
+    """
+    Run emotion analysis for one file inside a worker process
+    """
+    _worker_started_jobs.put((job_id, os.getpid()))
+    return _worker_emotion_service.analyze_audio(audio_path)
+
+class AnalysisPoolSaturated(Exception):
+    """Raised when the pool already holds its maximum number of jobs"""
+    def __init__(self, retry_after):
+        super().__init__('Analysis workers are busy')
+        self.retry_after = retry_after
+
+class AnalysisJobTimeout(Exception):
+    """Raised when an analysis job does not finish within the job timeout"""
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AnalysisWorkerPool:
+    def __init__(self, processes=2, max_queue_depth=8, job_timeout=60,
+                 max_jobs_per_worker=50, retry_after=5, start_method='spawn',
+                 feature_cache_dir=None, model_mmap_mode=None, feature_cache_disk_bytes=None):
+        """
+        Initialize a process pool for librosa feature extraction and inference.
+        
+        At most processes + max_queue_depth jobs are in flight; further
+        submissions raise AnalysisPoolSaturated. Workers are replaced after
+        max_jobs_per_worker jobs to release memory held by librosa. Workers
+        share the on-disk layer of the feature cache in feature_cache_dir,
+        bounded by feature_cache_disk_bytes, and load the model with
+        model_mmap_mode.
+        """
+        self.processes = processes
+        self.max_queue_depth = max_queue_depth
+        self.job_timeout = job_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.retry_after = retry_after
+        self.start_method = start_method
+        self.feature_cache_dir = feature_cache_dir
+        self.feature_cache_disk_bytes = feature_cache_disk_bytes
+        self.model_mmap_mode = model_mmap_mode
+        
+        self._slots = threading.BoundedSemaphore(processes + max_queue_depth)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._started_jobs = None
+        
+        # In-flight job ids, and the worker pid of those that have started
+        self._jobs = set()
+        self._job_workers = {}
+        self._jobs_lock = threading.Lock()
+    
+    def _get_pool(self):
+        """
+        Start worker processes on first use
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                context = multiprocessing.get_context(self.start_method)
+                self._started_jobs = context.SimpleQueue()
+                self._pool = context.Pool(
+                    processes=self.processes,
+                    initializer=_init_worker,
+                    initargs=(self._started_jobs, self.feature_cache_dir, self.model_mmap_mode,
+                              self.feature_cache_disk_bytes),
+                    maxtasksperchild=self.max_jobs_per_worker
+                )
+            return self._pool
+    
+    def _read_started_jobs(self):
+        """
+        Record which worker runs each started job; caller holds _jobs_lock
+        """
+        while self._started_jobs is not None and not self._started_jobs.empty():
+            job, pid = self._started_jobs.get()
+            if job in self._jobs:
+                self._job_workers[job] = pid
+    
+    def _finish(self, job):
+        """
+        Release the slot of a finished or abandoned job, once
+        """
+        with self._jobs_lock:
+            self._read_started_jobs()
+            if job not in self._jobs:
+                return
+            self._jobs.discard(job)
+            self._job_workers.pop(job, None)
+        self._slots.release()
+    
+    def _submit(self, audio_path):
+        """
+        Queue an analysis job; returns its id and AsyncResult
+        """
+        if not self._slots.acquire(blocking=False):
+            raise AnalysisPoolSaturated(self.retry_after)
+        
+        # The slot is released when the job finishes, not when the caller
+        # stops waiting, so a timed-out job counts against capacity until
+        # its worker is stopped
+        job = uuid.uuid4().hex
+        finish = lambda _: self._finish(job)
+        with self._jobs_lock:
+            self._jobs.add(job)
+        try:
+            return job, self._get_pool().apply_async(
+                _analyze_in_worker,
+                (job, audio_path),
+                callback=finish,
+                error_callback=finish
+            )
+        except Exception:
+            self._finish(job)
+            raise
+    
+    def submit(self, audio_path):
+        """
+        Queue an analysis job, raising AnalysisPoolSaturated when full
+        """
+        return self._submit(audio_path)[1]
+    
+    def analyze(self, audio_path):
+        """
+        Analyze an audio file in a worker and wait for the result.
+        
+        A job that does not finish within job_timeout raises
+        AnalysisJobTimeout. The worker running it is killed, so a stuck job
+        does not keep using a CPU and a slot, and the pool starts a
+        replacement; jobs in other workers carry on.
+        """
+        job, pending = self._submit(audio_path)
+        try:
+            return pending.get(timeout=self.job_timeout)
+        except multiprocessing.TimeoutError:
+            self._abandon(job, pending)
+            raise AnalysisJobTimeout(
+                f'Emotion analysis did not finish within {self.job_timeout} seconds',
+                self.retry_after
+            )
+    
+    def _abandon(self, job, pending):
+        """
+        Stop a timed-out job: kill its worker if it has started, then give
+        back its slot. A job still waiting for a worker is left to run, and
+        its slot is released when it finishes.
+        """
+        with self._jobs_lock:
+            self._read_started_jobs()
+            pid = self._job_workers.get(job)
+            # A worker that has started another job is no longer running this one
+            moved_on = any(worker == pid for other, worker in self._job_workers.items() if other != job)
+        if pid is None or moved_on or pending.ready():
+            return
+        
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        # The pool never reports a result for a job whose worker was killed
+        self._finish(job)
+    
+    def close(self):
+        """
+        Stop accepting jobs and shut down worker processes
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
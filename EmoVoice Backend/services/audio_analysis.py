@@ -0,0 +1,136 @@
+import numpy as np
+import librosa
+
+class AudioAnalysisContext:
+    def __init__(self, audio_source, sample_rate=22050, n_fft=2048, hop_length=512, top_db=25):
+        """
+        Decode an audio file once and share its spectral representations.
+        
+        Every feature is derived lazily from a single STFT of the full signal.
+        The trimmed (silence-removed) views are frame slices of that STFT, which
+        works because librosa.effects.trim reports its bounds on hop boundaries.
+        """
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.top_db = top_db
+        
+        # Decode and resample exactly once
+        self.y, self.sr = librosa.load(audio_source, sr=sample_rate)
+        
+        self._trim_index = None
+        self._stft = None
+        self._magnitude = None
+        self._power = None
+        self._mel = None
+        self._log_mel = None
+        self._onset_envelope = None
+    
+    # Signal views
+    @property
+    def trim_index(self):
+        """[start, end] sample bounds of the non-silent part of the signal"""
+        if self._trim_index is None:
+            _, self._trim_index = librosa.effects.trim(
+                self.y,
+                top_db=self.top_db,
+                frame_length=self.n_fft,
+                hop_length=self.hop_length
+            )
+        return self._trim_index
+    
+    @property
+    def y_trimmed(self):
+        start, end = self.trim_index
+        return self.y[start:end]
+    
+    @property
+    def duration(self):
+        """Duration of the trimmed signal in seconds"""
+        return librosa.get_duration(y=self.y_trimmed, sr=self.sr)
+    
+    def _trimmed_frames(self, matrix):
+        """Slice a frame-based matrix down to the frames of the trimmed signal"""
+        start, end = self.trim_index
+        first = start // self.hop_length
+        count = 1 + (end - start) // self.hop_length
+        return matrix[..., first:first + count]
+    
+    # Shared spectrograms
+    @property
+    def stft(self):
+        if self._stft is None:
+            self._stft = librosa.stft(self.y, n_fft=self.n_fft, hop_length=self.hop_length)
+        return self._stft
+    
+    @property
+    def magnitude(self):
+        if self._magnitude is None:
+            self._magnitude = np.abs(self.stft)
+        return self._magnitude
+    
+    @property
+    def power(self):
+        if self._power is None:
+            self._power = self.magnitude ** 2
+        return self._power
+    
+    @property
+    def mel(self):
+        """Mel power spectrogram"""
+        if self._mel is None:
+            self._mel = librosa.feature.melspectrogram(S=self.power, sr=self.sr)
+        return self._mel
+    
+    @property
+    def log_mel(self):
+        if self._log_mel is None:
+            self._log_mel = librosa.power_to_db(self.mel)
+        return self._log_mel
+    
+    # Features on the trimmed signal
+    def mfcc(self, n_mfcc=13):
+        log_mel = librosa.power_to_db(self._trimmed_frames(self.mel))
+        return librosa.feature.mfcc(S=log_mel, sr=self.sr, n_mfcc=n_mfcc)
+    
+    def spectral_centroid(self):
+        return librosa.feature.spectral_centroid(S=self._trimmed_frames(self.magnitude), sr=self.sr)
+    
+    def spectral_contrast(self):
+        return librosa.feature.spectral_contrast(S=self._trimmed_frames(self.magnitude), sr=self.sr)
+    
+    def spectral_rolloff(self):
+        return librosa.feature.spectral_rolloff(S=self._trimmed_frames(self.magnitude), sr=self.sr)
+    
+    # Features on the full signal
+    def rms(self):
+        return librosa.feature.rms(S=self.magnitude, frame_length=self.n_fft)
+    
+    @property
+    def onset_envelope(self):
+        if self._onset_envelope is None:
+            self._onset_envelope = librosa.onset.onset_strength(S=self.log_mel, sr=self.sr)
+        return self._onset_envelope
+    
+    def chroma(self):
+        return librosa.feature.chroma_stft(S=self.power, sr=self.sr)
+    
+    def zero_crossing_rate(self):
+        return librosa.feature.zero_crossing_rate(
+            self.y,
+            frame_length=self.n_fft,
+            hop_length=self.hop_length
+        )
+    
+    def tempo(self):
+        tempo, _ = librosa.beat.beat_track(
+            onset_envelope=self.onset_envelope,
+            sr=self.sr,
+            hop_length=self.hop_length
+        )
+        # Newer librosa returns a one-element array from an onset envelope
+        return float(np.atleast_1d(tempo)[0])
+    
+    def dynamic_range(self):
+        magnitude = np.abs(self.y)
+        return magnitude.max() - magnitude.min()
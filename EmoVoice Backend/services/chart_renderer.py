@@ -0,0 +1,177 @@
+import json
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Colors used for each emotion in every chart
+EMOTION_COLORS = {
+    'Anger': '#FF5252',
+    'Disgust': '#66BB6A',
+    'Fear': '#7E57C2',
+    'Joy': '#FFD700',
+    'Sadness': '#4FC3F7',
+    'Surprise': '#FF4081',
+    'Calm': '#81D4FA'
+}
+DEFAULT_COLOR = '#CCCCCC'
+
+# Most date labels drawn under the timeline chart
+MAX_TIMELINE_TICKS = 30
+
+# Bump when the drawing code changes so memoized charts are not reused
+CHART_STYLE_VERSION = 1
+
+class ChartRenderer:
+    def __init__(self, max_workers=2, cache_size=128):
+        """
+        Initialize the chart renderer.
+        
+        Charts are drawn on their own matplotlib Figure with an Agg canvas,
+        never through pyplot, so renders share no global state and can run
+        in a thread pool. Results are memoized in an LRU of cache_size
+        entries keyed by a hash of the chart kind and its input data, and
+        concurrent requests for the same chart share one render.
+        """
+        self.cache_size = cache_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='emovoice-chart')
+        
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._draw = {
+            'emotion_distribution': self._draw_distribution,
+            'emotion_timeline': self._draw_timeline,
+            'emotion_intensity': self._draw_intensity
+        }
+    
+    def submit(self, kind, data):
+        """
+        Queue a chart render, returning a future for its PNG bytes
+        """
+        if kind not in self._draw:
+            raise ValueError(f'Unknown chart kind: {kind}')
+        
+        key = self.make_key(kind, data)
+        
+        with self._lock:
+            future = self._cache.get(key)
+            if future is not None:
+                self._cache.move_to_end(key)
+                return future
+            
+            future = self.executor.submit(self._render, kind, data)
+            self._cache[key] = future
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        
+        future.add_done_callback(lambda f: self._forget_failure(key, f))
+        return future
+    
+    def make_key(self, kind, data):
+        """
+        Hash a chart kind and its input data
+        """
+        payload = json.dumps([CHART_STYLE_VERSION, kind, data], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def shutdown(self):
+        """
+        Wait for queued renders and stop the worker threads
+        """
+        self.executor.shutdown(wait=True)
+    
+    def _forget_failure(self, key, future):
+        """
+        Drop a failed render from the cache so it is retried next time
+        """
+        if future.cancelled() or future.result() is None:
+            with self._lock:
+                if self._cache.get(key) is future:
+                    del self._cache[key]
+    
+    def _render(self, kind, data):
+        """
+        Draw one chart and encode it as PNG bytes
+        """
+        try:
+            # matplotlib takes longer to import than the rest of the app; load it with the first chart
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            
+            fig = Figure(figsize=(10, 6) if kind == 'emotion_timeline' else (8, 6))
+            FigureCanvasAgg(fig)
+            self._draw[kind](fig, data)
+            
+            buffer = BytesIO()
+            fig.savefig(buffer, format='png')
+            
+            return buffer.getvalue()
+        
+        except Exception as e:
+            print(f"Error generating {kind} chart: {e}")
+            return None
+    
+    def _draw_distribution(self, fig, emotion_counts):
+        """
+        Pie chart of emotion distribution, from a dict of emotion -> count
+        """
+        ax = fig.add_subplot()
+        labels = list(emotion_counts.keys())
+        sizes = list(emotion_counts.values())
+        chart_colors = [EMOTION_COLORS.get(emotion, DEFAULT_COLOR) for emotion in labels]
+        
+        ax.pie(sizes, labels=labels, colors=chart_colors, autopct='%1.1f%%', startangle=90)
+        ax.axis('equal')
+        ax.set_title('Emotion Distribution')
+    
+    def _draw_timeline(self, fig, daily_counts):
+        """
+        Stacked bar chart of daily emotion counts, from [day, emotion, count] rows
+        """
+        days = sorted({day for day, _, _ in daily_counts})
+        emotions = sorted({emotion for _, emotion, _ in daily_counts})
+        day_index = {day: i for i, day in enumerate(days)}
+        emotion_index = {emotion: i for i, emotion in enumerate(emotions)}
+        
+        counts = np.zeros((len(emotions), len(days)))
+        for day, emotion, count in daily_counts:
+            counts[emotion_index[emotion], day_index[day]] += count
+        
+        ax = fig.add_subplot()
+        x = np.arange(len(days))
+        bottom = np.zeros(len(days))
+        for emotion, heights in zip(emotions, counts):
+            # Skip empty days so long ranges do not draw thousands of zero-height bars
+            drawn = heights > 0
+            ax.bar(x[drawn], heights[drawn], bottom=bottom[drawn], width=0.5, label=emotion,
+                   color=EMOTION_COLORS.get(emotion, DEFAULT_COLOR))
+            bottom += heights
+        
+        # Label at most MAX_TIMELINE_TICKS days so long ranges stay readable
+        step = max(1, int(np.ceil(len(days) / float(MAX_TIMELINE_TICKS))))
+        ax.set_xticks(x[::step])
+        ax.set_xticklabels(days[::step], rotation=45)
+        ax.legend(title='emotion')
+        ax.set_title('Emotion Timeline')
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Count')
+        fig.tight_layout()
+    
+    def _draw_intensity(self, fig, avg_intensities):
+        """
+        Bar chart of average intensity per emotion
+        """
+        ax = fig.add_subplot()
+        emotions = list(avg_intensities.keys())
+        intensities = list(avg_intensities.values())
+        bar_colors = [EMOTION_COLORS.get(emotion, DEFAULT_COLOR) for emotion in emotions]
+        
+        ax.bar(emotions, intensities, color=bar_colors)
+        ax.set_title('Average Emotion Intensities')
+        ax.set_xlabel('Emotion')
+        ax.set_ylabel('Average Intensity')
+        ax.set_ylim(0, 1)
+        ax.tick_params(axis='x', labelrotation=45)
+        fig.tight_layout()
@@ -1,47 +1,474 @@
 import sqlite3
 import json
 import os
+import base64
+import binascii
+import datetime
+import threading
+from collections import namedtuple
+from services.migration_runner import MigrationRunner
+
+# Hot queries, shared with verify_query_plans so their index usage stays checked
+RECORDINGS_BY_USER_SQL = '''
+    SELECT * FROM recordings 
+    WHERE user_id = ? 
+    ORDER BY created_at DESC 
+    LIMIT ?
+'''
+
+EMOTIONS_BY_USER_SQL = '''
+    SELECT e.* FROM emotions e
+    JOIN recordings r ON e.recording_id = r.id
+    WHERE r.user_id = ? AND r.created_at >= ? AND r.created_at < ?
+    ORDER BY r.created_at DESC
+'''
+
+# Emotions joined with their recording time, oldest first
+EMOTION_TIMELINE_BY_USER_SQL = '''
+    SELECT {columns}
+    FROM emotions e
+    JOIN recordings r ON e.recording_id = r.id
+    WHERE r.user_id = ? AND r.created_at >= ? AND r.created_at < ?
+    ORDER BY r.created_at, e.id
+'''
+
+# Streaming variants of the per-user queries, without a row limit
+RECORDINGS_ITER_SQL = '''
+    SELECT {columns} FROM recordings 
+    WHERE user_id = ? 
+    ORDER BY created_at DESC
+'''
+
+EMOTIONS_ITER_SQL = '''
+    SELECT {columns} FROM emotions e
+    JOIN recordings r ON e.recording_id = r.id
+    WHERE r.user_id = ? AND r.created_at >= ? AND r.created_at < ?
+    ORDER BY r.created_at DESC
+'''
+
+# Columns that iter_* methods can project, mapped to their SQL expressions
+RECORDING_COLUMNS = {
+    name: name for name in
+    ('id', 'user_id', 'filename', 'duration', 'created_at', 'file_path', 'file_size')
+}
+
+EMOTION_COLUMNS = {
+    name: f'e.{name}' for name in
+    ('id', 'recording_id', 'primary_emotion', 'secondary_emotion',
+     'primary_confidence', 'secondary_confidence', 'intensity', 'created_at')
+}
+
+REPORT_COLUMNS = {
+    name: name for name in
+    ('id', 'user_id', 'title', 'description', 'time_range', 'start_date', 'end_date',
+     'created_at', 'top_emotion', 'data')
+}
+
+# Columns returned by report listings; the data JSON is only read by get_report_by_id
+REPORT_SUMMARY_COLUMNS = ('id', 'title', 'time_range', 'created_at', 'top_emotion')
+
+EMOTION_TIMELINE_COLUMNS = dict(
+    {name: expression for name, expression in EMOTION_COLUMNS.items() if name != 'created_at'},
+    recorded_at='r.created_at AS recorded_at'
+)
+
+# Rows fetched per fetchmany call by the iter_* methods
+DEFAULT_ITER_BATCH_SIZE = 500
+
+UNREAD_INSIGHTS_BY_USER_SQL = '''
+    SELECT * FROM insights 
+    WHERE user_id = ? AND is_read = 0 
+    ORDER BY created_at DESC 
+    LIMIT ?
+'''
+
+REPORT_SHARE_BY_TOKEN_SQL = 'SELECT * FROM report_shares WHERE access_token = ?'
+
+EMOTION_ROLLUP_BY_USER_SQL = '''
+    SELECT day, emotion, count, intensity_sum, confidence_sum 
+    FROM emotion_daily_rollup 
+    WHERE user_id = ? AND day >= ? AND day < ? 
+    ORDER BY day
+'''
+
+# Adds one emotion to its user's daily rollup row
+EMOTION_ROLLUP_UPSERT_SQL = '''
+    INSERT INTO emotion_daily_rollup 
+    (user_id, day, emotion, count, intensity_sum, confidence_sum)
+    SELECT user_id, date(created_at), ?, 1, ?, ? 
+    FROM recordings 
+    WHERE id = ?
+    ON CONFLICT (user_id, day, emotion) DO UPDATE SET 
+        count = count + 1,
+        intensity_sum = intensity_sum + excluded.intensity_sum,
+        confidence_sum = confidence_sum + excluded.confidence_sum
+'''
+
+# Counts a change to the emotion data of a recording's user
+EMOTION_DATA_VERSION_BUMP_SQL = '''
+    INSERT INTO emotion_data_versions (user_id, version) 
+    SELECT user_id, 1 FROM recordings WHERE id = ? 
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1
+'''
+
+# Recomputes rollup rows from the emotions table, optionally for one user
+EMOTION_ROLLUP_REBUILD_SQL = '''
+    INSERT INTO emotion_daily_rollup 
+    (user_id, day, emotion, count, intensity_sum, confidence_sum)
+    SELECT r.user_id, date(r.created_at), e.primary_emotion, 
+           COUNT(*), TOTAL(e.intensity), TOTAL(e.primary_confidence)
+    FROM emotions e
+    JOIN recordings r ON e.recording_id = r.id
+    {where}
+    GROUP BY r.user_id, date(r.created_at), e.primary_emotion
+'''
+
+# Keyset pagination: newest first, continuing after the (created_at, id)
+# of the previous page's last row
+RECORDINGS_PAGE_SQL = '''
+    SELECT * FROM recordings 
+    WHERE {where} 
+    ORDER BY created_at DESC, id DESC 
+    LIMIT ?
+'''
+
+EMOTIONS_PAGE_SQL = '''
+    SELECT e.*, r.created_at AS recorded_at FROM emotions e
+    JOIN recordings r ON e.recording_id = r.id
+    WHERE {where}
+    ORDER BY r.created_at DESC, e.id DESC 
+    LIMIT ?
+'''
+
+INSIGHTS_PAGE_SQL = '''
+    SELECT * FROM insights 
+    WHERE {where} 
+    ORDER BY created_at DESC, id DESC 
+    LIMIT ?
+'''
+
+REPORTS_PAGE_SQL = '''
+    SELECT {columns} FROM reports 
+    WHERE {where} 
+    ORDER BY created_at DESC, id DESC 
+    LIMIT ?
+'''
+
+# Days before today covered by the named time ranges; unknown names mean a year
+TIME_RANGE_DAYS = {
+    'week': 7,
+    'month': 30,
+    'year': 365
+}
+
+# (query name, SQL, sample parameters, indexes the plan must use)
+HOT_QUERY_PLANS = [
+    ('get_recordings', RECORDINGS_BY_USER_SQL, ('', 50), ['idx_recordings_user_created_id']),
+    ('get_emotions', EMOTIONS_BY_USER_SQL, ('', '', ''),
+     ['idx_recordings_user_created_id', 'idx_emotions_recording']),
+    ('get_emotion_timeline',
+     EMOTION_TIMELINE_BY_USER_SQL.format(columns=', '.join(EMOTION_TIMELINE_COLUMNS.values())), ('', '', ''),
+     ['idx_recordings_user_created_id', 'idx_emotions_recording']),
+    ('get_insights', UNREAD_INSIGHTS_BY_USER_SQL, ('', 10), ['idx_insights_user_read_created_id']),
+    ('get_insights_all', INSIGHTS_PAGE_SQL.format(where='user_id = ?'), ('', 50), ['idx_insights_user_created_id']),
+    ('get_report_share_by_token', REPORT_SHARE_BY_TOKEN_SQL, ('',), ['idx_report_shares_access_token']),
+    ('get_emotion_rollup', EMOTION_ROLLUP_BY_USER_SQL, ('', '', ''), ['PRIMARY KEY']),
+    ('page_recordings', RECORDINGS_PAGE_SQL.format(where='user_id = ? AND (created_at, id) < (?, ?)'),
+     ('', '', '', 50), ['idx_recordings_user_created_id']),
+    ('page_emotions',
+     EMOTIONS_PAGE_SQL.format(
+         where='r.user_id = ? AND r.created_at >= ? AND r.created_at < ? AND (r.created_at, e.id) < (?, ?)'
+     ),
+     ('', '', '', '', '', 50), ['idx_recordings_user_created_id', 'idx_emotions_recording']),
+    ('page_insights', INSIGHTS_PAGE_SQL.format(where='user_id = ? AND (created_at, id) < (?, ?)'),
+     ('', '', '', 50), ['idx_insights_user_created_id']),
+    ('page_insights_unread',
+     INSIGHTS_PAGE_SQL.format(where='user_id = ? AND is_read = 0 AND (created_at, id) < (?, ?)'),
+     ('', '', '', 50), ['idx_insights_user_read_created_id']),
+    ('page_reports',
+     REPORTS_PAGE_SQL.format(
+         columns=', '.join(REPORT_SUMMARY_COLUMNS),
+         where='user_id = ? AND (created_at, id) < (?, ?)'
+     ),
+     ('', '', '', 20), ['idx_reports_user_summary'])
+]
+
+def utc_timestamp(offset=datetime.timedelta()):
+    """
+    Current UTC time plus offset as stored in created_at columns, in the
+    format of SQLite's CURRENT_TIMESTAMP ('YYYY-MM-DD HH:MM:SS')
+    """
+    return (datetime.datetime.now(datetime.timezone.utc) + offset).strftime('%Y-%m-%d %H:%M:%S')
+
+def resolve_date_range(time_range='week', today=None):
+    """
+    Resolve a named time range ('week', 'month', 'year') or a
+    (start_date, end_date) pair of ISO dates into [start, end) ISO dates.
+    Named ranges end tomorrow so they include today (UTC, like the stored
+    created_at timestamps); a pair without an end date also runs through
+    today. Raises ValueError for malformed or empty ranges.
+    """
+    today = today or datetime.datetime.now(datetime.timezone.utc).date()
+    tomorrow = today + datetime.timedelta(days=1)
+    
+    if not isinstance(time_range, (tuple, list)):
+        days = TIME_RANGE_DAYS.get(time_range, TIME_RANGE_DAYS['year'])
+        return (today - datetime.timedelta(days=days)).isoformat(), tomorrow.isoformat()
+    
+    try:
+        start_date, end_date = time_range
+        start = datetime.date.fromisoformat(start_date)
+        end = datetime.date.fromisoformat(end_date) if end_date else tomorrow
+    except (TypeError, ValueError):
+        raise ValueError('Invalid date range: dates must be YYYY-MM-DD')
+    
+    if start >= end:
+        raise ValueError('Invalid date range: start_date must be before end_date')
+    
+    return start.isoformat(), end.isoformat()
+
+def encode_page_cursor(created_at, row_id):
+    """Encode the (created_at, id) of a page's last row as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps([created_at, row_id]).encode('utf-8')).decode('ascii')
+
+def decode_page_cursor(cursor):
+    """Decode a page cursor into (created_at, id), raising ValueError if it is malformed"""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise ValueError('Invalid page cursor')
+    
+    if not isinstance(created_at, str) or not isinstance(row_id, str):
+        raise ValueError('Invalid page cursor')
+    
+    return created_at, row_id
 
 class DatabaseService:
-    def __init__(self, db_path):
+    def __init__(self, db_path, busy_timeout_ms=5000, cache_size_kb=20000, max_idle_connections=8):
         self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.max_idle_connections = max_idle_connections
+        
+        # One cached connection per thread, tracked so they can all be closed.
+        # Connections released at the end of a request wait in _idle for the
+        # next thread, up to max_idle_connections; the rest are closed.
+        self._local = threading.local()
+        self._connections = []
+        self._idle = []
+        self._connections_lock = threading.Lock()
+        
         # Ensure database directory exists
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
     
     def get_connection(self):
-        """Get a database connection with row factory"""
-        conn = sqlite3.connect(self.db_path)
+        """
+        Get this thread's cached database connection with row factory; request
+        threads hand it back with release_connection.
+        Use it as a context manager to commit on success and roll back on error.
+        """
+        conn = getattr(self._local, 'conn', None)
+        
+        # Connections must not be shared with a forked child process
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._checkout()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        
+        return conn
+    
+    def _checkout(self):
+        """Take an idle connection opened by this process, or open one"""
+        pid = os.getpid()
+        with self._connections_lock:
+            # Idle connections inherited across a fork belong to the parent
+            self._idle = [(owner, conn) for owner, conn in self._idle if owner == pid]
+            if self._idle:
+                return self._idle.pop()[1]
+        
+        conn = self._connect()
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+    
+    def release_connection(self):
+        """
+        Detach this thread's connection, e.g. when a request ends, keeping
+        it for reuse by another thread or closing it if enough are idle
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            return
+        
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        
+        with self._connections_lock:
+            if conn in self._connections and len(self._idle) < self.max_idle_connections:
+                self._idle.append((os.getpid(), conn))
+                return
+            if conn in self._connections:
+                self._connections.remove(conn)
+        
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    
+    def _connect(self):
+        """Open a connection and apply performance pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000.0,
+            check_same_thread=False
+        )
         conn.row_factory = sqlite3.Row
+        
+        # WAL lets readers run alongside a writer; NORMAL sync is safe in WAL mode
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        # Negative cache_size is in KiB rather than pages
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        
         return conn
     
-    def init_database(self):
-        """Initialize database with schema"""
+    def close(self):
+        """Close every connection opened by this service in this process"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._idle = []
+        
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        
+        self._local = threading.local()
+    
+    def _iter_rows(self, sql, params=(), batch_size=DEFAULT_ITER_BATCH_SIZE):
+        """
+        Run a query and yield its rows as namedtuples, fetching batch_size
+        rows at a time so memory stays constant however many rows match.
+        The query runs when iteration starts; stop early by closing the
+        generator.
+        """
+        cursor = self.get_connection().cursor()
+        # Plain tuples from SQLite; one namedtuple class per query
+        cursor.row_factory = None
+        
         try:
-            # Read schema file
-            schema_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                                      'database', 'schema.sql')
+            cursor.execute(sql, params)
+            row_type = namedtuple('Row', [column[0] for column in cursor.description])
             
-            with open(schema_path, 'r') as f:
-                schema = f.read()
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from map(row_type._make, rows)
+        finally:
+            cursor.close()
+    
+    def _fetch_page(self, sql, conditions, params, keyset, cursor, limit, key_fields=('created_at', 'id')):
+        """
+        Fetch one keyset page; returns (rows, next_cursor).
+        keyset is the row-value condition that continues after a cursor;
+        one extra row is read to tell whether another page follows.
+        """
+        conditions = list(conditions)
+        params = list(params)
+        if cursor:
+            conditions.append(keyset)
+            params.extend(decode_page_cursor(cursor))
+        
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(sql.format(where=' AND '.join(conditions)), (*params, limit + 1))
             
-            # Execute schema
-            conn = self.get_connection()
-            conn.executescript(schema)
-            conn.commit()
-            conn.close()
+            rows = [dict(row) for row in cursor.fetchmany(limit + 1)]
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_page_cursor(*(rows[-1][field] for field in key_fields))
+        
+        return rows, next_cursor
+    
+    def _projection(self, columns, allowed):
+        """Build a SELECT column list from requested column names"""
+        if columns is None:
+            return ', '.join(allowed.values())
+        
+        unknown = [column for column in columns if column not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        
+        return ', '.join(allowed[column] for column in columns)
+    
+    def init_database(self, dry_run=False):
+        """
+        Bring the database schema up to the newest migration.
+        Returns the migrations that were applied (or would be, with dry_run).
+        """
+        try:
+            runner = MigrationRunner(self)
+            
+            # Fast path: nothing to do when the database is already at head
+            if runner.is_current():
+                return []
+            
+            applied = runner.migrate(dry_run=dry_run)
+            if dry_run:
+                return applied
+            
+            # Warn loudly if a hot query has fallen back to a table scan
+            for name, missing in self.verify_query_plans().items():
+                print(f"Warning: query plan for {name} does not use {', '.join(missing)}")
             
             print("Database initialized successfully")
+            return applied
         except Exception as e:
             print(f"Error initializing database: {e}")
             raise
     
+    def explain_query_plan(self, sql, params=(), conn=None):
+        """Return the EXPLAIN QUERY PLAN detail lines for a query"""
+        conn = conn or self.get_connection()
+        rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+        return [row['detail'] for row in rows]
+    
+    def verify_query_plans(self):
+        """
+        Check that each hot query is planned with its expected indexes.
+        Returns a mapping of query name to the indexes its plan is missing.
+        """
+        # A fresh connection, since EXPLAIN does not reload a schema that
+        # changed after a cached connection last read it
+        conn = self._connect()
+        
+        try:
+            failures = {}
+            for name, sql, params, indexes in HOT_QUERY_PLANS:
+                plan = ' '.join(self.explain_query_plan(sql, params, conn))
+                missing = [index for index in indexes if index not in plan]
+                if missing:
+                    failures[name] = missing
+            
+            return failures
+        finally:
+            conn.close()
+    
     # User operations
     def save_user(self, user_data):
         """Save user to database"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        try:
+        with conn:
+            cursor = conn.cursor()
             cursor.execute('''
                 INSERT OR REPLACE INTO users 
                 (id, name, email, password_hash, created_at, preferences)
@@ -55,17 +482,14 @@ class DatabaseService:
                 json.dumps(user_data.get('preferences', {}))
             ))
             
-            conn.commit()
             return user_data['id']
-        finally:
-            conn.close()
     
     def get_user(self, user_id):
         """Get user by ID"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        try:
+        with conn:
+            cursor = conn.cursor()
             cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
             row = cursor.fetchone()
             
@@ -78,64 +502,84 @@ class DatabaseService:
                 user['preferences'] = json.loads(user['preferences'])
             
             return user
-        finally:
-            conn.close()
     
     # Recording operations
     def save_recording(self, recording_data):
         """Save recording to database"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        try:
+        with conn:
+            cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO recordings 
-                (id, user_id, filename, duration, file_path, file_size)
-                VALUES (?, ?, ?, ?, ?, ?)
+                (id, user_id, filename, duration, file_path, file_size, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (
                 recording_data['id'],
                 recording_data['user_id'],
                 recording_data['filename'],
                 recording_data.get('duration', 0),
                 recording_data.get('file_path'),
-                recording_data.get('file_size', 0)
+                recording_data.get('file_size', 0),
+                # Ranges and the daily rollup use UTC days
+                recording_data.get('created_at') or utc_timestamp()
             ))
             
-            conn.commit()
             return recording_data['id']
-        finally:
-            conn.close()
     
     def get_recordings(self, user_id, limit=50):
         """Get recordings for a user"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        try:
-            cursor.execute('''
-                SELECT * FROM recordings 
-                WHERE user_id = ? 
-                ORDER BY created_at DESC 
-                LIMIT ?
-            ''', (user_id, limit))
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(RECORDINGS_BY_USER_SQL, (user_id, limit))
             
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
-        finally:
-            conn.close()
+    
+    def page_recordings(self, user_id, limit=50, cursor=None):
+        """Get a page of recordings for a user, newest first; returns (recordings, next_cursor)"""
+        return self._fetch_page(
+            RECORDINGS_PAGE_SQL,
+            ['user_id = ?'],
+            [user_id],
+            '(created_at, id) < (?, ?)',
+            cursor,
+            limit
+        )
+    
+    def iter_recordings(self, user_id, columns=None, batch_size=DEFAULT_ITER_BATCH_SIZE):
+        """
+        Yield all of a user's recordings, newest first, as namedtuples of
+        the requested columns
+        """
+        sql = RECORDINGS_ITER_SQL.format(columns=self._projection(columns, RECORDING_COLUMNS))
+        return self._iter_rows(sql, (user_id,), batch_size)
+    
+    def get_recording_by_id(self, recording_id):
+        """Get a recording by ID"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM recordings WHERE id = ?', (recording_id,))
+            row = cursor.fetchone()
+            
+            return dict(row) if row else None
     
     # Emotion operations
     def save_emotion(self, emotion_data):
         """Save emotion data to database"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        try:
+        with conn:
+            cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO emotions 
                 (id, recording_id, primary_emotion, secondary_emotion, 
-                primary_confidence, secondary_confidence, intensity)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                primary_confidence, secondary_confidence, intensity, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 emotion_data['id'],
                 emotion_data['recording_id'],
@@ -143,52 +587,143 @@ class DatabaseService:
                 emotion_data.get('secondary_emotion'),
                 emotion_data.get('primary_confidence', 0),
                 emotion_data.get('secondary_confidence', 0),
-                emotion_data.get('intensity', 0)
+                emotion_data.get('intensity', 0),
+                emotion_data.get('created_at') or utc_timestamp()
             ))
             
-            conn.commit()
+            # Keep the daily rollup in step, in the same transaction
+            cursor.execute(EMOTION_ROLLUP_UPSERT_SQL, (
+                emotion_data['primary_emotion'],
+                emotion_data.get('intensity', 0) or 0,
+                emotion_data.get('primary_confidence', 0) or 0,
+                emotion_data['recording_id']
+            ))
+            cursor.execute(EMOTION_DATA_VERSION_BUMP_SQL, (emotion_data['recording_id'],))
+            
             return emotion_data['id']
-        finally:
-            conn.close()
     
     def get_emotions(self, user_id, time_range='week'):
         """Get emotions for a user within a time range"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        try:
-            # Calculate date range
-            if time_range == 'week':
-                date_filter = "datetime('now', '-7 days')"
-            elif time_range == 'month':
-                date_filter = "datetime('now', '-30 days')"
-            else:
-                date_filter = "datetime('now', '-365 days')"  # Default to a year
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(EMOTIONS_BY_USER_SQL, (user_id, *self._date_bounds(time_range)))
             
-            cursor.execute(f'''
-                SELECT e.* FROM emotions e
+            rows = cursor.fetchall()
+            return [dict(row) for row in rows]
+    
+    def page_emotions(self, user_id, time_range='week', limit=100, cursor=None):
+        """
+        Get a page of emotions for a user within a time range, newest
+        recording first, each with its recording time (recorded_at);
+        returns (emotions, next_cursor)
+        """
+        return self._fetch_page(
+            EMOTIONS_PAGE_SQL,
+            ['r.user_id = ?', 'r.created_at >= ?', 'r.created_at < ?'],
+            [user_id, *self._date_bounds(time_range)],
+            '(r.created_at, e.id) < (?, ?)',
+            cursor,
+            limit,
+            key_fields=('recorded_at', 'id')
+        )
+    
+    def get_emotion_timeline(self, user_id, time_range='week'):
+        """Get a user's emotions with their recording time, oldest first"""
+        return [row._asdict() for row in self.iter_emotion_timeline(user_id, time_range)]
+    
+    def iter_emotion_timeline(self, user_id, time_range='week', columns=None, batch_size=DEFAULT_ITER_BATCH_SIZE):
+        """
+        Yield a user's emotions with their recording time (recorded_at),
+        oldest first, as namedtuples of the requested columns
+        """
+        sql = EMOTION_TIMELINE_BY_USER_SQL.format(columns=self._projection(columns, EMOTION_TIMELINE_COLUMNS))
+        return self._iter_rows(sql, (user_id, *self._date_bounds(time_range)), batch_size)
+    
+    def iter_emotions(self, user_id, time_range='week', columns=None, batch_size=DEFAULT_ITER_BATCH_SIZE):
+        """
+        Yield a user's emotions within a time range, newest first, as
+        namedtuples of the requested columns
+        """
+        sql = EMOTIONS_ITER_SQL.format(columns=self._projection(columns, EMOTION_COLUMNS))
+        return self._iter_rows(sql, (user_id, *self._date_bounds(time_range)), batch_size)
+    
+    def get_emotion_for_recording(self, recording_id):
+        """Get the newest emotion of a recording, with its user and recording time"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT e.*, r.user_id, r.created_at AS recorded_at 
+                FROM emotions e
                 JOIN recordings r ON e.recording_id = r.id
-                WHERE r.user_id = ? AND r.created_at >= {date_filter}
-                ORDER BY r.created_at DESC
-            ''', (user_id,))
+                WHERE e.recording_id = ? 
+                ORDER BY e.created_at DESC 
+                LIMIT 1
+            ''', (recording_id,))
+            row = cursor.fetchone()
+            
+            return dict(row) if row else None
+    
+    def get_emotion_rollup(self, user_id, time_range='week'):
+        """Get per-day, per-emotion counts and sums for a user within a time range"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(EMOTION_ROLLUP_BY_USER_SQL, (user_id, *self._date_bounds(time_range)))
             
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
-        finally:
-            conn.close()
+    
+    def rebuild_emotion_rollup(self, user_id=None):
+        """Recompute the daily emotion rollup from the emotions table, for one user or everyone"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            if user_id is None:
+                cursor.execute('DELETE FROM emotion_daily_rollup')
+                cursor.execute(EMOTION_ROLLUP_REBUILD_SQL.format(where=''))
+                rebuilt = cursor.rowcount
+                cursor.execute('UPDATE emotion_data_versions SET version = version + 1')
+            else:
+                cursor.execute('DELETE FROM emotion_daily_rollup WHERE user_id = ?', (user_id,))
+                cursor.execute(EMOTION_ROLLUP_REBUILD_SQL.format(where='WHERE r.user_id = ?'), (user_id,))
+                rebuilt = cursor.rowcount
+                cursor.execute('UPDATE emotion_data_versions SET version = version + 1 WHERE user_id = ?', (user_id,))
+            
+            return rebuilt
+    
+    def get_emotion_data_version(self, user_id):
+        """Get the counter bumped whenever a user's emotion data changes"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT version FROM emotion_data_versions WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+            
+            return row['version'] if row else 0
+    
+    def _date_bounds(self, time_range):
+        """[start, end) ISO dates for a named time range or a (start_date, end_date) pair"""
+        return resolve_date_range(time_range)
     
     # Report operations
     def save_report(self, report_data):
         """Save report to database"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        try:
+        with conn:
+            cursor = conn.cursor()
             cursor.execute('''
                 INSERT OR REPLACE INTO reports 
                 (id, user_id, title, description, time_range, 
-                start_date, end_date, data)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                start_date, end_date, top_emotion, data, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 report_data['id'],
                 report_data['user_id'],
@@ -197,20 +732,67 @@ class DatabaseService:
                 report_data['time_range'],
                 report_data.get('start_date'),
                 report_data.get('end_date'),
-                json.dumps(report_data.get('data', {}))
+                report_data.get('top_emotion'),
+                json.dumps(report_data.get('data', {})),
+                report_data.get('created_at') or utc_timestamp()
             ))
             
-            conn.commit()
             return report_data['id']
-        finally:
-            conn.close()
+    
+    def get_reports(self, user_id, limit=20, columns=REPORT_SUMMARY_COLUMNS):
+        """Get the newest reports for a user"""
+        return self.page_reports(user_id, limit, columns=columns)[0]
+    
+    def page_reports(self, user_id, limit=20, cursor=None, columns=REPORT_SUMMARY_COLUMNS):
+        """
+        Get a page of reports for a user, newest first; returns (reports, next_cursor).
+        Only summary columns are read unless columns asks for more.
+        """
+        # The keyset columns are always needed to build the next cursor
+        columns = list(columns) + [key for key in ('created_at', 'id') if key not in columns]
+        sql = REPORTS_PAGE_SQL.format(columns=self._projection(columns, REPORT_COLUMNS), where='{where}')
+        
+        reports, next_cursor = self._fetch_page(
+            sql,
+            ['user_id = ?'],
+            [user_id],
+            '(created_at, id) < (?, ?)',
+            cursor,
+            limit
+        )
+        
+        for report in reports:
+            # Parse JSON fields
+            if report.get('data'):
+                report['data'] = json.loads(report['data'])
+        
+        return reports, next_cursor
+    
+    def get_report_by_id(self, report_id):
+        """Get a report by ID"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM reports WHERE id = ?', (report_id,))
+            row = cursor.fetchone()
+            
+            if not row:
+                return None
+            
+            report = dict(row)
+            # Parse JSON fields
+            if report.get('data'):
+                report['data'] = json.loads(report['data'])
+            
+            return report
     
     def save_report_share(self, share_data):
         """Save report share to database"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        try:
+        with conn:
+            cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO report_shares 
                 (id, report_id, recipient_email, access_token, status, expires_at)
@@ -224,7 +806,222 @@ class DatabaseService:
                 share_data.get('expires_at')
             ))
             
-            conn.commit()
             return share_data['id']
-        finally:
-            conn.close()
\ No newline at end of file
+    
+    def get_report_share_by_token(self, access_token):
+        """Get a report share by its access token"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(REPORT_SHARE_BY_TOKEN_SQL, (access_token,))
+            row = cursor.fetchone()
+            
+            return dict(row) if row else None
+    
+    # Insight operations
+    def save_insight(self, insight_data):
+        """Save insight to database"""
+        conn = self.get_connection()
+        
+        with conn:
+            self._insert_insight(conn.cursor(), insight_data)
+            
+            return insight_data['id']
+    
+    def _insert_insight(self, cursor, insight_data):
+        """Insert an insight row using an open cursor"""
+        cursor.execute('''
+            INSERT INTO insights 
+            (id, user_id, title, description, category, created_at, is_read)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            insight_data['id'],
+            insight_data['user_id'],
+            insight_data['title'],
+            insight_data.get('description'),
+            insight_data.get('category'),
+            insight_data.get('created_at'),
+            1 if insight_data.get('is_read') else 0
+        ))
+    
+    def get_insight_state(self, user_id):
+        """Get the incremental insight state for a user, or None if there is none yet"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT state FROM insight_state WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+            
+            return json.loads(row['state']) if row else None
+    
+    def update_insight_state(self, user_id, update):
+        """
+        Atomically read, update and write a user's insight state.
+        update(state) gets the current state (None if there is none) and
+        returns (new_state, insights); the insights are saved in the same
+        transaction. BEGIN IMMEDIATE takes the write lock before reading, so
+        concurrent uploads for a user cannot lose each other's updates.
+        """
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT state FROM insight_state WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+            
+            state, insights = update(json.loads(row['state']) if row else None)
+            
+            cursor.execute('''
+                INSERT OR REPLACE INTO insight_state 
+                (user_id, state, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (user_id, json.dumps(state)))
+            
+            for insight in insights:
+                self._insert_insight(cursor, insight)
+            
+            return insights
+    
+    def get_insights(self, user_id, unread_only=False, limit=50, category=None):
+        """Get insights for a user, newest first"""
+        if not unread_only or category is not None:
+            return self.page_insights(user_id, unread_only, category, limit)[0]
+        
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(UNREAD_INSIGHTS_BY_USER_SQL, (user_id, limit))
+            
+            insights = []
+            for row in cursor.fetchall():
+                insight = dict(row)
+                insight['is_read'] = bool(insight['is_read'])
+                insights.append(insight)
+            
+            return insights
+    
+    def page_insights(self, user_id, unread_only=False, category=None, limit=50, cursor=None):
+        """Get a page of insights for a user, newest first; returns (insights, next_cursor)"""
+        conditions = ['user_id = ?']
+        params = [user_id]
+        if unread_only:
+            conditions.append('is_read = 0')
+        if category:
+            conditions.append('category = ?')
+            params.append(category)
+        
+        insights, next_cursor = self._fetch_page(
+            INSIGHTS_PAGE_SQL,
+            conditions,
+            params,
+            '(created_at, id) < (?, ?)',
+            cursor,
+            limit
+        )
+        
+        for insight in insights:
+            insight['is_read'] = bool(insight['is_read'])
+        
+        return insights, next_cursor
+    
+    # Smart home operations
+    def get_smart_home_integrations(self, user_id):
+        """Get smart home integrations for a user"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM smart_home_integrations 
+                WHERE user_id = ? 
+                ORDER BY created_at DESC
+            ''', (user_id,))
+            
+            integrations = []
+            for row in cursor.fetchall():
+                integration = dict(row)
+                # Parse JSON fields
+                if integration.get('settings'):
+                    integration['settings'] = json.loads(integration['settings'])
+                integrations.append(integration)
+            
+            return integrations
+    
+    # Job operations
+    def save_job(self, job_data):
+        """Save background job to database"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO jobs 
+                (id, user_id, recording_id, job_type, status, stage, owner_pid)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                job_data['id'],
+                job_data['user_id'],
+                job_data.get('recording_id'),
+                job_data['job_type'],
+                job_data.get('status', 'queued'),
+                job_data.get('stage'),
+                job_data.get('owner_pid')
+            ))
+            
+            return job_data['id']
+    
+    def update_job(self, job_id, updates):
+        """Update status, stage, result or error of a background job"""
+        allowed = ('status', 'stage', 'result', 'error')
+        fields = {k: v for k, v in updates.items() if k in allowed}
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            assignments = [f'{k} = ?' for k in fields] + ['updated_at = CURRENT_TIMESTAMP']
+            cursor.execute(f'''
+                UPDATE jobs 
+                SET {', '.join(assignments)} 
+                WHERE id = ?
+            ''', (*fields.values(), job_id))
+            
+            return cursor.rowcount > 0
+    
+    def get_unfinished_jobs(self):
+        """Get the id and owner_pid of every queued or running job"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, owner_pid FROM jobs 
+                WHERE status IN ('queued', 'running')
+            ''')
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_job(self, job_id):
+        """Get background job by ID"""
+        conn = self.get_connection()
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+            row = cursor.fetchone()
+            
+            if not row:
+                return None
+            
+            job = dict(row)
+            # Parse JSON fields
+            if job.get('result'):
+                job['result'] = json.loads(job['result'])
+            
+            return job
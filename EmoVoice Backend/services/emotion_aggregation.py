@@ -0,0 +1,127 @@
+import numpy as np
+
+# pandas is imported inside the functions so it loads with the first
+# aggregation rather than at startup
+
+def summarize_rollup(rollup):
+    """
+    Sum daily rollup rows (dicts with emotion, count, intensity_sum and
+    confidence_sum) per emotion. A rollup has at most one row per day and
+    emotion, so summing the dicts directly is faster than converting them
+    to columns first, even for years of data.
+    
+    Returns (counts, avg_intensities, avg_confidences), each a dict keyed
+    by emotion, with counts ordered from most to least frequent.
+    """
+    totals = {}
+    for row in rollup:
+        total = totals.get(row['emotion'])
+        if total is None:
+            total = totals[row['emotion']] = [0, 0.0, 0.0]
+        total[0] += row['count']
+        total[1] += row['intensity_sum']
+        total[2] += row['confidence_sum']
+    
+    # Most frequent first; sorted is stable, so ties keep first-seen order
+    ordered = sorted(totals.items(), key=lambda item: -item[1][0])
+    
+    return (
+        {emotion: int(count) for emotion, (count, _, _) in ordered},
+        {emotion: intensity_sum / count for emotion, (count, intensity_sum, _) in ordered},
+        {emotion: confidence_sum / count for emotion, (count, _, confidence_sum) in ordered}
+    )
+
+def encode_emotions(emotions):
+    """
+    Factorize emotions into integer codes, so comparisons run on ints
+    rather than Python strings. Returns (codes, labels).
+    """
+    import pandas as pd
+    
+    codes, labels = pd.factorize(np.asarray(emotions, dtype=object))
+    return codes, np.asarray(labels, dtype=object)
+
+def emotion_runs(emotions):
+    """
+    Run-length encode a sequence of emotions.
+    
+    Returns (values, starts, lengths) arrays, one entry per run of
+    consecutive identical emotions.
+    """
+    codes, labels = encode_emotions(emotions)
+    if len(codes) == 0:
+        return labels, np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    
+    starts = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1))
+    lengths = np.diff(np.append(starts, len(codes)))
+    
+    return labels[codes[starts]], starts, lengths
+
+def longest_streak(emotions):
+    """
+    Get (emotion, length) of the longest run of one emotion; the earliest
+    run wins ties. Returns (None, 0) for an empty sequence.
+    """
+    values, _, lengths = emotion_runs(emotions)
+    if len(lengths) == 0:
+        return None, 0
+    
+    longest = int(np.argmax(lengths))
+    return values[longest], int(lengths[longest])
+
+def find_return_pattern(emotions):
+    """
+    Find the first A-B-A pattern, where an emotion returns right after a
+    different one. Returns (pattern_emotion, trigger_emotion) or None.
+    """
+    codes, labels = encode_emotions(emotions)
+    if len(codes) < 3:
+        return None
+    
+    matches = np.flatnonzero((codes[:-2] == codes[2:]) & (codes[:-2] != codes[1:-1]))
+    if len(matches) == 0:
+        return None
+    
+    i = matches[0]
+    return labels[codes[i]], labels[codes[i + 1]]
+
+def dominant_by_period(timestamps, emotions, periods):
+    """
+    Get the most frequent emotion in each part of the day.
+    
+    periods is a list of (name, hours); returns a dict of name -> emotion for
+    the periods that have entries, in the order of periods. Ties go to the
+    emotion that appears first in the timeline.
+    """
+    codes, labels = encode_emotions(emotions)
+    if len(codes) == 0:
+        return {}
+    
+    # Map each hour of the day to its period; hours outside every period map to len(periods)
+    period_of_hour = np.full(24, len(periods))
+    for index, (_, hours) in enumerate(periods):
+        period_of_hour[list(hours)] = index
+    
+    period_index = period_of_hour[hours_of_day(timestamps)]
+    
+    # (period, emotion) histogram in one pass
+    counts = np.bincount(
+        period_index * len(labels) + codes,
+        minlength=(len(periods) + 1) * len(labels)
+    ).reshape(len(periods) + 1, len(labels))
+    
+    return {
+        name: labels[np.argmax(counts[index])]
+        for index, (name, _) in enumerate(periods)
+        if counts[index].any()
+    }
+
+def hours_of_day(timestamps):
+    """
+    Get the hour of each ISO timestamp ('YYYY-MM-DD HH:MM:SS', with a space
+    or 'T'), read from its fixed position instead of parsing every date
+    """
+    # One row of UTF-32 code points per timestamp; hour digits are at 11 and 12
+    chars = np.asarray(timestamps, dtype=str)
+    codes = chars.view(np.uint32).reshape(len(chars), -1)
+    return (codes[:, 11] - ord('0')) * 10 + (codes[:, 12] - ord('0'))
@@ -1,149 +1,452 @@
 import os
+import io
+import wave
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import librosa
-import joblib
-import soundfile as sf
+
+from services import feature_extraction
+from services.feature_sets import DEFAULT_FEATURE_SET, create_feature_set
+
+# librosa (through services.audio_analysis and services.streaming_analysis)
+# and joblib/scikit-learn are imported on first use, so importing this
+# module stays cheap and processes start answering requests sooner
+
+# Version of the statistics cached for the fallback detector
+FALLBACK_STATS_VERSION = 1
+
+def plain_result(value):
+    """
+    Convert numpy scalars and arrays in an analysis result to built-in
+    Python types, so results can be passed to jsonify and json.dumps
+    """
+    if isinstance(value, dict):
+        return {key: plain_result(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain_result(item) for item in value]
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
 
 class EmotionDetectionService:
-    def __init__(self):
+    def __init__(self, feature_cache=None, mmap_mode=None):
+        """
+        Initialize the emotion detection service.
+        
+        The model is loaded on first inference (or by load_model), not here,
+        because unpickling the forest imports scikit-learn and reads the whole
+        file. mmap_mode ('r') is passed to joblib.load so the model's NumPy
+        arrays are memory-mapped read-only instead of copied into memory.
+        
+        When train_model.py has exported the forest as flat arrays
+        (emotion_model.npz, at least as new as the joblib file), that is
+        loaded instead and evaluated by FlatForest without scikit-learn.
+        
+        Features are computed by services.feature_extraction with the feature
+        set the model was trained on. A model whose recorded feature schema
+        (version, dimension and parameter fingerprint) does not match what
+        this build extracts is rejected, and the fallback method is used.
+        """
         # Path to scikit-learn model
         self.model_path = os.path.join(
             os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
             'models',
             'emotion_model.joblib'
         )
+        self.flat_model_path = os.path.splitext(self.model_path)[0] + '.npz'
         
         # Ensure model directory exists
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
         
-        # Load model if it exists, otherwise use fallback
-        if os.path.exists(self.model_path):
-            self.model = joblib.load(self.model_path)
-            self.model_loaded = True
-        else:
+        # The model is loaded lazily if it exists, otherwise use fallback
+        self.mmap_mode = mmap_mode
+        self._model = None
+        self._model_available = os.path.exists(self.model_path) or os.path.exists(self.flat_model_path)
+        self._model_lock = threading.Lock()
+        if not self._model_available:
             print("Warning: Emotion detection model not found. Using fallback method.")
-            self.model_loaded = False
         
-        # Define emotion labels
-        self.emotions = ['Anger', 'Disgust', 'Fear', 'Joy', 'Sadness', 'Surprise', 'Calm']
+        # Define emotion labels; a loaded model supplies its own class order
+        self.emotions = list(feature_extraction.EMOTIONS)
+        self.labels = self.emotions
         
-        # Enhanced feature extraction parameters
-        self.sample_rate = 22050
-        self.n_mfcc = 13
-        self.n_fft = 2048
-        self.hop_length = 512
-        self.max_pad_len = 174
+        # Feature extraction parameters shared with train_model.py
+        self.sample_rate = feature_extraction.SAMPLE_RATE
+        self.n_mfcc = feature_extraction.N_MFCC
+        self.n_fft = feature_extraction.N_FFT
+        self.hop_length = feature_extraction.HOP_LENGTH
+        self.max_pad_len = feature_extraction.MAX_PAD_LEN
+        
+        # Threads used to extract features in analyze_batch
+        self.batch_workers = min(8, os.cpu_count() or 1)
+        
+        # Optional FeatureCache so repeated audio skips feature extraction
+        self.feature_cache = feature_cache
+        
+        # Replaced by the model's own feature set when it loads
+        self._feature_set = create_feature_set(DEFAULT_FEATURE_SET, self.n_mfcc, self.max_pad_len)
+    
+    @property
+    def model_loaded(self):
+        """Whether a trained model is available; loads it on first use"""
+        return self.model is not None
     
-    def extract_features(self, audio_path, max_pad_len=174):
+    @property
+    def model(self):
+        """The trained classifier, loaded on first access, or None"""
+        if self._model is None and self._model_available:
+            self.load_model()
+        return self._model
+    
+    def load_model(self):
         """
-        Extract MFCC features from audio file with enhanced parameters
+        Load the trained model now; returns whether a model is available.
+        A model that fails to load is reported once and the fallback is used.
         """
-        try:
-            # Load audio file
-            y, sr = librosa.load(audio_path, sr=self.sample_rate)
+        with self._model_lock:
+            if self._model is None and self._model_available:
+                try:
+                    if self._flat_model_current():
+                        from services.forest_evaluator import FlatForest
+                        model = FlatForest.load(self.flat_model_path)
+                    else:
+                        import joblib
+                        model = joblib.load(self.model_path, mmap_mode=self.mmap_mode)
+                    
+                    self._feature_set, self.labels = self._model_contract(model)
+                    self._model = model
+                except Exception as e:
+                    print(f"Error loading emotion detection model: {e}. Using fallback method.")
+                    self._model = None
+                    self._model_available = False
             
-            # Trim silence
-            y, _ = librosa.effects.trim(y, top_db=25)
-            
-            # Extract duration
-            duration = librosa.get_duration(y=y, sr=sr)
+            return self._model is not None
+    
+    def _model_contract(self, model):
+        """
+        Get the feature set and class labels of a model, raising ValueError
+        if this build does not extract the features it was trained on
+        """
+        schema = getattr(model, 'feature_schema_', None)
+        tag = (schema or {}).get('feature_set') or getattr(model, 'feature_set_', None) or DEFAULT_FEATURE_SET
+        feature_set = create_feature_set(tag, self.n_mfcc, self.max_pad_len)
+        
+        problem = feature_extraction.schema_mismatch(
+            schema,
+            feature_extraction.feature_schema(feature_set),
+            model.n_features_in_
+        )
+        if problem:
+            raise ValueError(problem)
+        
+        # Models trained before labels were recorded use the service's order
+        labels = list(getattr(model, 'labels_', None) or self.emotions)
+        if len(labels) != len(model.classes_):
+            raise ValueError(f'model has {len(model.classes_)} classes but {len(labels)} labels')
+        
+        return feature_set, labels
+    
+    @property
+    def feature_set(self):
+        """The feature set of the loaded model; loads the model on first use"""
+        self.model
+        return self._feature_set
+    
+    def _flat_model_current(self):
+        """
+        Whether the exported flat forest exists and is not older than the joblib model
+        """
+        if not os.path.exists(self.flat_model_path):
+            return False
+        if not os.path.exists(self.model_path):
+            return True
+        return os.path.getmtime(self.flat_model_path) >= os.path.getmtime(self.model_path)
+    
+    def warm_up(self):
+        """
+        Load the model and analyze a short generated tone, so librosa is
+        imported and its numba functions are compiled. A pre-forking server
+        calls this in the master so every worker inherits the warm state.
+        """
+        self.load_model()
+        
+        context = self._get_analysis_context(self._warm_up_tone())
+        features, _, _ = self.extract_features(context)
+        self._energy_stats(context)
+        
+        if features is not None and self._model is not None:
+            self._model.predict_proba(features)
+    
+    def _warm_up_tone(self, seconds=1.0, frequency=220.0):
+        """
+        WAV bytes of a sine tone at the service sample rate
+        """
+        t = np.arange(int(seconds * self.sample_rate)) / float(self.sample_rate)
+        samples = (0.5 * np.sin(2 * np.pi * frequency * t) * 32767).astype('<i2')
+        
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(samples.tobytes())
+        
+        return buffer.getvalue()
+    
+    def extract_features(self, audio_path, feature_set=None):
+        """
+        Extract the model's feature vector (as one row) from an audio file,
+        plus the duration and spectral summary
+        """
+        try:
+            # Decode once and reuse the shared spectrogram for every feature
+            context = self._get_analysis_context(audio_path)
             
-            # Extract MFCCs with enhanced parameters
-            mfccs = librosa.feature.mfcc(
-                y=y, 
-                sr=sr, 
-                n_mfcc=self.n_mfcc,
-                n_fft=self.n_fft,
-                hop_length=self.hop_length
+            features, duration, spectral_features = feature_extraction.extract_features(
+                context,
+                feature_set or self.feature_set
             )
             
-            # Extract additional features for enhanced detection
-            spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
-            spectral_contrast = librosa.feature.spectral_contrast(y=y, sr=sr)
-            spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)
-            
-            # Normalize features
-            mfccs = self._normalize_features(mfccs)
-            spectral_centroid = self._normalize_features(spectral_centroid)
-            spectral_contrast = self._normalize_features(spectral_contrast)
-            spectral_rolloff = self._normalize_features(spectral_rolloff)
-            
-            # Pad or truncate to fixed length
-            pad_width = max_pad_len - mfccs.shape[1]
-            if pad_width > 0:
-                mfccs = np.pad(mfccs, pad_width=((0, 0), (0, pad_width)), mode='constant')
-            else:
-                mfccs = mfccs[:, :max_pad_len]
-            
-            # Flatten features for scikit-learn model
-            flattened_features = mfccs.reshape(1, -1)
-            
-            return flattened_features, duration, {
-                'spectral_centroid': spectral_centroid.mean(),
-                'spectral_contrast': spectral_contrast.mean(),
-                'spectral_rolloff': spectral_rolloff.mean()
-            }
+            return features.reshape(1, -1), duration, spectral_features
         
         except Exception as e:
             print(f"Error extracting features: {e}")
             return None, 0, {}
     
-    def _normalize_features(self, features):
+    def _get_analysis_context(self, audio_source):
         """
-        Normalize features to zero mean and unit variance
+        Return an analysis context for a path, bytes or file-like object,
+        reusing it if one is passed in
         """
-        mean = features.mean(axis=1, keepdims=True)
-        std = features.std(axis=1, keepdims=True) + 1e-10  # Avoid division by zero
-        return (features - mean) / std
+        if isinstance(audio_source, (bytes, bytearray)):
+            audio_source = io.BytesIO(audio_source)
+        
+        return feature_extraction.analysis_context(audio_source)
     
     def analyze_audio(self, audio_path):
         """
         Analyze audio file and detect emotions with enhanced approach
         """
-        # Extract features with additional spectral features
-        features, duration, spectral_features = self.extract_features(audio_path)
+        default_result = {
+            'primary_emotion': 'Calm',
+            'confidence': 0.5,
+            'intensity': 0.5,
+            'duration': 0
+        }
         
-        if features is None:
-            return {
-                'primary_emotion': 'Calm',
-                'confidence': 0.5,
-                'intensity': 0.5,
-                'duration': 0
-            }
+        # Features and energy statistics (plus the fallback's statistics when
+        # no model is loaded), from the feature cache if possible
+        entry = self._get_features(audio_path)
+        if entry is None:
+            return default_result
         
         if self.model_loaded:
-            # Use scikit-learn model for prediction
-            prediction_probs = self.model.predict_proba(features)
+            return self.analyze_features(entry)
+        
+        # Enhanced fallback method using audio features
+        return self.enhanced_fallback_emotion_detection(entry)
+    
+    def analyze_features(self, entry):
+        """
+        Classify a precomputed feature entry (MFCC matrix, spectral summary
+        and energy statistics), e.g. from the feature cache or a stream
+        """
+        spectral_features = self._spectral_summary(entry)
+        
+        # Use the forest for prediction
+        prediction_probs = self.model.predict_proba(entry['features'].reshape(1, -1))
+        
+        # Calculate intensity based on audio energy and spectral features
+        intensity = self.calculate_enhanced_intensity(None, spectral_features, energy_stats=entry)
+        
+        return self._build_model_result(prediction_probs[0], intensity, entry['duration'], spectral_features)
+    
+    def create_incremental_analyzer(self):
+        """
+        Create an analyzer that extracts features while an upload streams in.
+        Returns None when no model is loaded, since the fallback detector
+        needs the whole signal, or when the model's feature set cannot be
+        computed incrementally.
+        """
+        if not self.model_loaded or not self.feature_set.incremental:
+            return None
+        
+        from services.streaming_analysis import IncrementalFeatureExtractor
+        return IncrementalFeatureExtractor(
+            sample_rate=self.sample_rate,
+            n_fft=self.n_fft,
+            hop_length=self.hop_length,
+            n_mfcc=self.n_mfcc,
+            feature_set=self.feature_set
+        )
+    
+    def create_live_analyzer(self, decoder):
+        """
+        Create a sliding-window analyzer for a live stream read through decoder.
+        Returns None when no model is loaded, or when the model's feature set
+        needs levels from the whole clip that a window cannot reproduce.
+        """
+        if not self.model_loaded or not self.feature_set.incremental:
+            return None
+        
+        from services.streaming_analysis import SlidingWindowFeatureExtractor
+        return SlidingWindowFeatureExtractor(
+            decoder,
+            sample_rate=self.sample_rate,
+            n_fft=self.n_fft,
+            hop_length=self.hop_length,
+            n_mfcc=self.n_mfcc,
+            window_frames=self.max_pad_len,
+            feature_set=self.feature_set
+        )
+    
+    def detect_emotion(self, audio_data):
+        """
+        Analyze raw audio bytes without saving them to disk
+        """
+        return self.analyze_audio(audio_data)
+    
+    def analyze_batch(self, audio_sources, max_workers=None):
+        """
+        Analyze several audio files or buffers with a single model call.
+        
+        Feature extraction runs in a thread pool, then all feature rows are
+        stacked into one matrix for a vectorized predict_proba. Returns one
+        result per source, in order; failures are reported per item.
+        """
+        audio_sources = list(audio_sources)
+        if not audio_sources:
+            return []
+        
+        workers = max_workers or min(len(audio_sources), self.batch_workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            prepared = list(executor.map(self._prepare_batch_item, audio_sources))
+        
+        # Classify every successfully extracted item in one call
+        ready = [i for i, item in enumerate(prepared) if 'features' in item]
+        if ready and self.model_loaded:
+            matrix = np.vstack([prepared[i]['features'] for i in ready])
+            prediction_probs = self.model.predict_proba(matrix)
             
-            # Get predicted emotion
-            predicted_class = np.argmax(prediction_probs[0])
-            confidence = float(prediction_probs[0][predicted_class])
+            for row, i in enumerate(ready):
+                item = prepared[i]
+                prepared[i] = {
+                    'status': 'success',
+                    'emotion': self._build_model_result(
+                        prediction_probs[row],
+                        item['intensity'],
+                        item['duration'],
+                        item['spectral_features']
+                    )
+                }
+        
+        return [plain_result(dict(item, index=i)) for i, item in enumerate(prepared)]
+    
+    def _prepare_batch_item(self, audio_source):
+        """
+        Extract everything needed to classify one batch item
+        """
+        entry = self._get_features(audio_source)
+        if entry is None:
+            return {'status': 'error', 'message': 'Could not extract audio features'}
+        
+        if not self.model_loaded:
+            return {
+                'status': 'success',
+                'emotion': self.enhanced_fallback_emotion_detection(entry)
+            }
+        
+        spectral_features = self._spectral_summary(entry)
+        return {
+            'features': entry['features'].reshape(1, -1),
+            'duration': entry['duration'],
+            'spectral_features': spectral_features,
+            'intensity': self.calculate_enhanced_intensity(None, spectral_features, energy_stats=entry)
+        }
+    
+    def feature_params(self):
+        """
+        Parameters that determine extracted features, used as the cache fingerprint
+        """
+        params = feature_extraction.feature_schema(self.feature_set)
+        if not self.model_loaded:
+            # Fallback entries also hold the fallback detector's statistics
+            params = dict(params, fallback_stats=FALLBACK_STATS_VERSION)
+        return params
+    
+    def _get_features(self, audio_source):
+        """
+        Get the MFCC matrix, spectral summary and energy statistics for audio,
+        reading them from the feature cache when the same audio was seen before
+        """
+        try:
+            cache_key = None
+            if self.feature_cache is not None:
+                # Hash file-like objects by content, so read them once up front
+                if hasattr(audio_source, 'read'):
+                    audio_source = audio_source.read()
+                
+                cache_key = self.feature_cache.make_key(audio_source, self.feature_params())
+                entry = self.feature_cache.get(cache_key)
+                if entry is not None:
+                    return entry
             
-            # Get secondary emotion
-            prediction_probs_copy = prediction_probs[0].copy()
-            prediction_probs_copy[predicted_class] = -1  # Exclude primary emotion
-            secondary_class = np.argmax(prediction_probs_copy)
-            secondary_confidence = float(prediction_probs[0][secondary_class])
+            context = self._get_analysis_context(audio_source)
+            features, duration, spectral_features = self.extract_features(context)
+            if features is None:
+                return None
             
-            # Calculate intensity based on audio energy and spectral features
-            intensity = self.calculate_enhanced_intensity(audio_path, spectral_features)
+            entry = dict(spectral_features, features=features.reshape(-1), duration=duration)
+            entry.update(self._energy_stats(context))
+            if not self.model_loaded:
+                entry.update(self._fallback_stats(context))
             
-            # Apply confidence boosting based on spectral features
-            confidence = self._adjust_confidence(confidence, self.emotions[predicted_class], spectral_features)
-            secondary_confidence = self._adjust_confidence(secondary_confidence, self.emotions[secondary_class], spectral_features)
+            if cache_key is not None:
+                self.feature_cache.put(cache_key, entry)
             
-            return {
-                'primary_emotion': self.emotions[predicted_class],
-                'secondary_emotion': self.emotions[secondary_class],
-                'confidence': confidence,
-                'secondary_confidence': secondary_confidence,
-                'intensity': intensity,
-                'duration': duration,
-                'spectral_features': spectral_features
-            }
-        else:
-            # Enhanced fallback method using audio features
-            return self.enhanced_fallback_emotion_detection(audio_path, features, duration, spectral_features)
+            return entry
+        
+        except Exception as e:
+            print(f"Error getting audio features: {e}")
+            return None
+    
+    def _spectral_summary(self, entry):
+        """
+        Pick the spectral summary out of a feature entry
+        """
+        return {
+            'spectral_centroid': entry['spectral_centroid'],
+            'spectral_contrast': entry['spectral_contrast'],
+            'spectral_rolloff': entry['spectral_rolloff']
+        }
+    
+    def _build_model_result(self, probabilities, intensity, duration, spectral_features):
+        """
+        Turn one row of class probabilities into an emotion result
+        """
+        # Get predicted emotion
+        predicted_class = np.argmax(probabilities)
+        confidence = float(probabilities[predicted_class])
+        
+        # Get secondary emotion
+        probabilities_copy = probabilities.copy()
+        probabilities_copy[predicted_class] = -1  # Exclude primary emotion
+        secondary_class = np.argmax(probabilities_copy)
+        secondary_confidence = float(probabilities[secondary_class])
+        
+        # Apply confidence boosting based on spectral features
+        confidence = self._adjust_confidence(confidence, self.labels[predicted_class], spectral_features)
+        secondary_confidence = self._adjust_confidence(secondary_confidence, self.labels[secondary_class], spectral_features)
+        
+        return plain_result({
+            'primary_emotion': self.labels[predicted_class],
+            'secondary_emotion': self.labels[secondary_class],
+            'confidence': confidence,
+            'secondary_confidence': secondary_confidence,
+            'intensity': intensity,
+            'duration': duration,
+            'spectral_features': spectral_features
+        })
     
     def _adjust_confidence(self, confidence, emotion, spectral_features):
         """
@@ -166,46 +469,55 @@ class EmotionDetectionService:
         
         return confidence
     
-    def enhanced_fallback_emotion_detection(self, audio_path, features, duration, spectral_features):
+    def _fallback_stats(self, context):
         """
-        Enhanced fallback method for emotion detection when model is not available
-        Uses advanced audio features to estimate emotions
+        Statistics of the full signal used by the fallback detector
         """
-        try:
-            # Load audio
-            y, sr = librosa.load(audio_path, sr=self.sample_rate)
-            
-            # Extract additional features
+        return {
             # Chroma features - related to the 12 different pitch classes
-            chroma = librosa.feature.chroma_stft(y=y, sr=sr).mean()
-            
+            'chroma_mean': float(context.chroma().mean()),
             # Mel spectrogram
-            mel = librosa.feature.melspectrogram(y=y, sr=sr)
-            mel_mean = mel.mean()
-            mel_std = mel.std()
-            
-            # RMS energy - volume/intensity
-            rms = librosa.feature.rms(y=y).mean()
-            
+            'mel_mean': float(context.mel.mean()),
+            'mel_std': float(context.mel.std()),
             # Zero crossing rate - noisiness
-            zcr = librosa.feature.zero_crossing_rate(y).mean()
-            
+            'zcr_mean': float(context.zero_crossing_rate().mean()),
             # Tempo
-            tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+            'tempo': context.tempo()
+        }
+    
+    def enhanced_fallback_emotion_detection(self, entry):
+        """
+        Enhanced fallback method for emotion detection when model is not available
+        Uses advanced audio features (a feature entry with the fallback's
+        statistics, see _get_features) to estimate emotions
+        """
+        duration = entry.get('duration', 0)
+        
+        try:
+            spectral_features = self._spectral_summary(entry)
+            
+            chroma = entry['chroma_mean']
+            mel_mean = entry['mel_mean']
+            mel_std = entry['mel_std']
+            # RMS energy - volume/intensity
+            rms = entry['rms']
+            zcr = entry['zcr_mean']
+            tempo = entry['tempo']
             
             # Normalize values
             rms_norm = min(rms * 10, 1.0)  # Energy
             tempo_norm = min(tempo / 180.0, 1.0)  # Tempo
             zcr_norm = min(zcr * 100, 1.0)  # Noisiness
             
-            # Enhanced scoring system with additional features
+            # Enhanced scoring system with additional features; chroma is
+            # averaged over pitch classes and frames, so its spread is zero
             scores = {
                 'Anger': rms_norm * 0.6 + zcr_norm * 0.2 + spectral_features['spectral_contrast'] * 0.2,
-                'Joy': rms_norm * 0.4 + tempo_norm * 0.3 + chroma.mean() * 0.3,
+                'Joy': rms_norm * 0.4 + tempo_norm * 0.3 + chroma * 0.3,
                 'Sadness': (1 - rms_norm) * 0.5 + (1 - tempo_norm) * 0.3 + (1 - mel_mean) * 0.2,
                 'Fear': zcr_norm * 0.4 + (1 - rms_norm) * 0.3 + spectral_features['spectral_rolloff'] * 0.3,
                 'Surprise': zcr_norm * 0.5 + tempo_norm * 0.3 + mel_std * 0.2,
-                'Disgust': (1 - zcr_norm) * 0.4 + spectral_features['spectral_centroid'] * 0.4 + (1 - chroma.std()) * 0.2,
+                'Disgust': (1 - zcr_norm) * 0.4 + spectral_features['spectral_centroid'] * 0.4 + 0.2,
                 'Calm': (1 - zcr_norm) * 0.6 + (1 - rms_norm) * 0.2 + (1 - spectral_features['spectral_contrast']) * 0.2
             }
             
@@ -215,9 +527,9 @@ class EmotionDetectionService:
             secondary_emotion = sorted_emotions[1][0]
             
             # Calculate enhanced intensity
-            intensity = self.calculate_enhanced_intensity(audio_path, spectral_features)
+            intensity = self.calculate_enhanced_intensity(None, spectral_features, energy_stats=entry)
             
-            return {
+            return plain_result({
                 'primary_emotion': primary_emotion,
                 'secondary_emotion': secondary_emotion,
                 'confidence': sorted_emotions[0][1],
@@ -225,34 +537,29 @@ class EmotionDetectionService:
                 'intensity': intensity,
                 'duration': duration,
                 'spectral_features': spectral_features
-            }
+            })
         
         except Exception as e:
             print(f"Error in enhanced fallback emotion detection: {e}")
-            return {
+            return plain_result({
                 'primary_emotion': 'Calm',
                 'confidence': 0.5,
                 'intensity': 0.5,
                 'duration': duration
-            }
+            })
     
-    def calculate_enhanced_intensity(self, audio_path, spectral_features=None):
+    def calculate_enhanced_intensity(self, audio_path, spectral_features=None, energy_stats=None):
         """
-        Calculate emotional intensity based on audio energy and spectral features
+        Calculate emotional intensity based on audio energy and spectral features.
+        Precomputed energy statistics (e.g. from the feature cache) skip decoding.
         """
         try:
-            # Load audio
-            y, sr = librosa.load(audio_path, sr=self.sample_rate)
-            
-            # Calculate RMS energy
-            rms = librosa.feature.rms(y=y).mean()
+            if energy_stats is None:
+                energy_stats = self._energy_stats(self._get_analysis_context(audio_path))
             
-            # Calculate onset strength - related to the strength of onsets/beats
-            onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-            onset_mean = onset_env.mean()
-            
-            # Calculate dynamic range
-            dynamic_range = np.abs(y).max() - np.abs(y).min()
+            rms = energy_stats['rms']
+            onset_mean = energy_stats['onset_mean']
+            dynamic_range = energy_stats['dynamic_range']
             
             # Combine features for intensity calculation
             base_intensity = min(rms * 10, 1.0)
@@ -282,4 +589,17 @@ class EmotionDetectionService:
         
         except Exception as e:
             print(f"Error calculating enhanced intensity: {e}")
-            return 0.5
\ No newline at end of file
+            return 0.5
+    
+    def _energy_stats(self, context):
+        """
+        Energy statistics of the full signal used for intensity
+        """
+        return {
+            # RMS energy
+            'rms': float(context.rms().mean()),
+            # Onset strength - related to the strength of onsets/beats
+            'onset_mean': float(context.onset_envelope.mean()),
+            # Dynamic range
+            'dynamic_range': float(context.dynamic_range())
+        }
@@ -0,0 +1,183 @@
+import os
+import json
+import hashlib
+import threading
+import tempfile
+from collections import OrderedDict
+import numpy as np
+
+# Default size limit of the on-disk layer
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+
+class FeatureCache:
+    def __init__(self, cache_dir, max_memory_bytes=64 * 1024 * 1024, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        """
+        Initialize a content-addressed cache of extracted audio features.
+        
+        Entries are dicts of NumPy arrays (scalars are stored as 0-d arrays)
+        keyed by the SHA-256 of the audio bytes plus the feature parameters.
+        An in-memory LRU bounded by max_memory_bytes sits in front of .npz
+        files on disk, which are shared by every process using cache_dir.
+        When the files exceed max_disk_bytes, the least recently used ones
+        are deleted until they fill about 90% of it.
+        """
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        # Estimate of the disk layer's size; other processes write to it too,
+        # so it is recounted from the files whenever it crosses the limit
+        self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+    
+    def make_key(self, audio_source, params):
+        """
+        Build a cache key from audio bytes (or a file path) and feature parameters
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+        
+        if isinstance(audio_source, (bytes, bytearray)):
+            digest.update(audio_source)
+        else:
+            with open(audio_source, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+        
+        return digest.hexdigest()
+    
+    def get(self, key):
+        """
+        Get a cached entry, checking memory first and then disk
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        
+        try:
+            with np.load(path) as data:
+                entry = {name: self._unwrap(data[name]) for name in data.files}
+            # The modification time orders files for eviction
+            os.utime(path)
+        except Exception as e:
+            print(f"Error reading feature cache entry {key}: {e}")
+            return None
+        
+        self._remember(key, entry)
+        return entry
+    
+    def put(self, key, entry):
+        """
+        Store an entry in memory and on disk
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        # Write to a temporary file and rename so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **{name: np.asarray(value) for name, value in entry.items()})
+            os.replace(tmp_path, path)
+            self._track_disk(os.path.getsize(path))
+        except Exception as e:
+            print(f"Error writing feature cache entry {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        
+        self._remember(key, entry)
+    
+    def _track_disk(self, size):
+        """
+        Count a newly written file, evicting old files once over the limit
+        """
+        with self._lock:
+            self._disk_bytes += size
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+        
+        self._evict_disk()
+    
+    def _evict_disk(self):
+        """
+        Delete the least recently used files until the disk layer is back
+        under 90% of max_disk_bytes
+        """
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_disk_bytes * 0.9)
+        
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Already evicted by another process
+                pass
+            except OSError:
+                continue
+            total -= size
+        
+        with self._lock:
+            self._disk_bytes = total
+    
+    def _disk_entries(self):
+        """
+        List (mtime, size, path) for every file in the disk layer
+        """
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.npz'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+    
+    def _remember(self, key, entry):
+        """
+        Add an entry to the memory layer, evicting least recently used entries
+        """
+        size = sum(np.asarray(value).nbytes for value in entry.values())
+        if size > self.max_memory_bytes:
+            return
+        
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            
+            self._memory[key] = entry
+            self._memory_bytes += size
+            
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= sum(np.asarray(value).nbytes for value in evicted.values())
+    
+    def _path(self, key):
+        """
+        Get the on-disk path for a key, sharded by its first two characters
+        """
+        return os.path.join(self.cache_dir, key[:2], f'{key}.npz')
+    
+    def _unwrap(self, value):
+        """
+        Convert 0-d arrays back to Python scalars
+        """
+        return value.item() if value.ndim == 0 else value
@@ -0,0 +1,109 @@
+import json
+import hashlib
+
+from services.feature_sets import normalize_rows
+
+# Feature extraction shared by train_model.py and EmotionDetectionService,
+# so a model is always served the features it was trained on
+
+# Bump when per-frame features change meaning without a parameter changing;
+# models trained under another version are rejected when they load
+FEATURE_SCHEMA_VERSION = 1
+
+# Emotions in class index order; models trained before labels were recorded assume it
+EMOTIONS = ['Anger', 'Disgust', 'Fear', 'Joy', 'Sadness', 'Surprise', 'Calm']
+
+# Analysis parameters of both training and serving
+SAMPLE_RATE = 22050
+N_FFT = 2048
+HOP_LENGTH = 512
+TOP_DB = 25
+N_MFCC = 13
+MAX_PAD_LEN = 174
+
+# Spectral descriptors summarized for confidence adjustment and the fallback detector
+SPECTRAL_FEATURES = ('spectral_centroid', 'spectral_contrast', 'spectral_rolloff')
+
+def analysis_context(audio_source):
+    """
+    Decode a path, file-like object or AudioAnalysisContext with the shared parameters
+    """
+    from services.audio_analysis import AudioAnalysisContext
+    
+    if isinstance(audio_source, AudioAnalysisContext):
+        return audio_source
+    
+    return AudioAnalysisContext(
+        audio_source,
+        sample_rate=SAMPLE_RATE,
+        n_fft=N_FFT,
+        hop_length=HOP_LENGTH,
+        top_db=TOP_DB
+    )
+
+def frame_features(context, n_mfcc=N_MFCC):
+    """
+    Raw per-frame MFCCs and spectral descriptors of the trimmed signal,
+    the input of every feature set
+    """
+    frames = {'mfcc': context.mfcc(n_mfcc=n_mfcc)}
+    frames.update((name, getattr(context, name)()) for name in SPECTRAL_FEATURES)
+    return frames
+
+def spectral_summary(frames):
+    """
+    Mean of each spectral descriptor after per-row normalization
+    """
+    return {name: float(normalize_rows(frames[name]).mean()) for name in SPECTRAL_FEATURES}
+
+def extract_features(context, feature_set):
+    """
+    Get (vector, duration, spectral summary) for an analysis context
+    """
+    frames = frame_features(context, feature_set.n_mfcc)
+    return feature_set.vector(frames), context.duration, spectral_summary(frames)
+
+def feature_schema(feature_set):
+    """
+    Describe the features a model is trained on: schema version, feature
+    set tag, vector dimension, parameters, and a fingerprint of all of them
+    """
+    params = dict(
+        feature_set.params(),
+        sample_rate=SAMPLE_RATE,
+        n_fft=N_FFT,
+        hop_length=HOP_LENGTH,
+        top_db=TOP_DB
+    )
+    payload = json.dumps([FEATURE_SCHEMA_VERSION, params], sort_keys=True)
+    
+    return {
+        'schema_version': FEATURE_SCHEMA_VERSION,
+        'feature_set': feature_set.tag,
+        'dimension': feature_set.dimension,
+        'params': params,
+        'fingerprint': hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    }
+
+def schema_mismatch(model_schema, expected, n_features):
+    """
+    Explain why a model does not match the expected feature schema, or
+    return None. Models without a recorded schema are checked by dimension.
+    """
+    if n_features != expected['dimension']:
+        return (f"model expects {n_features} features but {expected['feature_set']} "
+                f"produces {expected['dimension']}")
+    
+    if model_schema is None:
+        return None
+    
+    if model_schema.get('schema_version') != expected['schema_version']:
+        return (f"model was trained with feature schema version {model_schema.get('schema_version')}, "
+                f"this build extracts version {expected['schema_version']}")
+    
+    if model_schema.get('fingerprint') != expected['fingerprint']:
+        return (f"feature fingerprint {str(model_schema.get('fingerprint'))[:12]} does not match "
+                f"{expected['fingerprint'][:12]} (trained with {model_schema.get('params')}, "
+                f"serving {expected['params']})")
+    
+    return None
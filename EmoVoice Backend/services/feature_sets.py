@@ -0,0 +1,153 @@
+import numpy as np
+
+# Bands librosa.feature.spectral_contrast returns with its defaults (6 + 1)
+SPECTRAL_CONTRAST_BANDS = 7
+
+def normalize_rows(features):
+    """
+    Normalize each row to zero mean and unit variance
+    """
+    mean = features.mean(axis=1, keepdims=True)
+    std = features.std(axis=1, keepdims=True) + 1e-10  # Avoid division by zero
+    return (features - mean) / std
+
+class MfccMatrixFeatures:
+    name = 'mfcc_matrix'
+    version = 1
+    
+    # Per-coefficient normalization hides the small level differences of
+    # IncrementalFeatureExtractor, so uploads can be analyzed as they stream
+    incremental = True
+    
+    def __init__(self, n_mfcc=13, max_pad_len=174):
+        """
+        The MFCC matrix of the first max_pad_len frames, normalized per
+        coefficient, zero-padded and flattened. Values are tied to frame
+        positions and anything after max_pad_len frames is dropped.
+        """
+        self.n_mfcc = n_mfcc
+        self.max_pad_len = max_pad_len
+    
+    @property
+    def tag(self):
+        return f'{self.name}-v{self.version}'
+    
+    @property
+    def dimension(self):
+        return self.n_mfcc * self.max_pad_len
+    
+    def params(self):
+        """
+        Parameters that determine the vector, used in cache keys
+        """
+        return {'feature_set': self.tag, 'n_mfcc': self.n_mfcc, 'max_pad_len': self.max_pad_len}
+    
+    def vector(self, frames):
+        """
+        Build the feature vector from per-frame features of the trimmed
+        signal. frames may carry 'mfcc_normalized', MFCCs the caller already
+        normalized (e.g. with running statistics of a live stream).
+        """
+        mfccs = frames.get('mfcc_normalized')
+        if mfccs is None:
+            mfccs = normalize_rows(frames['mfcc'])
+        
+        # Pad or truncate to fixed length
+        pad_width = self.max_pad_len - mfccs.shape[1]
+        if pad_width > 0:
+            mfccs = np.pad(mfccs, pad_width=((0, 0), (0, pad_width)), mode='constant')
+        else:
+            mfccs = mfccs[:, :self.max_pad_len]
+        
+        return mfccs.reshape(-1)
+
+class PooledStatsFeatures:
+    name = 'pooled_stats'
+    version = 1
+    
+    # Raw MFCC levels depend on clipping the whole clip's log-mel, which
+    # IncrementalFeatureExtractor cannot do; uploads are analyzed from the file
+    incremental = False
+    
+    # Statistics pooled over time for every row, in vector order
+    PERCENTILES = (10, 50, 90)
+    
+    def __init__(self, n_mfcc=13):
+        """
+        Per-coefficient statistics pooled over the whole recording: mean,
+        standard deviation and percentiles of the MFCCs, their frame-to-frame
+        deltas, spectral centroid, contrast and rolloff. The vector has a
+        fixed, small size whatever the recording length, and no part of the
+        recording is dropped.
+        """
+        self.n_mfcc = n_mfcc
+    
+    @property
+    def tag(self):
+        return f'{self.name}-v{self.version}'
+    
+    @property
+    def dimension(self):
+        rows = 2 * self.n_mfcc + SPECTRAL_CONTRAST_BANDS + 2
+        return rows * (2 + len(self.PERCENTILES))
+    
+    def params(self):
+        """
+        Parameters that determine the vector, used in cache keys
+        """
+        return {'feature_set': self.tag, 'n_mfcc': self.n_mfcc, 'percentiles': list(self.PERCENTILES)}
+    
+    def vector(self, frames):
+        """
+        Build the feature vector from raw per-frame features of the trimmed signal
+        """
+        mfcc = np.asarray(frames['mfcc'], dtype=np.float64)
+        if mfcc.shape[1] == 0:
+            return np.zeros(self.dimension)
+        
+        deltas = np.diff(mfcc, axis=1) if mfcc.shape[1] > 1 else np.zeros_like(mfcc)
+        blocks = [
+            mfcc,
+            deltas,
+            np.asarray(frames['spectral_centroid'], dtype=np.float64),
+            np.asarray(frames['spectral_contrast'], dtype=np.float64),
+            np.asarray(frames['spectral_rolloff'], dtype=np.float64)
+        ]
+        
+        return np.concatenate([self._pool(block) for block in blocks])
+    
+    def _pool(self, block):
+        """
+        Statistics of each row of a (rows, frames) block, statistic-major
+        """
+        return np.concatenate([
+            block.mean(axis=1),
+            block.std(axis=1),
+            np.percentile(block, self.PERCENTILES, axis=1).reshape(-1)
+        ])
+
+# Feature sets by name; models record the tag ('<name>-v<version>') they were trained with
+FEATURE_SETS = {
+    MfccMatrixFeatures.name: MfccMatrixFeatures,
+    PooledStatsFeatures.name: PooledStatsFeatures
+}
+DEFAULT_FEATURE_SET = MfccMatrixFeatures.name
+
+def create_feature_set(name=DEFAULT_FEATURE_SET, n_mfcc=13, max_pad_len=174):
+    """
+    Create a feature set by name or tag, raising ValueError for an unknown
+    set or a version this code cannot compute
+    """
+    name, _, version = name.partition('-v')
+    if name not in FEATURE_SETS:
+        raise ValueError(f'Unknown feature set: {name}')
+    
+    feature_set_class = FEATURE_SETS[name]
+    if version and version != str(feature_set_class.version):
+        raise ValueError(
+            f'Feature set {name} version {version} is not supported (this build computes version {feature_set_class.version})'
+        )
+    
+    if feature_set_class is MfccMatrixFeatures:
+        return MfccMatrixFeatures(n_mfcc=n_mfcc, max_pad_len=max_pad_len)
+    return feature_set_class(n_mfcc=n_mfcc)
@@ -0,0 +1,149 @@
+import json
+import numpy as np
+
+# Attributes train_model.py records on the model that travel with the export
+MODEL_METADATA = ('feature_set_', 'feature_schema_', 'labels_')
+
+class FlatForest:
+    def __init__(self, feature, threshold, left, right, value, roots, depth, classes, n_features,
+                 metadata=None):
+        """
+        A random forest flattened into contiguous arrays.
+        
+        Node i of every tree lives at the same index in feature, threshold,
+        left, right and value (per-class probabilities). roots holds the
+        first node of each tree and leaves point at themselves. Every
+        (row, tree) walk advances one level per NumPy step until all reach a
+        leaf, with no per-tree Python loop and none of scikit-learn's
+        per-call overhead. metadata holds the MODEL_METADATA attributes of
+        the original model (feature schema and class labels).
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features)
+        self.is_leaf = left == np.arange(len(left))
+        self.metadata = dict(metadata or {})
+        for name in MODEL_METADATA:
+            setattr(self, name, self.metadata.get(name))
+    
+    @classmethod
+    def from_sklearn(cls, forest):
+        """
+        Flatten a fitted scikit-learn RandomForestClassifier
+        """
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left < 0
+            
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            
+            # Leaf class counts (or weighted fractions) as probabilities, as predict_proba does
+            value = tree.value[:, 0, :]
+            totals = value.sum(axis=1, keepdims=True)
+            values.append(value / np.where(totals == 0, 1, totals))
+            
+            roots.append(offset)
+            offset += tree.node_count
+        
+        return cls(
+            np.concatenate(features).astype(np.int32),
+            np.concatenate(thresholds).astype(np.float64),
+            np.concatenate(lefts).astype(np.int32),
+            np.concatenate(rights).astype(np.int32),
+            np.concatenate(values).astype(np.float64),
+            np.array(roots, dtype=np.int32),
+            max(estimator.tree_.max_depth for estimator in forest.estimators_),
+            np.asarray(forest.classes_),
+            forest.n_features_in_,
+            {name: getattr(forest, name) for name in MODEL_METADATA if getattr(forest, name, None) is not None}
+        )
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Load a forest saved by save
+        """
+        with np.load(path) as arrays:
+            if 'metadata' in arrays.files:
+                metadata = json.loads(str(arrays['metadata']))
+            elif 'feature_set' in arrays.files:
+                # Exports that recorded only the feature set tag
+                metadata = {'feature_set_': str(arrays['feature_set'])}
+            else:
+                metadata = None
+            
+            return cls(
+                arrays['feature'], arrays['threshold'], arrays['left'], arrays['right'],
+                arrays['value'], arrays['roots'], arrays['depth'], arrays['classes'],
+                arrays['n_features'], metadata
+            )
+    
+    def save(self, path):
+        """
+        Save the arrays as an uncompressed .npz file
+        """
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            depth=np.array(self.depth),
+            classes=self.classes_,
+            n_features=np.array(self.n_features_in_),
+            metadata=np.array(json.dumps(self.metadata))
+        )
+    
+    def apply(self, X):
+        """
+        Leaf index reached in every tree by every row, shape (rows, trees)
+        """
+        # scikit-learn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f'X has {X.shape[1]} features, but the forest expects {self.n_features_in_}')
+        
+        # One walk per (row, tree); only walks that have not reached a leaf advance
+        n_trees = len(self.roots)
+        nodes = np.tile(self.roots, X.shape[0])
+        walk_rows = np.repeat(np.arange(X.shape[0]), n_trees)
+        active = np.arange(len(nodes))
+        for _ in range(self.depth):
+            current = nodes[active]
+            go_left = X[walk_rows[active], self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            
+            active = active[~self.is_leaf[current]]
+            if len(active) == 0:
+                break
+        
+        return nodes.reshape(X.shape[0], n_trees)
+    
+    def predict_proba(self, X):
+        """
+        Class probabilities averaged over the trees, shape (rows, classes)
+        """
+        return self.value[self.apply(X)].mean(axis=1)
+    
+    def predict(self, X):
+        """
+        Most probable class of each row
+        """
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -3,6 +3,26 @@ import uuid
 import datetime
 import json
 from collections import Counter
+from services import emotion_aggregation
+from services.database_service import utc_timestamp
+
+# Columns read for the per-recording emotion sequence; counts come from the rollup
+TIMELINE_COLUMNS = ('recorded_at', 'primary_emotion')
+
+# Parts of the day used for time-of-day insights
+DAY_PERIODS = [
+    ('morning', range(5, 12)),
+    ('afternoon', range(12, 18)),
+    ('evening', range(18, 22)),
+    ('night', range(22, 24))
+]
+
+# Incremental emotion counts lose half their weight after this many days,
+# so the dominant emotion reflects roughly the last month
+INSIGHT_DECAY_HALF_LIFE_DAYS = 30
+
+# Timeline entries kept for the A-B-A pattern detector
+RECENT_TIMELINE_LENGTH = 3
 
 class InsightService:
     def __init__(self, database_service):
@@ -15,110 +35,43 @@ class InsightService:
         """
         Generate insights for a user based on their emotion data
         """
-        # Get emotions for the user
-        emotions = self.db_service.get_emotions(user_id, time_range='month')
+        # Monthly counts from the daily rollup rather than every raw emotion row
+        rollup = self.db_service.get_emotion_rollup(user_id, time_range='month')
         
-        if not emotions:
+        if not rollup:
             return {
                 'status': 'error',
                 'message': 'No emotion data found'
             }
         
-        # Get recordings for the user
-        recordings = self.db_service.get_recordings(user_id)
-        
-        # Create a mapping of recording_id to recording data
-        recording_map = {r['id']: r for r in recordings}
+        emotion_counts, _, _ = emotion_aggregation.summarize_rollup(rollup)
         
-        # Process emotion data
-        emotion_counts = Counter()
-        emotion_timeline = []
-        
-        for emotion in emotions:
-            primary_emotion = emotion['primary_emotion']
-            recording_id = emotion['recording_id']
-            
-            # Count emotions
-            emotion_counts[primary_emotion] += 1
-            
-            # Add to timeline if we have the recording
-            if recording_id in recording_map:
-                recording = recording_map[recording_id]
-                emotion_timeline.append({
-                    'timestamp': recording['created_at'],
-                    'emotion': primary_emotion,
-                    'intensity': emotion['intensity'],
-                    'confidence': emotion['primary_confidence'],
-                    'recording_id': recording_id
-                })
-        
-        # Sort timeline by timestamp
-        emotion_timeline.sort(key=lambda x: x['timestamp'])
+        # The A-B-A pattern and time-of-day insights depend on the order and
+        # hour of individual recordings, which the daily rollup does not keep,
+        # so they read the per-recording sequence (time and emotion only)
+        rows = list(self.db_service.iter_emotion_timeline(user_id, time_range='month', columns=TIMELINE_COLUMNS))
+        timestamps = [row.recorded_at for row in rows]
+        emotions = [row.primary_emotion for row in rows]
         
         # Generate insights
         insights = []
         
-        # Dominant emotion insight
+        # Dominant emotion insight (counts are ordered most frequent first)
         if emotion_counts:
-            dominant_emotion = emotion_counts.most_common(1)[0][0]
-            insights.append(self._create_insight(
-                user_id,
-                f"Your dominant emotion is {dominant_emotion}",
-                f"Over the past month, you've experienced {dominant_emotion} more than any other emotion. " +
-                self._get_emotion_tip(dominant_emotion),
-                'pattern'
-            ))
+            dominant_emotion = next(iter(emotion_counts))
+            insights.append(self._dominant_emotion_insight(user_id, dominant_emotion))
         
-        # Emotion pattern insights
-        if len(emotion_timeline) >= 3:
-            # Check for repeated patterns
-            for i in range(len(emotion_timeline) - 2):
-                if (emotion_timeline[i]['emotion'] == emotion_timeline[i+2]['emotion'] and
-                    emotion_timeline[i]['emotion'] != emotion_timeline[i+1]['emotion']):
-                    pattern_emotion = emotion_timeline[i]['emotion']
-                    trigger_emotion = emotion_timeline[i+1]['emotion']
-                    insights.append(self._create_insight(
-                        user_id,
-                        f"{trigger_emotion} often leads back to {pattern_emotion}",
-                        f"We've noticed that when you experience {trigger_emotion}, you often return to {pattern_emotion} afterward. " +
-                        f"This could indicate a recurring emotional pattern worth exploring.",
-                        'pattern'
-                    ))
-                    break
-        
-        # Time-based insights
-        if len(emotion_timeline) >= 5:
-            # Convert timestamps to datetime objects
-            for entry in emotion_timeline:
-                entry['datetime'] = datetime.datetime.fromisoformat(entry['timestamp'])
-            
-            # Group by hour of day
-            hour_emotions = {}
-            for entry in emotion_timeline:
-                hour = entry['datetime'].hour
-                if hour not in hour_emotions:
-                    hour_emotions[hour] = []
-                hour_emotions[hour].append(entry['emotion'])
-            
-            # Find dominant emotions by time of day
-            for period, hours in [('morning', range(5, 12)), ('afternoon', range(12, 18)), 
-                                 ('evening', range(18, 22)), ('night', range(22, 24))]:
-                period_emotions = []
-                for hour in hours:
-                    if hour in hour_emotions:
-                        period_emotions.extend(hour_emotions[hour])
-                
-                if period_emotions:
-                    period_counter = Counter(period_emotions)
-                    dominant = period_counter.most_common(1)[0][0]
-                    
-                    insights.append(self._create_insight(
-                        user_id,
-                        f"You tend to feel {dominant} in the {period}",
-                        f"Based on your emotional patterns, you most often experience {dominant} during the {period}. " +
-                        self._get_time_tip(period, dominant),
-                        'pattern'
-                    ))
+        # Emotion pattern insights: the first A-B-A sequence in the timeline
+        pattern = emotion_aggregation.find_return_pattern(emotions)
+        if pattern:
+            pattern_emotion, trigger_emotion = pattern
+            insights.append(self._pattern_insight(user_id, pattern_emotion, trigger_emotion))
+        
+        # Time-based insights: dominant emotion per part of the day
+        if len(emotions) >= 5:
+            by_period = emotion_aggregation.dominant_by_period(timestamps, emotions, DAY_PERIODS)
+            for period, dominant in by_period.items():
+                insights.append(self._time_of_day_insight(user_id, period, dominant))
         
         # Save insights to database
         for insight in insights:
@@ -129,13 +82,170 @@ class InsightService:
             'insights': insights
         }
     
-    def get_insights(self, user_id, unread_only=False):
+    def generate_insights_from_recording(self, user_id, recording_id):
+        """
+        Update a user's insights with one newly analyzed recording.
+        
+        Per-user state (decayed emotion counts, hour-of-day histograms and the
+        last few timeline entries) is updated in constant time, and only
+        insights that are new or whose conclusion changed are saved, so the
+        cost does not grow with the user's history. The state is built from
+        the past month of recordings the first time a user is seen.
+        """
+        emotion = self.db_service.get_emotion_for_recording(recording_id)
+        if not emotion:
+            return {
+                'status': 'error',
+                'message': 'No emotion data found for the recording'
+            }
+        
+        entry = {
+            'recording_id': recording_id,
+            'emotion': emotion['primary_emotion'],
+            'timestamp': emotion['recorded_at']
+        }
+        
+        # Read history outside the state transaction, and only for new users
+        history = None
+        if self.db_service.get_insight_state(user_id) is None:
+            history = self._load_timeline(user_id)
+        
+        def update(state):
+            if state is None:
+                state = self._new_state()
+                for past_entry in history or []:
+                    self._apply_entry(state, past_entry)
+            
+            self._apply_entry(state, entry)
+            return state, self._evaluate_state(user_id, state, entry)
+        
+        insights = self.db_service.update_insight_state(user_id, update)
+        
+        return {
+            'status': 'success',
+            'insights': insights
+        }
+    
+    def _load_timeline(self, user_id):
+        """
+        Get the past month of emotions as timeline entries, oldest first
+        """
+        return [{
+            'recording_id': row.recording_id,
+            'emotion': row.primary_emotion,
+            'timestamp': row.recorded_at
+        } for row in self.db_service.iter_emotion_timeline(
+            user_id,
+            time_range='month',
+            columns=('recording_id', 'primary_emotion', 'recorded_at')
+        )]
+    
+    def _new_state(self):
+        """
+        Empty incremental insight state
+        """
+        return {
+            'counts': {},
+            'hours': {},
+            'total': 0,
+            'recent': [],
+            'last_timestamp': None,
+            'emitted': {}
+        }
+    
+    def _apply_entry(self, state, entry):
+        """
+        Add one timeline entry to the state; entries already applied are ignored
+        """
+        if any(r['recording_id'] == entry['recording_id'] for r in state['recent']):
+            return
+        
+        # Decay older observations by the time elapsed since the last one
+        timestamp = datetime.datetime.fromisoformat(entry['timestamp'])
+        if state['last_timestamp']:
+            elapsed = timestamp - datetime.datetime.fromisoformat(state['last_timestamp'])
+            days = max(elapsed.total_seconds(), 0) / 86400.0
+            decay = 0.5 ** (days / INSIGHT_DECAY_HALF_LIFE_DAYS)
+            if decay < 1:
+                for emotion in state['counts']:
+                    state['counts'][emotion] *= decay
+                for histogram in state['hours'].values():
+                    for emotion in histogram:
+                        histogram[emotion] *= decay
+        
+        emotion = entry['emotion']
+        state['counts'][emotion] = state['counts'].get(emotion, 0) + 1
+        
+        histogram = state['hours'].setdefault(str(timestamp.hour), {})
+        histogram[emotion] = histogram.get(emotion, 0) + 1
+        
+        state['total'] += 1
+        state['last_timestamp'] = max(entry['timestamp'], state['last_timestamp'] or '')
+        state['recent'] = (state['recent'] + [{
+            'recording_id': entry['recording_id'],
+            'emotion': emotion
+        }])[-RECENT_TIMELINE_LENGTH:]
+    
+    def _evaluate_state(self, user_id, state, entry):
+        """
+        Create the insights the state supports that have not been emitted yet.
+        Each insight has a key and a fingerprint of its conclusion; it is only
+        emitted again when the conclusion for its key changes.
+        """
+        candidates = []
+        
+        # Dominant emotion insight
+        if state['counts']:
+            dominant_emotion = max(state['counts'].items(), key=lambda x: x[1])[0]
+            candidates.append(('dominant', dominant_emotion, self._dominant_emotion_insight(user_id, dominant_emotion)))
+        
+        # A-B-A pattern over the latest timeline entries
+        recent = [r['emotion'] for r in state['recent']]
+        if len(recent) == RECENT_TIMELINE_LENGTH and recent[0] == recent[2] and recent[0] != recent[1]:
+            pattern_emotion, trigger_emotion = recent[0], recent[1]
+            candidates.append((
+                f'pattern:{trigger_emotion}:{pattern_emotion}',
+                'seen',
+                self._pattern_insight(user_id, pattern_emotion, trigger_emotion)
+            ))
+        
+        # Time-based insight for the part of the day of the new recording
+        if state['total'] >= 5:
+            hour = datetime.datetime.fromisoformat(entry['timestamp']).hour
+            for period, hours in DAY_PERIODS:
+                if hour not in hours:
+                    continue
+                
+                period_counts = Counter()
+                for h in hours:
+                    period_counts.update(state['hours'].get(str(h), {}))
+                
+                if period_counts:
+                    dominant = max(period_counts.items(), key=lambda x: x[1])[0]
+                    candidates.append((f'time:{period}', dominant, self._time_of_day_insight(user_id, period, dominant)))
+                break
+        
+        insights = []
+        for key, fingerprint, insight in candidates:
+            if state['emitted'].get(key) != fingerprint:
+                state['emitted'][key] = fingerprint
+                insights.append(insight)
+        
+        return insights
+    
+    def get_insights(self, user_id, unread_only=False, category=None, limit=50):
         """
         Get insights for a user
         """
-        insights = self.db_service.get_insights(user_id, unread_only)
+        insights = self.db_service.get_insights(user_id, unread_only, limit, category)
         return insights
     
+    def page_insights(self, user_id, unread_only=False, category=None, limit=50, cursor=None):
+        """
+        Get a page of insights for a user; returns (insights, next_cursor)
+        """
+        return self.db_service.page_insights(user_id, unread_only, category, limit, cursor)
+    
     def mark_insight_read(self, insight_id):
         """
         Mark an insight as read
@@ -152,10 +262,46 @@ class InsightService:
             'title': title,
             'description': description,
             'category': category,
-            'created_at': datetime.datetime.now().isoformat(),
+            'created_at': utc_timestamp(),
             'is_read': False
         }
     
+    def _dominant_emotion_insight(self, user_id, emotion):
+        """
+        Insight for the emotion felt most over the past month
+        """
+        return self._create_insight(
+            user_id,
+            f"Your dominant emotion is {emotion}",
+            f"Over the past month, you've experienced {emotion} more than any other emotion. " +
+            self._get_emotion_tip(emotion),
+            'pattern'
+        )
+    
+    def _pattern_insight(self, user_id, pattern_emotion, trigger_emotion):
+        """
+        Insight for an A-B-A sequence: trigger_emotion followed by a return to pattern_emotion
+        """
+        return self._create_insight(
+            user_id,
+            f"{trigger_emotion} often leads back to {pattern_emotion}",
+            f"We've noticed that when you experience {trigger_emotion}, you often return to {pattern_emotion} afterward. " +
+            "This could indicate a recurring emotional pattern worth exploring.",
+            'pattern'
+        )
+    
+    def _time_of_day_insight(self, user_id, period, emotion):
+        """
+        Insight for the emotion felt most in a part of the day
+        """
+        return self._create_insight(
+            user_id,
+            f"You tend to feel {emotion} in the {period}",
+            f"Based on your emotional patterns, you most often experience {emotion} during the {period}. " +
+            self._get_time_tip(period, emotion),
+            'pattern'
+        )
+    
     def _get_emotion_tip(self, emotion):
         """
         Get a tip based on an emotion
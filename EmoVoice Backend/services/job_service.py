@@ -0,0 +1,171 @@
+import os
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from services.analysis_worker_pool import AnalysisPoolSaturated
+
+class JobQueueFull(Exception):
+    """Raised when the maximum number of background jobs are already pending"""
+    def __init__(self, retry_after):
+        super().__init__('Too many background jobs are pending')
+        self.retry_after = retry_after
+
+class JobService:
+    def __init__(self, database_service, recording_service, insight_service, smart_home_service,
+                 max_workers=2, max_pending=32, retry_after=5, max_analysis_attempts=5):
+        """
+        Initialize the job service that finishes uploads in the background.
+        Job state is stored in the jobs table so clients can poll for it.
+        
+        At most max_pending jobs are queued or running at once; further
+        uploads raise JobQueueFull. A job whose analysis finds the worker
+        pool full is queued again after the pool's retry delay instead of
+        holding a job thread while it waits.
+        """
+        self.db_service = database_service
+        self.recording_service = recording_service
+        self.insight_service = insight_service
+        self.smart_home_service = smart_home_service
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.max_analysis_attempts = max_analysis_attempts
+        
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='emovoice-job')
+        self._slots = threading.BoundedSemaphore(max_pending)
+    
+    def submit_upload(self, user_id, audio_data, filename=None):
+        """
+        Store an upload and queue emotion analysis, insights and smart home
+        updates for it. Raises JobQueueFull before reading the upload when
+        max_pending jobs are already waiting.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull(self.retry_after)
+        
+        try:
+            stored = self.recording_service.store_recording(user_id, audio_data, filename)
+            if stored.get('status') != 'success':
+                self._slots.release()
+                return stored
+            
+            job_data = {
+                'id': str(uuid.uuid4()),
+                'user_id': user_id,
+                'recording_id': stored['recording_id'],
+                'job_type': 'recording_pipeline',
+                'status': 'queued',
+                'owner_pid': os.getpid()
+            }
+            self.db_service.save_job(job_data)
+            self.executor.submit(self._run_recording_pipeline, job_data['id'], user_id, stored['recording'])
+        except Exception:
+            self._slots.release()
+            raise
+        
+        return dict(stored, job=job_data)
+    
+    def fail_interrupted_jobs(self):
+        """
+        Mark queued and running jobs whose process has exited as failed.
+        Background jobs only live in the process that queued them, so after
+        a restart nothing would ever finish them. Returns how many were failed.
+        """
+        interrupted = [job for job in self.db_service.get_unfinished_jobs() if not _process_alive(job['owner_pid'])]
+        for job in interrupted:
+            self.db_service.update_job(job['id'], {
+                'status': 'failed',
+                'error': 'Interrupted by a server restart; please upload the recording again'
+            })
+        return len(interrupted)
+    
+    def get_job(self, job_id):
+        """
+        Get the current state of a job
+        """
+        job = self.db_service.get_job(job_id)
+        if job is not None:
+            job.pop('owner_pid', None)
+        return job
+    
+    def shutdown(self):
+        """
+        Wait for running jobs and stop the background threads
+        """
+        self.executor.shutdown(wait=True)
+    
+    def _run_recording_pipeline(self, job_id, user_id, recording_data, attempt=0):
+        """
+        Run every post-upload step for a recording, recording progress in the job
+        """
+        finished = True
+        try:
+            self.db_service.update_job(job_id, {'status': 'running', 'stage': 'emotion_analysis'})
+            try:
+                emotion_data = self.recording_service.analyze_recording(
+                    recording_data['id'],
+                    recording_data['file_path']
+                )
+            except AnalysisPoolSaturated as e:
+                if attempt + 1 >= self.max_analysis_attempts:
+                    raise
+                # Wait for capacity off the job threads; the job keeps its slot
+                self.db_service.update_job(job_id, {'status': 'queued', 'stage': 'waiting_for_analysis'})
+                timer = threading.Timer(
+                    e.retry_after,
+                    self._resubmit,
+                    (job_id, user_id, recording_data, attempt + 1)
+                )
+                timer.daemon = True
+                timer.start()
+                finished = False
+                return
+            
+            self.db_service.update_job(job_id, {'stage': 'insights'})
+            self.insight_service.generate_insights_from_recording(user_id, recording_data['id'])
+            
+            self.db_service.update_job(job_id, {'stage': 'smart_home'})
+            self.smart_home_service.adjust_devices_for_emotion(user_id, emotion_data)
+            
+            self.db_service.update_job(job_id, {
+                'status': 'succeeded',
+                'stage': None,
+                'result': {
+                    'recording_id': recording_data['id'],
+                    'emotion': emotion_data
+                }
+            })
+        
+        except Exception as e:
+            print(f"Error running job {job_id}: {e}")
+            self.db_service.update_job(job_id, {'status': 'failed', 'error': str(e)})
+        
+        finally:
+            if finished:
+                self._slots.release()
+    
+    def _resubmit(self, job_id, user_id, recording_data, attempt):
+        """
+        Queue another analysis attempt for a job
+        """
+        try:
+            self.executor.submit(self._run_recording_pipeline, job_id, user_id, recording_data, attempt)
+        except RuntimeError as e:
+            # The executor has been shut down
+            print(f"Error running job {job_id}: {e}")
+            self.db_service.update_job(job_id, {'status': 'failed', 'error': str(e)})
+            self._slots.release()
+            self.db_service.release_connection()
+
+def _process_alive(pid):
+    """
+    Whether a process with this pid exists
+    """
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,203 @@
+import math
+import time
+import uuid
+import threading
+
+class LiveSessionLimitReached(Exception):
+    """Raised when every live analysis session slot is in use"""
+    def __init__(self, retry_after):
+        super().__init__('Too many live analysis sessions')
+        self.retry_after = retry_after
+    
+    def __reduce__(self):
+        # Raised in the live session process and re-raised in the worker
+        return (type(self), (self.retry_after,))
+
+class LiveEmotionSession:
+    def __init__(self, user_id, analyzer):
+        """
+        State of one live analysis stream
+        """
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.analyzer = analyzer
+        self.lock = threading.Lock()
+        self.last_active = time.monotonic()
+        
+        self.sequence = 0
+        self.frames_at_last_update = 0
+        self.latest = None
+
+class LiveEmotionService:
+    def __init__(self, emotion_service, max_sessions=32, session_ttl=60, update_interval_ms=500,
+                 min_window_seconds=0.5):
+        """
+        Initialize the live emotion service.
+        
+        Each session owns a SlidingWindowFeatureExtractor fed with PCM frames;
+        an interim emotion is computed whenever update_interval_ms of new audio
+        has arrived. Sessions idle for session_ttl seconds are dropped and at
+        most max_sessions exist at once, which bounds memory. Sessions live in
+        this process; under gunicorn, wsgi.py serves them from one session
+        process (services.live_session_server) shared by all workers.
+        """
+        self.emotion_service = emotion_service
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.update_interval_ms = update_interval_ms
+        self.min_window_seconds = min_window_seconds
+        
+        self._sessions = {}
+        self._lock = threading.Lock()
+    
+    def create_session(self, user_id=None, sample_rate=None, channels=1, encoding='pcm_s16le'):
+        """
+        Start a live session for audio in the given encoding ('wav' or raw PCM)
+        """
+        # Imported here so librosa loads with the first live session, not at startup
+        from services.streaming_analysis import PcmStreamDecoder, WavStreamDecoder, UnsupportedStreamFormat
+        
+        try:
+            if encoding == 'wav':
+                decoder = WavStreamDecoder()
+            else:
+                decoder = PcmStreamDecoder(
+                    int(sample_rate or self.emotion_service.sample_rate),
+                    int(channels),
+                    encoding
+                )
+        except (UnsupportedStreamFormat, ValueError) as e:
+            return {
+                'status': 'error',
+                'message': str(e)
+            }
+        
+        analyzer = self.emotion_service.create_live_analyzer(decoder)
+        if analyzer is None:
+            return {
+                'status': 'error',
+                'message': 'Live analysis requires a trained emotion model with a streamable feature set'
+            }
+        
+        session = LiveEmotionSession(user_id, analyzer)
+        
+        with self._lock:
+            self._expire_sessions()
+            if len(self._sessions) >= self.max_sessions:
+                oldest = min(s.last_active for s in self._sessions.values())
+                retry_after = max(1, math.ceil(oldest + self.session_ttl - time.monotonic()))
+                raise LiveSessionLimitReached(retry_after)
+            
+            self._sessions[session.id] = session
+        
+        return {
+            'status': 'success',
+            'session_id': session.id,
+            'update_interval_ms': self.update_interval_ms,
+            'session_ttl': self.session_ttl
+        }
+    
+    def push_frames(self, session_id, data):
+        """
+        Feed audio to a session, returning an interim emotion if one is due
+        """
+        session = self._get_session(session_id)
+        if session is None:
+            return None
+        
+        with session.lock:
+            session.last_active = time.monotonic()
+            analyzer = session.analyzer
+            
+            try:
+                analyzer.feed(data)
+            except Exception as e:
+                print(f"Error decoding live audio for session {session_id}: {e}")
+                return {
+                    'status': 'error',
+                    'message': f'Could not decode audio: {e}'
+                }
+            
+            update = None
+            new_frames = analyzer.frames_seen - session.frames_at_last_update
+            if new_frames * analyzer.hop_length * 1000.0 / analyzer.sample_rate >= self.update_interval_ms:
+                update = self._update(session)
+            
+            return self._state(session, update)
+    
+    def get_session(self, session_id):
+        """
+        Get the latest interim emotion of a session
+        """
+        session = self._get_session(session_id)
+        if session is None:
+            return None
+        
+        with session.lock:
+            return self._state(session, session.latest)
+    
+    def close_session(self, session_id):
+        """
+        End a session, returning the emotion for its final window
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return None
+        
+        with session.lock:
+            update = self._update(session, min_frames=1) or session.latest
+            return self._state(session, update)
+    
+    def _update(self, session, min_frames=None):
+        """
+        Classify the current window of a session
+        """
+        analyzer = session.analyzer
+        session.frames_at_last_update = analyzer.frames_seen
+        
+        if min_frames is None:
+            min_frames = int(self.min_window_seconds * analyzer.sample_rate / analyzer.hop_length)
+        
+        entry = analyzer.snapshot(min_frames=min_frames)
+        if entry is None:
+            return None
+        
+        try:
+            result = self.emotion_service.analyze_features(entry)
+        except Exception as e:
+            print(f"Error analyzing live window for session {session.id}: {e}")
+            return None
+        
+        session.sequence += 1
+        session.latest = dict(result, sequence=session.sequence, stream_seconds=analyzer.stream_seconds)
+        return session.latest
+    
+    def _state(self, session, update):
+        """
+        Response payload for a session
+        """
+        analyzer = session.analyzer
+        return {
+            'status': 'success',
+            'session_id': session.id,
+            'stream_seconds': analyzer.stream_seconds,
+            'window_seconds': analyzer.window_size * analyzer.hop_length / float(analyzer.sample_rate),
+            'update': update
+        }
+    
+    def _get_session(self, session_id):
+        """
+        Look up a live session, dropping expired ones first
+        """
+        with self._lock:
+            self._expire_sessions()
+            return self._sessions.get(session_id)
+    
+    def _expire_sessions(self):
+        """
+        Drop sessions idle for longer than the TTL; caller holds the lock
+        """
+        cutoff = time.monotonic() - self.session_ttl
+        for session_id in [sid for sid, s in self._sessions.items() if s.last_active < cutoff]:
+            del self._sessions[session_id]
@@ -0,0 +1,101 @@
+import os
+import threading
+import multiprocessing
+from multiprocessing.managers import BaseManager
+
+# Methods of LiveEmotionService callable from other processes
+LIVE_SESSION_METHODS = ('create_session', 'push_frames', 'get_session', 'close_session')
+
+# Service served by the session process; set before it is forked
+_live_emotion_service = None
+
+def _get_live_emotion_service():
+    return _live_emotion_service
+
+class LiveSessionManager(BaseManager):
+    """Manager giving access to the live emotion service of the session process"""
+
+LiveSessionManager.register(
+    'live_emotion_service',
+    callable=_get_live_emotion_service,
+    exposed=LIVE_SESSION_METHODS
+)
+
+def start_live_session_server(live_emotion_service):
+    """
+    Fork a process that holds every live session and serves
+    live_emotion_service to all server workers over a local socket.
+    
+    Call it in the pre-fork master after the model is loaded, so the session
+    process shares the model copy-on-write like the workers do. It exits
+    once the master and every worker forked from it have exited. Returns a
+    LiveSessionClient with the methods of LiveEmotionService.
+    """
+    global _live_emotion_service
+    _live_emotion_service = live_emotion_service
+    
+    authkey = bytes(multiprocessing.current_process().authkey)
+    # A TCP listener, since closing the master's copy of a Unix socket
+    # listener would unlink its path
+    server = LiveSessionManager(address=('127.0.0.1', 0), authkey=authkey).get_server()
+    
+    # The master and workers hold the write end; EOF means all have exited
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(write_fd)
+            threading.Thread(target=_exit_on_eof, args=(read_fd,), daemon=True).start()
+            server.serve_forever()
+        finally:
+            os._exit(0)
+    
+    os.close(read_fd)
+    server.listener.close()
+    return LiveSessionClient(server.address, authkey)
+
+def _exit_on_eof(fd):
+    """
+    Stop the session process when every holder of the pipe's write end is gone
+    """
+    while os.read(fd, 1):
+        pass
+    os._exit(0)
+
+class LiveSessionClient:
+    def __init__(self, address, authkey):
+        """
+        Proxy for the live emotion service of the session process. Each
+        process connects on first use; calls from different threads use
+        separate connections.
+        """
+        self.address = address
+        self.authkey = authkey
+        
+        self._proxy = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def _service(self):
+        """
+        Connect to the session process once per process
+        """
+        with self._lock:
+            if self._proxy is None or self._pid != os.getpid():
+                manager = LiveSessionManager(address=self.address, authkey=self.authkey)
+                manager.connect()
+                self._proxy = manager.live_emotion_service()
+                self._pid = os.getpid()
+            return self._proxy
+    
+    def create_session(self, user_id=None, sample_rate=None, channels=1, encoding='pcm_s16le'):
+        return self._service().create_session(user_id, sample_rate, channels, encoding)
+    
+    def push_frames(self, session_id, data):
+        return self._service().push_frames(session_id, data)
+    
+    def get_session(self, session_id):
+        return self._service().get_session(session_id)
+    
+    def close_session(self, session_id):
+        return self._service().close_session(session_id)
@@ -0,0 +1,145 @@
+import os
+import re
+import sqlite3
+
+# Migration files are named like 0003_hot_query_indexes.sql
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+class MigrationRunner:
+    def __init__(self, database_service, migrations_dir=None):
+        """
+        Initialize the migration runner for a database service.
+        Applied versions are recorded in the schema_version table.
+        """
+        self.db_service = database_service
+        self.migrations_dir = migrations_dir or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'database',
+            'migrations'
+        )
+    
+    def discover(self):
+        """
+        List available migrations as (version, name, path), oldest first
+        """
+        migrations = []
+        for filename in os.listdir(self.migrations_dir):
+            match = MIGRATION_FILE_PATTERN.match(filename)
+            if match:
+                migrations.append((
+                    int(match.group(1)),
+                    match.group(2),
+                    os.path.join(self.migrations_dir, filename)
+                ))
+        
+        migrations.sort()
+        versions = [m[0] for m in migrations]
+        if len(versions) != len(set(versions)):
+            raise ValueError(f'Duplicate migration versions in {self.migrations_dir}')
+        
+        return migrations
+    
+    def head_version(self):
+        """
+        Get the version of the newest migration file
+        """
+        migrations = self.discover()
+        return migrations[-1][0] if migrations else 0
+    
+    def current_version(self, conn=None):
+        """
+        Get the newest version applied to the database, 0 if none
+        """
+        conn = conn or self.db_service.get_connection()
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+        ).fetchone()
+        if not exists:
+            return 0
+        
+        row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+        return row[0] or 0
+    
+    def is_current(self):
+        """
+        Check whether the database is already at the newest migration
+        """
+        return self.current_version() >= self.head_version()
+    
+    def pending(self, conn=None):
+        """
+        List migrations that have not been applied yet
+        """
+        current = self.current_version(conn)
+        return [m for m in self.discover() if m[0] > current]
+    
+    def migrate(self, dry_run=False):
+        """
+        Apply pending migrations, each in its own transaction.
+        With dry_run, only report what would be applied.
+        Returns the list of (version, name) migrations applied or pending.
+        """
+        if dry_run:
+            return [(version, name) for version, name, _ in self.pending()]
+        
+        # A dedicated autocommit connection, so transactions are explicit
+        conn = self.db_service._connect()
+        conn.isolation_level = None
+        applied = []
+        
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            for version, name, path in self.discover():
+                with open(path, 'r') as f:
+                    script = f.read()
+                
+                # Take the write lock first so concurrent processes serialize
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    # Another process may have applied it while we waited
+                    if self.current_version(conn) >= version:
+                        conn.execute('ROLLBACK')
+                        continue
+                    
+                    for statement in self._split_statements(script):
+                        conn.execute(statement)
+                    
+                    conn.execute(
+                        'INSERT INTO schema_version (version, name) VALUES (?, ?)',
+                        (version, name)
+                    )
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                
+                applied.append((version, name))
+                print(f"Applied migration {version:04d}_{name}")
+        finally:
+            conn.close()
+        
+        return applied
+    
+    def _split_statements(self, script):
+        """
+        Split a SQL script into complete statements
+        """
+        statements = []
+        buffer = ''
+        for line in script.splitlines(keepends=True):
+            buffer += line
+            if sqlite3.complete_statement(buffer):
+                statements.append(buffer.strip())
+                buffer = ''
+        
+        if buffer.strip() and not buffer.strip().startswith('--'):
+            statements.append(buffer.strip())
+        
+        return statements
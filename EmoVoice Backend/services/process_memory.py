@@ -0,0 +1,57 @@
+import os
+
+# smaps fields summed into each reported value, in kB
+MEMORY_FIELDS = {
+    'rss_kb': ('Rss',),
+    'pss_kb': ('Pss',),
+    'shared_kb': ('Shared_Clean', 'Shared_Dirty'),
+    'private_kb': ('Private_Clean', 'Private_Dirty'),
+    'swap_kb': ('Swap',)
+}
+
+def read_memory(pid='self'):
+    """
+    Get the resident memory of a process split into shared and private pages.
+    
+    Reads /proc/<pid>/smaps_rollup, or sums /proc/<pid>/smaps on kernels
+    without it. Pages inherited from a pre-fork master and not written since
+    count as shared. Returns None where /proc is not available.
+    """
+    totals = {}
+    for name in ('smaps_rollup', 'smaps'):
+        try:
+            with open(os.path.join('/proc', str(pid), name)) as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 3 and parts[2] == 'kB':
+                        totals[parts[0].rstrip(':')] = totals.get(parts[0].rstrip(':'), 0) + int(parts[1])
+            break
+        except (OSError, ValueError):
+            totals = {}
+    
+    if not totals:
+        return None
+    
+    return {key: sum(totals.get(field, 0) for field in fields) for key, fields in MEMORY_FIELDS.items()}
+
+def child_pids(pid):
+    """
+    PIDs of the direct children of a process, e.g. the workers of a server master
+    """
+    try:
+        with open(os.path.join('/proc', str(pid), 'task', str(pid), 'children')) as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+def worker_memory(master_pid):
+    """
+    Memory of a master process and each of its workers
+    """
+    report = []
+    for pid in [master_pid] + child_pids(master_pid):
+        memory = read_memory(pid)
+        if memory is not None:
+            report.append(dict(memory, pid=pid, role='master' if pid == master_pid else 'worker'))
+    
+    return report
@@ -3,15 +3,19 @@ import uuid
 import datetime
 import wave
 import numpy as np
-import soundfile as sf
+from werkzeug.utils import secure_filename
+from services.analysis_worker_pool import AnalysisPoolSaturated, AnalysisJobTimeout
+from services.database_service import utc_timestamp
 
 class RecordingService:
-    def __init__(self, database_service, emotion_detection_service):
+    def __init__(self, database_service, emotion_detection_service, analysis_pool=None):
         """
-        Initialize the recording service with database and emotion detection services
+        Initialize the recording service with database and emotion detection services.
+        When an analysis pool is given, emotion analysis runs in its worker processes.
         """
         self.db_service = database_service
         self.emotion_service = emotion_detection_service
+        self.analysis_pool = analysis_pool
         
         # Ensure recordings directory exists
         self.recordings_dir = os.path.join(
@@ -21,74 +25,71 @@ class RecordingService:
         )
         os.makedirs(self.recordings_dir, exist_ok=True)
     
-    def save_recording(self, user_id, audio_data, filename=None):
+    def save_recording(self, user_id, audio_data, filename=None, incremental=False):
         """
-        Save a recording and analyze emotions
+        Save a recording and analyze emotions.
+        audio_data may be bytes or an iterable of byte chunks, which are written
+        to disk as they arrive. With incremental, features are extracted from
+        the chunks while they are written instead of re-reading the file; this
+        runs on the calling thread, outside the analysis pool and its limits.
         """
-        # Generate a unique recording ID
-        recording_id = str(uuid.uuid4())
+        recording_data = self._new_recording(user_id, filename)
+        file_path = recording_data['file_path']
         
-        # Generate filename if not provided
-        if not filename:
-            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{user_id}_{timestamp}.wav"
-        
-        # Create file path
-        file_path = os.path.join(self.recordings_dir, filename)
+        analyzer = self.emotion_service.create_incremental_analyzer() if incremental else None
         
         # Save audio data to file
         try:
-            # Assuming audio_data is a bytes object
-            with open(file_path, 'wb') as f:
-                f.write(audio_data)
+            self._write_audio(recording_data, audio_data, analyzer.feed if analyzer else None)
             
-            # Get file size
-            file_size = os.path.getsize(file_path)
+            # Analyze emotions before anything is written to the database so a
+            # busy or failed analysis leaves no orphaned recording rows
+            emotion_result = None
+            if analyzer is not None:
+                entry = analyzer.finish()
+                if entry is not None:
+                    emotion_result = self.emotion_service.analyze_features(entry)
+                else:
+                    print(f"Incremental analysis unavailable, analyzing file: {analyzer.error}")
             
-            # Get audio duration
-            with wave.open(file_path, 'rb') as wf:
-                frames = wf.getnframes()
-                rate = wf.getframerate()
-                duration = frames / float(rate)
-            
-            # Create recording data
-            recording_data = {
-                'id': recording_id,
-                'user_id': user_id,
-                'filename': filename,
-                'file_path': file_path,
-                'file_size': file_size,
-                'duration': duration,
-                'created_at': datetime.datetime.now().isoformat()
-            }
+            if emotion_result is None:
+                emotion_result = self._analyze(file_path)
             
             # Save recording to database
             self.db_service.save_recording(recording_data)
             
-            # Analyze emotions
-            emotion_result = self.emotion_service.analyze_audio(file_path)
-            
-            # Add recording ID to emotion data
-            emotion_data = {
-                'id': str(uuid.uuid4()),
-                'recording_id': recording_id,
-                'primary_emotion': emotion_result['primary_emotion'],
-                'secondary_emotion': emotion_result.get('secondary_emotion'),
-                'primary_confidence': emotion_result.get('confidence', 0),
-                'secondary_confidence': emotion_result.get('secondary_confidence', 0),
-                'intensity': emotion_result.get('intensity', 0),
-                'created_at': datetime.datetime.now().isoformat()
-            }
-            
             # Save emotion data to database
-            self.db_service.save_emotion(emotion_data)
+            emotion_data = self._save_emotion(recording_data['id'], emotion_result)
             
             return {
                 'status': 'success',
-                'recording_id': recording_id,
+                'recording_id': recording_data['id'],
                 'emotion': emotion_data
             }
         
+        except AnalysisPoolSaturated as e:
+            # Backpressure: drop the upload and ask the client to retry
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            
+            return {
+                'status': 'error',
+                'message': 'Emotion analysis is busy, please retry shortly',
+                'retry_after': e.retry_after
+            }
+        
+        except AnalysisJobTimeout as e:
+            # The worker was stopped; the upload can be retried like a busy one
+            print(f"Error saving recording: {e}")
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            
+            return {
+                'status': 'error',
+                'message': str(e),
+                'retry_after': e.retry_after
+            }
+        
         except Exception as e:
             print(f"Error saving recording: {e}")
             # Clean up file if it was created
@@ -100,6 +101,113 @@ class RecordingService:
                 'message': str(e)
             }
     
+    def store_recording(self, user_id, audio_data, filename=None):
+        """
+        Persist a recording's audio (bytes or byte chunks) and database row
+        without analyzing it. Analysis is completed later by analyze_recording.
+        """
+        recording_data = self._new_recording(user_id, filename)
+        file_path = recording_data['file_path']
+        
+        try:
+            self._write_audio(recording_data, audio_data)
+            self.db_service.save_recording(recording_data)
+            
+            return {
+                'status': 'success',
+                'recording_id': recording_data['id'],
+                'recording': recording_data
+            }
+        
+        except Exception as e:
+            print(f"Error storing recording: {e}")
+            # Clean up file if it was created
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            
+            return {
+                'status': 'error',
+                'message': str(e)
+            }
+    
+    def analyze_recording(self, recording_id, file_path):
+        """
+        Analyze a stored recording and save its emotion data
+        """
+        emotion_result = self._analyze(file_path)
+        return self._save_emotion(recording_id, emotion_result)
+    
+    def _new_recording(self, user_id, filename=None):
+        """
+        Create the data for a new recording
+        """
+        # Client-supplied names become a path, so strip directories and
+        # unsafe characters; generate one if nothing usable is left
+        filename = secure_filename(filename or '')
+        if not filename:
+            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"{user_id}_{timestamp}.wav"
+        
+        return {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'filename': filename,
+            'file_path': os.path.join(self.recordings_dir, filename),
+            'created_at': utc_timestamp()
+        }
+    
+    def _write_audio(self, recording_data, audio_data, on_chunk=None):
+        """
+        Write audio bytes or byte chunks to the recording's file and record
+        size and duration. Chunks are written as they arrive, so memory use
+        does not grow with the length of the recording.
+        """
+        file_path = recording_data['file_path']
+        
+        chunks = [audio_data] if isinstance(audio_data, (bytes, bytearray)) else audio_data
+        with open(file_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                if on_chunk is not None:
+                    on_chunk(chunk)
+        
+        # Get file size
+        recording_data['file_size'] = os.path.getsize(file_path)
+        
+        # Get audio duration
+        with wave.open(file_path, 'rb') as wf:
+            frames = wf.getnframes()
+            rate = wf.getframerate()
+            recording_data['duration'] = frames / float(rate)
+    
+    def _save_emotion(self, recording_id, emotion_result):
+        """
+        Save an analysis result as the emotion data for a recording
+        """
+        # Add recording ID to emotion data
+        emotion_data = {
+            'id': str(uuid.uuid4()),
+            'recording_id': recording_id,
+            'primary_emotion': emotion_result['primary_emotion'],
+            'secondary_emotion': emotion_result.get('secondary_emotion'),
+            'primary_confidence': emotion_result.get('confidence', 0),
+            'secondary_confidence': emotion_result.get('secondary_confidence', 0),
+            'intensity': emotion_result.get('intensity', 0),
+            'created_at': utc_timestamp()
+        }
+        
+        self.db_service.save_emotion(emotion_data)
+        return emotion_data
+    
+    def _analyze(self, file_path):
+        """
+        Analyze a saved recording, in the worker pool when one is configured
+        """
+        if self.analysis_pool is not None:
+            return self.analysis_pool.analyze(file_path)
+        
+        return self.emotion_service.analyze_audio(file_path)
+    
     def get_recording(self, recording_id):
         """
         Get a recording by ID
@@ -2,19 +2,32 @@ import os
 import uuid
 import json
 import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
-from io import BytesIO
 import base64
-from collections import Counter
-import numpy as np
+import hashlib
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from services.chart_renderer import ChartRenderer
+from services import emotion_aggregation
+from services.database_service import resolve_date_range, utc_timestamp
+
+# Columns read for the per-recording emotion timeline
+TIMELINE_COLUMNS = ('recorded_at', 'primary_emotion', 'intensity', 'primary_confidence', 'recording_id')
+
+# Emotion summaries kept in memory, keyed by (user, range, data version)
+SUMMARY_CACHE_SIZE = 256
 
 class ReportService:
-    def __init__(self, database_service):
+    def __init__(self, database_service, chart_renderer=None, summary_cache_size=SUMMARY_CACHE_SIZE):
         """
-        Initialize the report service with a database service
+        Initialize the report service with a database service and a chart renderer
         """
         self.db_service = database_service
+        self.chart_renderer = chart_renderer or ChartRenderer()
+        
+        self.summary_cache_size = summary_cache_size
+        self._summaries = OrderedDict()
+        self._summaries_lock = threading.Lock()
         
         # Ensure reports directory exists
         self.reports_dir = os.path.join(
@@ -23,93 +36,94 @@ class ReportService:
             'reports'
         )
         os.makedirs(self.reports_dir, exist_ok=True)
+        
+        # Rendered charts, stored once per distinct PNG and named by its SHA-256
+        self.charts_dir = os.path.join(self.reports_dir, 'charts')
+        os.makedirs(self.charts_dir, exist_ok=True)
     
-    def generate_emotion_report(self, user_id, time_range='week', title=None, description=None):
+    def generate_emotion_report(self, user_id, time_range='week', title=None, description=None,
+                                start_date=None, end_date=None):
         """
-        Generate an emotion report for a user
+        Generate an emotion report for a user, over a named time range or,
+        when start_date is given, the dates [start_date, end_date)
         """
-        # Get emotions for the user within the time range
-        emotions = self.db_service.get_emotions(user_id, time_range)
+        try:
+            summary = self.get_emotion_summary(user_id, time_range, start_date, end_date)
+        except ValueError as e:
+            return {
+                'status': 'error',
+                'message': str(e)
+            }
         
-        if not emotions:
+        if not summary['daily']:
             return {
                 'status': 'error',
                 'message': 'No emotion data found for the specified time range'
             }
         
-        # Get recordings for the user
-        recordings = self.db_service.get_recordings(user_id)
-        
-        # Create a mapping of recording_id to recording data
-        recording_map = {r['id']: r for r in recordings}
+        date_range = (summary['start_date'], summary['end_date'])
+        rollup = summary['daily']
+        emotion_counts = Counter(summary['emotion_counts'])
+        avg_intensities = summary['avg_intensities']
+        avg_confidences = summary['avg_confidences']
         
-        # Process emotion data
-        emotion_counts = Counter()
-        emotion_intensities = {}
-        emotion_confidences = {}
-        emotion_timeline = []
+        # Counts, averages and the daily chart come from the rollup. The report's
+        # per-recording timeline and the streak insight need individual
+        # recordings in order, so they read them from one joined query
+        emotion_timeline = [{
+            'timestamp': row.recorded_at,
+            'emotion': row.primary_emotion,
+            'intensity': row.intensity,
+            'confidence': row.primary_confidence,
+            'recording_id': row.recording_id
+        } for row in self.db_service.iter_emotion_timeline(user_id, date_range, columns=TIMELINE_COLUMNS)]
+        emotions = [entry['emotion'] for entry in emotion_timeline]
         
-        for emotion in emotions:
-            primary_emotion = emotion['primary_emotion']
-            recording_id = emotion['recording_id']
-            
-            # Count emotions
-            emotion_counts[primary_emotion] += 1
-            
-            # Track intensities
-            if primary_emotion not in emotion_intensities:
-                emotion_intensities[primary_emotion] = []
-            emotion_intensities[primary_emotion].append(emotion['intensity'])
-            
-            # Track confidences
-            if primary_emotion not in emotion_confidences:
-                emotion_confidences[primary_emotion] = []
-            emotion_confidences[primary_emotion].append(emotion['primary_confidence'])
-            
-            # Add to timeline if we have the recording
-            if recording_id in recording_map:
-                recording = recording_map[recording_id]
-                emotion_timeline.append({
-                    'timestamp': recording['created_at'],
-                    'emotion': primary_emotion,
-                    'intensity': emotion['intensity'],
-                    'confidence': emotion['primary_confidence'],
-                    'recording_id': recording_id
-                })
-        
-        # Sort timeline by timestamp
-        emotion_timeline.sort(key=lambda x: x['timestamp'])
+        # Render the charts in the renderer's pool while insights are generated
+        chart_futures = {
+            'emotion_distribution': self.chart_renderer.submit('emotion_distribution', dict(emotion_counts)),
+            'emotion_timeline': self.chart_renderer.submit(
+                'emotion_timeline',
+                [[row['day'], row['emotion'], row['count']] for row in rollup]
+            ),
+            'emotion_intensity': self.chart_renderer.submit('emotion_intensity', avg_intensities)
+        }
         
-        # Calculate average intensities and confidences
-        avg_intensities = {e: sum(vals)/len(vals) for e, vals in emotion_intensities.items()}
-        avg_confidences = {e: sum(vals)/len(vals) for e, vals in emotion_confidences.items()}
+        # Generate insights
+        insights = self._generate_insights(emotion_counts, avg_intensities, emotions)
         
-        # Generate charts
-        emotion_distribution_chart = self._generate_emotion_distribution_chart(emotion_counts)
-        emotion_timeline_chart = self._generate_emotion_timeline_chart(emotion_timeline)
-        emotion_intensity_chart = self._generate_emotion_intensity_chart(avg_intensities)
+        report_id = str(uuid.uuid4())
         
-        # Generate insights
-        insights = self._generate_insights(emotion_counts, avg_intensities, emotion_timeline)
+        # Charts are saved as files; the report only references them
+        charts = {}
+        for name, future in chart_futures.items():
+            digest = self._store_chart(future.result())
+            if digest:
+                charts[name] = {
+                    'sha256': digest,
+                    'url': f'/api/reports/{report_id}/charts/{name}'
+                }
         
         # Create report data
         report_data = {
-            'id': str(uuid.uuid4()),
+            'id': report_id,
             'user_id': user_id,
-            'title': title or f"Emotion Report - {datetime.datetime.now().strftime('%Y-%m-%d')}",
-            'description': description or f"Emotion analysis for the past {time_range}",
-            'time_range': time_range,
-            'created_at': datetime.datetime.now().isoformat(),
+            'title': title or f"Emotion Report - {utc_timestamp()[:10]}",
+            'description': description or (
+                f"Emotion analysis from {date_range[0]} until {date_range[1]}" if start_date
+                else f"Emotion analysis for the past {time_range}"
+            ),
+            'time_range': 'custom' if start_date else time_range,
+            'start_date': date_range[0],
+            'end_date': date_range[1],
+            'top_emotion': emotion_counts.most_common(1)[0][0],
+            'created_at': utc_timestamp(),
             'data': {
                 'emotion_counts': dict(emotion_counts),
                 'avg_intensities': avg_intensities,
                 'avg_confidences': avg_confidences,
                 'emotion_timeline': emotion_timeline,
-                'charts': {
-                    'emotion_distribution': emotion_distribution_chart,
-                    'emotion_timeline': emotion_timeline_chart,
-                    'emotion_intensity': emotion_intensity_chart
-                },
+                'charts': charts,
                 'insights': insights
             }
         }
@@ -123,152 +137,113 @@ class ReportService:
             'report': report_data
         }
     
-    def _generate_emotion_distribution_chart(self, emotion_counts):
+    def get_emotion_summary(self, user_id, time_range='week', start_date=None, end_date=None):
         """
-        Generate a pie chart of emotion distribution
+        Get emotion counts, average intensities and confidences, and the daily
+        rollup rows for a named time range or the dates [start_date, end_date).
+        
+        Summaries come from the daily rollup and are cached per (user, range,
+        data version). The version is bumped with every saved emotion, so a
+        cached summary is served until the user's data changes, at the cost of
+        one primary-key lookup. Raises ValueError for malformed ranges.
         """
-        try:
-            plt.figure(figsize=(8, 6))
-            labels = list(emotion_counts.keys())
-            sizes = list(emotion_counts.values())
-            
-            # Define colors for emotions
-            colors = {
-                'Anger': '#FF5252',
-                'Disgust': '#66BB6A',
-                'Fear': '#7E57C2',
-                'Joy': '#FFD700',
-                'Sadness': '#4FC3F7',
-                'Surprise': '#FF4081',
-                'Calm': '#81D4FA'
-            }
-            
-            # Get colors for the emotions in our data
-            chart_colors = [colors.get(emotion, '#CCCCCC') for emotion in labels]
-            
-            plt.pie(sizes, labels=labels, colors=chart_colors, autopct='%1.1f%%', startangle=90)
-            plt.axis('equal')
-            plt.title('Emotion Distribution')
-            
-            # Save chart to BytesIO
-            buffer = BytesIO()
-            plt.savefig(buffer, format='png')
-            plt.close()
-            
-            # Convert to base64
-            buffer.seek(0)
-            image_png = buffer.getvalue()
-            buffer.close()
-            
-            return base64.b64encode(image_png).decode('utf-8')
+        start, end = resolve_date_range((start_date, end_date) if start_date else time_range)
         
-        except Exception as e:
-            print(f"Error generating emotion distribution chart: {e}")
-            return None
+        # Read the version before the data: a concurrent write can only make
+        # the cached summary newer than its key, never older
+        version = self.db_service.get_emotion_data_version(user_id)
+        key = (user_id, start, end, version)
+        
+        with self._summaries_lock:
+            summary = self._summaries.get(key)
+            if summary is not None:
+                self._summaries.move_to_end(key)
+                return summary
+        
+        rollup = self.db_service.get_emotion_rollup(user_id, (start, end))
+        counts, avg_intensities, avg_confidences = emotion_aggregation.summarize_rollup(rollup)
+        
+        summary = {
+            'user_id': user_id,
+            'start_date': start,
+            'end_date': end,
+            'data_version': version,
+            'total': sum(counts.values()),
+            'emotion_counts': counts,
+            'avg_intensities': avg_intensities,
+            'avg_confidences': avg_confidences,
+            'daily': rollup
+        }
+        
+        with self._summaries_lock:
+            self._summaries[key] = summary
+            while len(self._summaries) > self.summary_cache_size:
+                self._summaries.popitem(last=False)
+        
+        return summary
     
-    def _generate_emotion_timeline_chart(self, emotion_timeline):
+    def get_chart(self, report_id, name):
         """
-        Generate a timeline chart of emotions
+        Get the file path and SHA-256 of a report chart, or (None, None)
         """
-        try:
-            if not emotion_timeline:
-                return None
-                
-            # Convert to DataFrame
-            df = pd.DataFrame(emotion_timeline)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            
-            # Define colors for emotions
-            colors = {
-                'Anger': '#FF5252',
-                'Disgust': '#66BB6A',
-                'Fear': '#7E57C2',
-                'Joy': '#FFD700',
-                'Sadness': '#4FC3F7',
-                'Surprise': '#FF4081',
-                'Calm': '#81D4FA'
-            }
-            
-            plt.figure(figsize=(10, 6))
-            
-            # Group by day and emotion, count occurrences
-            df['date'] = df['timestamp'].dt.date
-            emotion_counts = df.groupby(['date', 'emotion']).size().unstack().fillna(0)
-            
-            # Plot stacked bar chart
-            emotion_counts.plot(kind='bar', stacked=True, ax=plt.gca(), color=[colors.get(e, '#CCCCCC') for e in emotion_counts.columns])
-            
-            plt.title('Emotion Timeline')
-            plt.xlabel('Date')
-            plt.ylabel('Count')
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            
-            # Save chart to BytesIO
-            buffer = BytesIO()
-            plt.savefig(buffer, format='png')
-            plt.close()
-            
-            # Convert to base64
-            buffer.seek(0)
-            image_png = buffer.getvalue()
-            buffer.close()
-            
-            return base64.b64encode(image_png).decode('utf-8')
+        report = self.db_service.get_report_by_id(report_id)
+        if not report:
+            return None, None
         
-        except Exception as e:
-            print(f"Error generating emotion timeline chart: {e}")
-            return None
+        chart = (report.get('data') or {}).get('charts', {}).get(name)
+        if not chart:
+            return None, None
+        
+        if isinstance(chart, str):
+            # Reports created before charts were stored as files embed base64 PNGs
+            digest = self._store_chart(base64.b64decode(chart))
+        else:
+            digest = chart['sha256']
+        
+        path = self._chart_path(digest) if digest else None
+        if not path or not os.path.exists(path):
+            return None, None
+        
+        return path, digest
     
-    def _generate_emotion_intensity_chart(self, avg_intensities):
+    def _store_chart(self, png):
         """
-        Generate a bar chart of average emotion intensities
+        Save a rendered chart under its SHA-256, returning the digest
         """
-        try:
-            plt.figure(figsize=(8, 6))
-            
-            # Define colors for emotions
-            colors = {
-                'Anger': '#FF5252',
-                'Disgust': '#66BB6A',
-                'Fear': '#7E57C2',
-                'Joy': '#FFD700',
-                'Sadness': '#4FC3F7',
-                'Surprise': '#FF4081',
-                'Calm': '#81D4FA'
-            }
-            
-            emotions = list(avg_intensities.keys())
-            intensities = list(avg_intensities.values())
-            bar_colors = [colors.get(emotion, '#CCCCCC') for emotion in emotions]
-            
-            plt.bar(emotions, intensities, color=bar_colors)
-            plt.title('Average Emotion Intensities')
-            plt.xlabel('Emotion')
-            plt.ylabel('Average Intensity')
-            plt.ylim(0, 1)
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            
-            # Save chart to BytesIO
-            buffer = BytesIO()
-            plt.savefig(buffer, format='png')
-            plt.close()
-            
-            # Convert to base64
-            buffer.seek(0)
-            image_png = buffer.getvalue()
-            buffer.close()
-            
-            return base64.b64encode(image_png).decode('utf-8')
+        if not png:
+            return None
         
+        digest = hashlib.sha256(png).hexdigest()
+        path = self._chart_path(digest)
+        if os.path.exists(path):
+            return digest
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        # Write to a temporary file and rename so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(png)
+            os.replace(tmp_path, path)
         except Exception as e:
-            print(f"Error generating emotion intensity chart: {e}")
+            print(f"Error saving report chart {digest}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return None
+        
+        return digest
     
-    def _generate_insights(self, emotion_counts, avg_intensities, emotion_timeline):
+    def _chart_path(self, digest):
         """
-        Generate insights based on emotion data
+        Get the on-disk path for a chart, sharded by the first two characters of its digest
+        """
+        return os.path.join(self.charts_dir, digest[:2], f'{digest}.png')
+    
+    def _generate_insights(self, emotion_counts, avg_intensities, emotions):
+        """
+        Generate insights based on emotion counts, average intensities and
+        the emotion of each recording in time order
         """
         insights = []
         
@@ -326,22 +301,9 @@ class ReportService:
             })
         
         # Check for emotional patterns over time
-        if len(emotion_timeline) >= 5:
-            # Simple pattern detection - look for consecutive same emotions
-            consecutive_count = 1
-            current_emotion = emotion_timeline[0]['emotion']
-            max_consecutive = 1
-            max_emotion = current_emotion
-            
-            for i in range(1, len(emotion_timeline)):
-                if emotion_timeline[i]['emotion'] == current_emotion:
-                    consecutive_count += 1
-                    if consecutive_count > max_consecutive:
-                        max_consecutive = consecutive_count
-                        max_emotion = current_emotion
-                else:
-                    consecutive_count = 1
-                    current_emotion = emotion_timeline[i]['emotion']
+        if len(emotions) >= 5:
+            # Longest run of the same emotion across consecutive recordings
+            max_emotion, max_consecutive = emotion_aggregation.longest_streak(emotions)
             
             if max_consecutive >= 3:
                 insights.append({
@@ -381,7 +343,7 @@ class ReportService:
         access_token = str(uuid.uuid4())
         
         # Calculate expiration date
-        expires_at = (datetime.datetime.now() + datetime.timedelta(days=expiration_days)).isoformat()
+        expires_at = utc_timestamp(datetime.timedelta(days=expiration_days))
         
         # Create share data
         share_data = {
@@ -2,7 +2,6 @@ import os
 import json
 import uuid
 import datetime
-import requests
 
 class SmartHomeService:
     def __init__(self, database_service):
@@ -95,6 +94,16 @@ class SmartHomeService:
         
         return results
     
+    def adjust_devices_for_emotion(self, user_id, emotion_data):
+        """
+        Adjust smart home devices for a newly detected emotion
+        """
+        return self.adjust_lighting(
+            user_id,
+            emotion_data['primary_emotion'],
+            emotion_data.get('intensity', 0.5)
+        )
+    
     def _get_lighting_settings(self, emotion, intensity):
         """
         Get lighting settings based on emotion and intensity
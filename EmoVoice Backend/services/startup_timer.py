@@ -0,0 +1,36 @@
+import time
+
+class StartupTimer:
+    def __init__(self):
+        """
+        Record how long each phase of process startup takes.
+        Create it before the imports being measured.
+        """
+        self.started = time.perf_counter()
+        self.phases = []
+        
+        self._last = self.started
+    
+    def phase(self, name):
+        """
+        End the current phase, recording its duration under name
+        """
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+    
+    def report(self):
+        """
+        Get each phase's duration and the total, in milliseconds
+        """
+        return {
+            'phases': {name: round(seconds * 1000, 1) for name, seconds in self.phases},
+            'total_ms': round((self._last - self.started) * 1000, 1)
+        }
+    
+    def summary(self):
+        """
+        One-line startup report for the log
+        """
+        phases = ', '.join(f'{name} {seconds * 1000:.0f} ms' for name, seconds in self.phases)
+        return f"Startup: {phases} (total {(self._last - self.started) * 1000:.0f} ms)"
@@ -0,0 +1,613 @@
+import struct
+from collections import deque
+import numpy as np
+import librosa
+import soxr
+
+from services.feature_sets import MfccMatrixFeatures, normalize_rows
+
+# WAV sample formats that can be decoded while streaming
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Give up on a stream whose header is larger than this without a data chunk
+MAX_WAV_HEADER_BYTES = 1024 * 1024
+
+class UnsupportedStreamFormat(Exception):
+    """Raised when streamed audio cannot be decoded incrementally"""
+
+class WavStreamDecoder:
+    def __init__(self):
+        """
+        Decode a WAV byte stream into mono float32 samples as chunks arrive
+        """
+        self.sample_rate = None
+        self.channels = None
+        self.audio_format = None
+        self.bits_per_sample = None
+        
+        self._header = b''
+        self._in_data = False
+        self._data_remaining = None
+        self._leftover = b''
+    
+    def feed(self, chunk):
+        """
+        Decode a chunk of bytes, returning the complete samples it contains
+        """
+        if not self._in_data:
+            self._header += chunk
+            chunk = self._parse_header()
+            if not self._in_data:
+                return np.zeros(0, dtype=np.float32)
+        
+        # Ignore anything after the data chunk, such as trailing metadata chunks
+        if self._data_remaining is not None:
+            chunk = chunk[:self._data_remaining]
+            self._data_remaining -= len(chunk)
+        
+        data = self._leftover + chunk
+        block_align = self.channels * self.bits_per_sample // 8
+        usable = len(data) - len(data) % block_align
+        self._leftover = data[usable:]
+        
+        return self._to_mono_float(data[:usable])
+    
+    def _parse_header(self):
+        """
+        Parse RIFF chunks until the data chunk; returns any sample bytes already read
+        """
+        header = self._header
+        if len(header) < 12:
+            return b''
+        if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            raise UnsupportedStreamFormat('Only WAV audio can be analyzed while streaming')
+        
+        offset = 12
+        while offset + 8 <= len(header):
+            chunk_id = header[offset:offset + 4]
+            chunk_size = struct.unpack('<I', header[offset + 4:offset + 8])[0]
+            body_start = offset + 8
+            
+            if chunk_id == b'data':
+                self._check_format()
+                self._in_data = True
+                # Streaming writers often leave the size as 0 or 0xFFFFFFFF
+                if 0 < chunk_size < 0xFFFFFFFF:
+                    self._data_remaining = chunk_size
+                self._header = b''
+                return header[body_start:]
+            
+            # Chunks are word aligned
+            body_end = body_start + chunk_size + (chunk_size % 2)
+            if body_end > len(header):
+                break
+            
+            if chunk_id == b'fmt ':
+                self._parse_fmt(header[body_start:body_start + chunk_size])
+            offset = body_end
+        
+        if len(header) > MAX_WAV_HEADER_BYTES:
+            raise UnsupportedStreamFormat('WAV header is too large')
+        return b''
+    
+    def _parse_fmt(self, body):
+        """
+        Read the sample format from a fmt chunk
+        """
+        audio_format, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', body[:16])
+        if audio_format == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+            audio_format = struct.unpack('<H', body[24:26])[0]
+        
+        self.audio_format = audio_format
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.bits_per_sample = bits
+    
+    def _check_format(self):
+        """
+        Ensure the sample format is one we can decode
+        """
+        if self.audio_format is None:
+            raise UnsupportedStreamFormat('WAV data chunk appears before its fmt chunk')
+        
+        supported = (
+            (self.audio_format == WAVE_FORMAT_PCM and self.bits_per_sample in (8, 16, 32)) or
+            (self.audio_format == WAVE_FORMAT_IEEE_FLOAT and self.bits_per_sample == 32)
+        )
+        if not supported or not self.channels:
+            raise UnsupportedStreamFormat(
+                f'Unsupported WAV format {self.audio_format} with {self.bits_per_sample}-bit samples'
+            )
+    
+    def _to_mono_float(self, data):
+        """
+        Convert raw sample bytes to mono float32 in [-1, 1]
+        """
+        if self.audio_format == WAVE_FORMAT_IEEE_FLOAT:
+            samples = np.frombuffer(data, dtype='<f4')
+        elif self.bits_per_sample == 8:
+            samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+        elif self.bits_per_sample == 16:
+            samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+        else:
+            samples = np.frombuffer(data, dtype='<i4').astype(np.float32) / 2147483648.0
+        
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        
+        return samples.astype(np.float32, copy=False)
+
+class StreamResampler:
+    def __init__(self, orig_sr, target_sr):
+        """
+        Resample audio that arrives in blocks. soxr carries the filter state
+        from one block to the next, so the output is the same as resampling
+        the whole signal at once, without discontinuities at block edges.
+        """
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+        self._stream = soxr.ResampleStream(orig_sr, target_sr, 1, dtype='float32', quality='HQ')
+    
+    def resample(self, samples, last=False):
+        """
+        Resample the next block; last=True flushes the samples still held
+        back by the filter
+        """
+        return self._stream.resample_chunk(np.asarray(samples, dtype=np.float32), last=last)
+
+def summarize_frames(frames, window, mel_basis, sample_rate, n_mfcc):
+    """
+    Compute per-frame features for a block of time-domain frames
+    (frame_length x n_frames), matching AudioAnalysisContext frame by frame
+    """
+    magnitude = np.abs(np.fft.rfft(frames * window[:, np.newaxis], axis=0))
+    power = magnitude ** 2
+    log_mel = librosa.power_to_db(mel_basis.dot(power), top_db=None)
+    
+    return {
+        'log_mel': log_mel,
+        'mfcc': librosa.feature.mfcc(S=log_mel, n_mfcc=n_mfcc).astype(np.float32),
+        'rms': librosa.feature.rms(S=magnitude, frame_length=frames.shape[0])[0],
+        'signal_rms': np.sqrt(np.mean(frames ** 2, axis=0)),
+        'spectral_centroid': librosa.feature.spectral_centroid(S=magnitude, sr=sample_rate),
+        'spectral_contrast': librosa.feature.spectral_contrast(S=magnitude, sr=sample_rate),
+        'spectral_rolloff': librosa.feature.spectral_rolloff(S=magnitude, sr=sample_rate)
+    }
+
+def onset_strength(log_mel, previous_log_mel=None):
+    """
+    Per-frame onset strength: mean positive log-mel difference from the
+    previous frame, continuing from the last frame of the previous block
+    """
+    if previous_log_mel is None:
+        previous_log_mel = log_mel[:, :1]
+    differences = np.diff(np.hstack([previous_log_mel, log_mel]), axis=1)
+    return np.maximum(0.0, differences).mean(axis=0)
+
+class IncrementalFeatureExtractor:
+    def __init__(self, sample_rate=22050, n_fft=2048, hop_length=512, n_mfcc=13,
+                 feature_set=None, top_db=25, resample_block_seconds=1.0):
+        """
+        Compute frame-level features while a WAV upload is still arriving.
+        
+        Audio is decoded, resampled and framed chunk by chunk; only small
+        per-frame summaries (MFCC, RMS and spectral descriptors) are kept, so
+        memory stays bounded no matter how long the recording is. finish()
+        produces the same feature entry EmotionDetectionService computes from
+        a file, with the vector built by feature_set (mfcc_matrix by default).
+        Frames are zero-padded rather than reflect-padded at the edges and
+        the log-mel is not clipped to 80 dB below the clip peak, so values
+        differ slightly from librosa's whole-clip output.
+        """
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mfcc = n_mfcc
+        self.feature_set = feature_set or MfccMatrixFeatures(n_mfcc=n_mfcc)
+        self.top_db = top_db
+        self.resample_block_seconds = resample_block_seconds
+        
+        self.decoder = WavStreamDecoder()
+        self.supported = True
+        self.error = None
+        
+        self._window = librosa.filters.get_window('hann', n_fft, fftbins=True)
+        self._mel_basis = librosa.filters.mel(sr=sample_rate, n_fft=n_fft)
+        
+        # Source-rate samples waiting to be resampled, and target-rate samples
+        # waiting to be framed
+        self._pending_source = []
+        self._pending_source_len = 0
+        self._resampler = None
+        # Half a frame of leading silence centers frames like librosa.stft
+        self._samples = np.zeros(n_fft // 2, dtype=np.float32)
+        
+        # Per-frame summaries
+        self._mfcc_frames = []
+        self._rms_frames = []
+        self._signal_rms_frames = []
+        self._centroid_frames = []
+        self._contrast_frames = []
+        self._rolloff_frames = []
+        
+        # Running statistics over the full signal
+        self._onset_sum = 0.0
+        self._previous_log_mel = None
+        self._abs_max = 0.0
+        self._abs_min = None
+    
+    def feed(self, chunk):
+        """
+        Consume a chunk of the uploaded bytes
+        """
+        if not self.supported:
+            return
+        
+        try:
+            samples = self.decoder.feed(chunk)
+            if len(samples):
+                self._pending_source.append(samples)
+                self._pending_source_len += len(samples)
+                
+                block = self.decoder.sample_rate * self.resample_block_seconds
+                if self._pending_source_len >= block:
+                    self._process_source(final=False)
+        except Exception as e:
+            # Stop analyzing incrementally; the caller falls back to the file
+            self.supported = False
+            self.error = str(e)
+            self._release()
+    
+    def finish(self):
+        """
+        Flush remaining audio and return the feature entry, or None if the
+        stream could not be analyzed incrementally
+        """
+        if not self.supported:
+            return None
+        
+        try:
+            self._process_source(final=True)
+            return self._build_entry()
+        except Exception as e:
+            self.supported = False
+            self.error = str(e)
+            return None
+        finally:
+            self._release()
+    
+    def _process_source(self, final):
+        """
+        Resample buffered source audio and turn complete frames into features
+        """
+        # The resampler holds back a few samples until the last block
+        if self._pending_source or (final and self._resampler is not None):
+            source = np.concatenate(self._pending_source) if self._pending_source else np.zeros(0, dtype=np.float32)
+            self._pending_source = []
+            self._pending_source_len = 0
+            
+            if self.decoder.sample_rate != self.sample_rate:
+                if self._resampler is None:
+                    self._resampler = StreamResampler(self.decoder.sample_rate, self.sample_rate)
+                source = self._resampler.resample(source, last=final)
+            
+            if len(source):
+                self._abs_max = max(self._abs_max, float(np.abs(source).max()))
+                current_min = float(np.abs(source).min())
+                self._abs_min = current_min if self._abs_min is None else min(self._abs_min, current_min)
+                self._samples = np.concatenate([self._samples, source.astype(np.float32)])
+        
+        # Zero-pad the tail so the last partial frame is analyzed
+        if final and len(self._samples):
+            self._samples = np.pad(self._samples, (0, self.n_fft // 2))
+            remainder = (len(self._samples) - self.n_fft) % self.hop_length
+            padding = self.n_fft - len(self._samples) if len(self._samples) < self.n_fft else (
+                (self.hop_length - remainder) % self.hop_length
+            )
+            self._samples = np.pad(self._samples, (0, padding))
+        
+        if len(self._samples) < self.n_fft:
+            return
+        
+        frames = librosa.util.frame(self._samples, frame_length=self.n_fft, hop_length=self.hop_length)
+        self._add_frames(frames)
+        
+        # Keep the overlap needed by the next frame
+        consumed = frames.shape[1] * self.hop_length
+        self._samples = self._samples[consumed:]
+    
+    def _add_frames(self, frames):
+        """
+        Summarize a block of time-domain frames
+        """
+        summary = summarize_frames(frames, self._window, self._mel_basis, self.sample_rate, self.n_mfcc)
+        
+        self._mfcc_frames.append(summary['mfcc'])
+        self._rms_frames.append(summary['rms'])
+        self._signal_rms_frames.append(summary['signal_rms'])
+        self._centroid_frames.append(summary['spectral_centroid'])
+        self._contrast_frames.append(summary['spectral_contrast'])
+        self._rolloff_frames.append(summary['spectral_rolloff'])
+        
+        # Onset strength: mean positive log-mel difference between frames
+        self._onset_sum += float(onset_strength(summary['log_mel'], self._previous_log_mel).sum())
+        self._previous_log_mel = summary['log_mel'][:, -1:]
+    
+    def _build_entry(self):
+        """
+        Turn the per-frame summaries into a feature entry
+        """
+        if not self._rms_frames:
+            raise ValueError('No audio samples were received')
+        
+        rms = np.concatenate(self._rms_frames)
+        mfccs = np.hstack(self._mfcc_frames)
+        
+        # Trim leading and trailing silence like librosa.effects.trim, keeping
+        # the same frames AudioAnalysisContext slices from its STFT
+        signal_rms = np.concatenate(self._signal_rms_frames)
+        rms_db = librosa.amplitude_to_db(signal_rms, ref=np.max, top_db=None)
+        non_silent = np.flatnonzero(rms_db > -self.top_db)
+        if len(non_silent):
+            start, end = non_silent[0], non_silent[-1] + 2
+            trimmed_frames = non_silent[-1] + 1 - non_silent[0]
+        else:
+            start, end = 0, 0
+            trimmed_frames = 0
+        
+        frames = {
+            'mfcc': mfccs[:, start:end],
+            'spectral_centroid': np.hstack(self._centroid_frames)[:, start:end],
+            'spectral_contrast': np.hstack(self._contrast_frames)[:, start:end],
+            'spectral_rolloff': np.hstack(self._rolloff_frames)[:, start:end]
+        }
+        
+        def trimmed_mean(values):
+            return float(normalize_rows(values).mean()) if values.size else 0.0
+        
+        return {
+            'features': self.feature_set.vector(frames),
+            'duration': trimmed_frames * self.hop_length / float(self.sample_rate),
+            'spectral_centroid': trimmed_mean(frames['spectral_centroid']),
+            'spectral_contrast': trimmed_mean(frames['spectral_contrast']),
+            'spectral_rolloff': trimmed_mean(frames['spectral_rolloff']),
+            'rms': float(rms.mean()),
+            'onset_mean': self._onset_sum / len(rms),
+            'dynamic_range': self._abs_max - (self._abs_min or 0.0)
+        }
+    
+    def _release(self):
+        """
+        Drop buffered audio
+        """
+        self._pending_source = []
+        self._pending_source_len = 0
+        self._resampler = None
+        self._samples = np.zeros(0, dtype=np.float32)
+
+# Raw sample encodings accepted by PcmStreamDecoder
+PCM_ENCODINGS = {
+    'pcm_s16le': (WAVE_FORMAT_PCM, 16),
+    'pcm_s32le': (WAVE_FORMAT_PCM, 32),
+    'pcm_f32le': (WAVE_FORMAT_IEEE_FLOAT, 32)
+}
+
+class PcmStreamDecoder(WavStreamDecoder):
+    def __init__(self, sample_rate, channels=1, encoding='pcm_s16le'):
+        """
+        Decode headerless little-endian PCM frames into mono float32 samples
+        """
+        super().__init__()
+        if encoding not in PCM_ENCODINGS:
+            raise UnsupportedStreamFormat(f'Unsupported PCM encoding {encoding}')
+        
+        self.audio_format, self.bits_per_sample = PCM_ENCODINGS[encoding]
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._check_format()
+        self._in_data = True
+
+class OnlineNormalizer:
+    def __init__(self, n_features):
+        """
+        Running per-feature mean and variance, updated a block of frames at a
+        time (Welford's algorithm with the Chan et al. batch merge). Replaces
+        per-clip normalization when the clip never ends.
+        """
+        self.count = 0
+        self.mean = np.zeros((n_features, 1))
+        self._m2 = np.zeros((n_features, 1))
+    
+    def update(self, values):
+        """
+        Add a (n_features x n_frames) block to the running statistics
+        """
+        n = values.shape[1]
+        if n == 0:
+            return
+        
+        batch_mean = values.mean(axis=1, keepdims=True)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=1, keepdims=True)
+        
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self._m2 = self._m2 + batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+    
+    @property
+    def std(self):
+        if not self.count:
+            return np.ones_like(self._m2)
+        return np.sqrt(self._m2 / self.count)
+    
+    def normalize(self, values):
+        """
+        Normalize features to zero mean and unit variance using the running statistics
+        """
+        return (values - self.mean) / (self.std + 1e-10)  # Avoid division by zero
+
+class SlidingWindowFeatureExtractor:
+    def __init__(self, decoder, sample_rate=22050, n_fft=2048, hop_length=512, n_mfcc=13,
+                 window_frames=174, top_db=25, resample_block_seconds=0.1, feature_set=None):
+        """
+        Keep model features for the most recent window_frames of a live stream.
+        
+        Decoded audio is framed as it arrives and each frame is reduced to the
+        per-frame features the model uses. Only the last window_frames voiced
+        frames are kept, so memory is fixed for the life of the stream.
+        Frames quieter than top_db below the loudest frame so far are skipped,
+        the live counterpart of trimming silence from a clip, and features are
+        normalized with running statistics over the whole stream. feature_set
+        (mfcc_matrix by default) builds the model vector from the window.
+        """
+        self.decoder = decoder
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mfcc = n_mfcc
+        self.window_frames = window_frames
+        self.top_db = top_db
+        self.resample_block_seconds = resample_block_seconds
+        self.feature_set = feature_set or MfccMatrixFeatures(n_mfcc=n_mfcc, max_pad_len=window_frames)
+        
+        self.frames_seen = 0
+        self.error = None
+        
+        self._window = librosa.filters.get_window('hann', n_fft, fftbins=True)
+        self._mel_basis = librosa.filters.mel(sr=sample_rate, n_fft=n_fft)
+        
+        self._pending_source = []
+        self._pending_source_len = 0
+        self._resampler = None
+        self._samples = np.zeros(0, dtype=np.float32)
+        self._previous_log_mel = None
+        self._peak_rms = 0.0
+        
+        # Per-frame features of the most recent voiced frames
+        self._mfcc = deque(maxlen=window_frames)
+        self._centroid = deque(maxlen=window_frames)
+        self._contrast = deque(maxlen=window_frames)
+        self._rolloff = deque(maxlen=window_frames)
+        self._rms = deque(maxlen=window_frames)
+        self._onset = deque(maxlen=window_frames)
+        self._peak = deque(maxlen=window_frames)
+        self._trough = deque(maxlen=window_frames)
+        
+        self._mfcc_stats = OnlineNormalizer(n_mfcc)
+        self._centroid_stats = OnlineNormalizer(1)
+        self._contrast_stats = OnlineNormalizer(7)
+        self._rolloff_stats = OnlineNormalizer(1)
+    
+    @property
+    def stream_seconds(self):
+        """Seconds of audio received so far"""
+        return self.frames_seen * self.hop_length / float(self.sample_rate)
+    
+    @property
+    def window_size(self):
+        """Number of voiced frames currently in the window"""
+        return len(self._mfcc)
+    
+    def feed(self, chunk):
+        """
+        Consume a chunk of encoded audio, returning the number of new frames
+        """
+        samples = self.decoder.feed(chunk)
+        if not len(samples):
+            return 0
+        
+        self._pending_source.append(samples)
+        self._pending_source_len += len(samples)
+        if self._pending_source_len < self.decoder.sample_rate * self.resample_block_seconds:
+            return 0
+        
+        source = np.concatenate(self._pending_source)
+        self._pending_source = []
+        self._pending_source_len = 0
+        
+        if self.decoder.sample_rate != self.sample_rate:
+            if self._resampler is None:
+                self._resampler = StreamResampler(self.decoder.sample_rate, self.sample_rate)
+            source = self._resampler.resample(source)
+        self._samples = np.concatenate([self._samples, source.astype(np.float32)])
+        
+        if len(self._samples) < self.n_fft:
+            return 0
+        
+        frames = librosa.util.frame(self._samples, frame_length=self.n_fft, hop_length=self.hop_length)
+        self._add_frames(frames)
+        
+        # Keep the overlap needed by the next frame
+        self._samples = self._samples[frames.shape[1] * self.hop_length:]
+        self.frames_seen += frames.shape[1]
+        return frames.shape[1]
+    
+    def _add_frames(self, frames):
+        """
+        Add the voiced frames of a block to the window and running statistics
+        """
+        summary = summarize_frames(frames, self._window, self._mel_basis, self.sample_rate, self.n_mfcc)
+        onsets = onset_strength(summary['log_mel'], self._previous_log_mel)
+        self._previous_log_mel = summary['log_mel'][:, -1:]
+        
+        signal_rms = summary['signal_rms']
+        self._peak_rms = max(self._peak_rms, float(signal_rms.max()))
+        rms_db = librosa.amplitude_to_db(signal_rms, ref=self._peak_rms or 1.0, top_db=None)
+        voiced = rms_db > -self.top_db
+        if not voiced.any():
+            return
+        
+        mfcc = summary['mfcc'][:, voiced]
+        centroid = summary['spectral_centroid'][:, voiced]
+        contrast = summary['spectral_contrast'][:, voiced]
+        rolloff = summary['spectral_rolloff'][:, voiced]
+        
+        self._mfcc_stats.update(mfcc)
+        self._centroid_stats.update(centroid)
+        self._contrast_stats.update(contrast)
+        self._rolloff_stats.update(rolloff)
+        
+        self._mfcc.extend(mfcc.T)
+        self._centroid.extend(centroid.T)
+        self._contrast.extend(contrast.T)
+        self._rolloff.extend(rolloff.T)
+        self._rms.extend(summary['rms'][voiced])
+        self._onset.extend(onsets[voiced])
+        
+        magnitude = np.abs(frames[:, voiced])
+        self._peak.extend(magnitude.max(axis=0))
+        self._trough.extend(magnitude.min(axis=0))
+    
+    def snapshot(self, min_frames=1):
+        """
+        Build a feature entry for the current window, or None if fewer than
+        min_frames voiced frames have been seen
+        """
+        if len(self._mfcc) < max(min_frames, 1):
+            return None
+        
+        mfccs = np.array(self._mfcc).T
+        frames = {
+            'mfcc': mfccs,
+            'mfcc_normalized': self._mfcc_stats.normalize(mfccs),
+            'spectral_centroid': np.array(self._centroid).T,
+            'spectral_contrast': np.array(self._contrast).T,
+            'spectral_rolloff': np.array(self._rolloff).T
+        }
+        
+        def window_mean(frames, stats):
+            return float(stats.normalize(frames).mean())
+        
+        return {
+            'features': self.feature_set.vector(frames).astype(np.float32),
+            'duration': len(self._mfcc) * self.hop_length / float(self.sample_rate),
+            'spectral_centroid': window_mean(frames['spectral_centroid'], self._centroid_stats),
+            'spectral_contrast': window_mean(frames['spectral_contrast'], self._contrast_stats),
+            'spectral_rolloff': window_mean(frames['spectral_rolloff'], self._rolloff_stats),
+            'rms': float(np.mean(self._rms)),
+            'onset_mean': float(np.mean(self._onset)),
+            'dynamic_range': float(max(self._peak) - min(self._trough))
+        }
@@ -0,0 +1,66 @@
+import os
+import time
+import threading
+
+import pytest
+
+from services import analysis_worker_pool
+from services.analysis_worker_pool import AnalysisWorkerPool, AnalysisJobTimeout
+
+def _init_worker(started_jobs, *args):
+    analysis_worker_pool._worker_started_jobs = started_jobs
+
+def _analyze_in_worker(job_id, audio_path):
+    analysis_worker_pool._worker_started_jobs.put((job_id, os.getpid()))
+    if audio_path == 'stuck':
+        time.sleep(60)
+    elif audio_path == 'slow':
+        time.sleep(1.5)
+    return {'path': audio_path, 'pid': os.getpid()}
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Forked workers see the patched module functions
+    monkeypatch.setattr(analysis_worker_pool, '_init_worker', _init_worker)
+    monkeypatch.setattr(analysis_worker_pool, '_analyze_in_worker', _analyze_in_worker)
+    pool = AnalysisWorkerPool(processes=2, max_queue_depth=0, job_timeout=3, retry_after=3, start_method='fork')
+    yield pool
+    pool.close()
+
+def test_timeout_stops_only_the_stuck_worker(pool):
+    results = {}
+    
+    def analyze(path):
+        try:
+            results[path] = pool.analyze(path)
+        except AnalysisJobTimeout as e:
+            results[path] = e
+    
+    threads = [threading.Thread(target=analyze, args=(path,)) for path in ('stuck', 'slow')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert isinstance(results['stuck'], AnalysisJobTimeout)
+    assert results['stuck'].retry_after == 3
+    assert results['slow']['path'] == 'slow'
+    
+    # Both slots are free again and the killed worker has been replaced
+    first = pool.submit('a')
+    second = pool.submit('b')
+    assert first.get(timeout=10)['path'] == 'a'
+    assert second.get(timeout=10)['path'] == 'b'
+
+def test_timed_out_job_gives_back_its_worker_and_slot(monkeypatch):
+    monkeypatch.setattr(analysis_worker_pool, '_init_worker', _init_worker)
+    monkeypatch.setattr(analysis_worker_pool, '_analyze_in_worker', _analyze_in_worker)
+    pool = AnalysisWorkerPool(processes=1, max_queue_depth=0, job_timeout=1, start_method='fork')
+    try:
+        with pytest.raises(AnalysisJobTimeout):
+            pool.analyze('stuck')
+        
+        pool.job_timeout = 10
+        assert pool.analyze('ok')['path'] == 'ok'
+    finally:
+        pool.close()
@@ -0,0 +1,58 @@
+import os
+import datetime
+
+import pytest
+
+from services.database_service import DatabaseService, resolve_date_range, utc_timestamp
+from services.report_service import ReportService
+
+@pytest.fixture
+def db_service(tmp_path):
+    service = DatabaseService(os.path.join(str(tmp_path), 'emovoice.db'))
+    service.init_database()
+    service.save_user({'id': 'u1', 'name': 'Test'})
+    yield service
+    service.close()
+
+def _save(db_service, recording_id, created_at=None):
+    db_service.save_recording({'id': recording_id, 'user_id': 'u1', 'filename': f'{recording_id}.wav',
+                               'created_at': created_at})
+    db_service.save_emotion({'id': f'e-{recording_id}', 'recording_id': recording_id,
+                             'primary_emotion': 'Joy', 'primary_confidence': 0.8, 'intensity': 0.5})
+
+def test_named_ranges_include_today():
+    today = datetime.date(2024, 3, 10)
+    assert resolve_date_range('week', today=today) == ('2024-03-03', '2024-03-11')
+    assert resolve_date_range(('2024-03-01', None), today=today) == ('2024-03-01', '2024-03-11')
+
+def test_invalid_ranges_are_rejected():
+    with pytest.raises(ValueError):
+        resolve_date_range(('2024-03-10', '2024-03-01'))
+    with pytest.raises(ValueError):
+        resolve_date_range(('March', None))
+
+def test_recording_saved_now_is_in_todays_range(db_service):
+    _save(db_service, 'r1', utc_timestamp())
+    today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+    
+    assert [row['day'] for row in db_service.get_emotion_rollup('u1', 'week')] == [today]
+    assert [row.recording_id for row in db_service.iter_emotion_timeline('u1', 'week')] == ['r1']
+
+def test_created_at_is_stored_as_given(db_service):
+    _save(db_service, 'r1', '2024-03-10 23:30:00')
+    _save(db_service, 'r2')
+    
+    rollup = db_service.get_emotion_rollup('u1', ('2024-03-10', '2024-03-11'))
+    assert [(row['day'], row['count']) for row in rollup] == [('2024-03-10', 1)]
+    assert db_service.get_recording_by_id('r2')['created_at'][:10] == datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+def test_report_timestamps_are_utc(db_service):
+    report_service = ReportService(db_service)
+    db_service.save_report({'id': 'rep1', 'user_id': 'u1', 'time_range': 'week', 'created_at': utc_timestamp()})
+    share = report_service.share_report('rep1', 'friend@example.com', expiration_days=7)
+    
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    expires_at = datetime.datetime.strptime(share['expires_at'], '%Y-%m-%d %H:%M:%S')
+    created_at = datetime.datetime.strptime(db_service.get_report_by_id('rep1')['created_at'], '%Y-%m-%d %H:%M:%S')
+    assert abs(expires_at - now - datetime.timedelta(days=7)) < datetime.timedelta(minutes=1)
+    assert abs(created_at - now) < datetime.timedelta(minutes=1)
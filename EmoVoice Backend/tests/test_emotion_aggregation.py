@@ -0,0 +1,40 @@
+from services import emotion_aggregation
+from services.insight_service import DAY_PERIODS
+
+ROLLUP = [
+    {'day': '2024-01-01', 'emotion': 'Joy', 'count': 2, 'intensity_sum': 1.0, 'confidence_sum': 1.6},
+    {'day': '2024-01-01', 'emotion': 'Calm', 'count': 3, 'intensity_sum': 0.9, 'confidence_sum': 2.1},
+    {'day': '2024-01-02', 'emotion': 'Joy', 'count': 1, 'intensity_sum': 0.2, 'confidence_sum': 0.5},
+    {'day': '2024-01-02', 'emotion': 'Fear', 'count': 1, 'intensity_sum': 0.7, 'confidence_sum': 0.4}
+]
+
+def test_summarize_rollup():
+    counts, avg_intensities, avg_confidences = emotion_aggregation.summarize_rollup(ROLLUP)
+    
+    # Joy and Calm tie on 3; Joy was seen first
+    assert list(counts.items()) == [('Joy', 3), ('Calm', 3), ('Fear', 1)]
+    assert avg_intensities['Joy'] == 1.2 / 3
+    assert avg_confidences['Fear'] == 0.4
+
+def test_summarize_empty_rollup():
+    assert emotion_aggregation.summarize_rollup([]) == ({}, {}, {})
+
+def test_sequence_functions():
+    emotions = ['Joy', 'Joy', 'Calm', 'Calm', 'Calm', 'Joy', 'Fear', 'Joy']
+    
+    assert emotion_aggregation.longest_streak(emotions) == ('Calm', 3)
+    assert emotion_aggregation.longest_streak([]) == (None, 0)
+    assert emotion_aggregation.find_return_pattern(emotions) == ('Joy', 'Fear')
+    assert emotion_aggregation.find_return_pattern(['Joy', 'Joy', 'Calm']) is None
+
+def test_dominant_by_period():
+    timestamps = ['2024-01-01 06:00:00', '2024-01-01T07:30:00.5', '2024-01-01 08:00:00',
+                  '2024-01-01 13:00:00', '2024-01-01 23:10:00', '2024-01-02 03:00:00']
+    emotions = ['Calm', 'Joy', 'Joy', 'Anger', 'Fear', 'Sadness']
+    
+    assert emotion_aggregation.hours_of_day(timestamps).tolist() == [6, 7, 8, 13, 23, 3]
+    assert emotion_aggregation.dominant_by_period(timestamps, emotions, DAY_PERIODS) == {
+        'morning': 'Joy',
+        'afternoon': 'Anger',
+        'night': 'Fear'
+    }
@@ -0,0 +1,41 @@
+import os
+import time
+
+import numpy as np
+
+from services.feature_cache import FeatureCache
+
+def _entry(value):
+    return {'features': np.full(25000, value, dtype=np.float32), 'duration': 1.0}
+
+def _disk_bytes(cache_dir):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(cache_dir)
+        for name in files
+    )
+
+def test_disk_layer_stays_under_limit(tmp_path):
+    cache = FeatureCache(str(tmp_path), max_memory_bytes=0, max_disk_bytes=500 * 1000)
+    keys = [cache.make_key(b'audio %d' % i, {}) for i in range(10)]
+    for i, key in enumerate(keys):
+        cache.put(key, _entry(i))
+    
+    assert _disk_bytes(str(tmp_path)) <= cache.max_disk_bytes
+    assert cache.get(keys[-1])['duration'] == 1.0
+    assert cache.get(keys[0]) is None
+
+def test_recently_read_entries_are_kept(tmp_path):
+    cache = FeatureCache(str(tmp_path), max_memory_bytes=0, max_disk_bytes=350 * 1000)
+    keys = [cache.make_key(b'audio %d' % i, {}) for i in range(4)]
+    for i, key in enumerate(keys[:3]):
+        cache.put(key, _entry(i))
+        time.sleep(0.01)
+    
+    # Reading the oldest entry makes the second one the eviction candidate
+    cache.get(keys[0])
+    time.sleep(0.01)
+    cache.put(keys[3], _entry(3))
+    
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
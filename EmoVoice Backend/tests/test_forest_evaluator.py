@@ -0,0 +1,45 @@
+import copy
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from services.forest_evaluator import FlatForest
+
+@pytest.fixture(scope='module')
+def forest():
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(300, 40))
+    y = rng.integers(0, 7, 300)
+    return RandomForestClassifier(n_estimators=20, random_state=42).fit(X, y)
+
+@pytest.fixture(scope='module')
+def rows(forest):
+    return np.random.default_rng(0).normal(size=(256, forest.n_features_in_))
+
+@pytest.mark.parametrize('n', [1, 8, 64, 256])
+def test_matches_sklearn(forest, rows, n):
+    flat = FlatForest.from_sklearn(forest)
+    
+    assert np.allclose(flat.predict_proba(rows[:n]), forest.predict_proba(rows[:n]), rtol=0, atol=1e-12)
+    assert (flat.predict(rows[:n]) == forest.predict(rows[:n])).all()
+
+def test_save_load_round_trip(forest, rows, tmp_path):
+    # A copy, since the fixture is shared by the other tests
+    forest = copy.deepcopy(forest)
+    forest.feature_set_ = 'mfcc_matrix'
+    flat = FlatForest.from_sklearn(forest)
+    path = str(tmp_path / 'forest.npz')
+    flat.save(path)
+    loaded = FlatForest.load(path)
+    
+    assert np.array_equal(loaded.predict_proba(rows), flat.predict_proba(rows))
+    assert (loaded.predict(rows) == forest.predict(rows)).all()
+    assert loaded.metadata == flat.metadata
+    assert loaded.feature_set_ == 'mfcc_matrix'
+
+def test_rejects_wrong_width(forest):
+    flat = FlatForest.from_sklearn(forest)
+    
+    with pytest.raises(ValueError):
+        flat.predict_proba(np.zeros((1, forest.n_features_in_ + 1)))
@@ -0,0 +1,51 @@
+import os
+import datetime
+
+import pytest
+
+from services.database_service import DatabaseService, utc_timestamp
+from services.insight_service import InsightService
+
+@pytest.fixture
+def db_service(tmp_path):
+    service = DatabaseService(os.path.join(str(tmp_path), 'emovoice.db'))
+    service.init_database()
+    service.save_user({'id': 'u1', 'name': 'Test'})
+    yield service
+    service.close()
+
+def _save(db_service, recording_id, emotion, created_at):
+    db_service.save_recording({'id': recording_id, 'user_id': 'u1', 'filename': f'{recording_id}.wav',
+                               'created_at': created_at})
+    db_service.save_emotion({'id': f'e-{recording_id}', 'recording_id': recording_id,
+                             'primary_emotion': emotion, 'primary_confidence': 0.8, 'intensity': 0.5,
+                             'created_at': created_at})
+
+def test_full_and_incremental_insights_match(db_service):
+    service = InsightService(db_service)
+    now = datetime.datetime.now(datetime.timezone.utc).replace(hour=9)
+    emotions = ['Joy', 'Calm', 'Joy', 'Joy', 'Sadness', 'Joy']
+    for i, emotion in enumerate(emotions):
+        created_at = (now - datetime.timedelta(days=len(emotions) - i)).strftime('%Y-%m-%d %H:%M:%S')
+        _save(db_service, f'r{i}', emotion, created_at)
+    
+    full = service.generate_insights('u1')['insights']
+    incremental = service.generate_insights_from_recording('u1', 'r5')['insights']
+    
+    # The full pass reports the first A-B-A sequence and the incremental one
+    # the latest, but shared conclusions read the same
+    def by_title(insights):
+        return {insight['title']: insight['description'] for insight in insights}
+    
+    full_texts, incremental_texts = by_title(full), by_title(incremental)
+    assert 'Your dominant emotion is Joy' in incremental_texts
+    assert 'You tend to feel Joy in the morning' in incremental_texts
+    for title, description in incremental_texts.items():
+        if not title.endswith('leads back to Joy'):
+            assert full_texts[title] == description
+    assert 'Calm often leads back to Joy' in full_texts
+    assert 'Sadness often leads back to Joy' in incremental_texts
+    
+    for insight in full + incremental:
+        assert insight['created_at'] <= utc_timestamp()
+        datetime.datetime.strptime(insight['created_at'], '%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,84 @@
+import os
+import time
+import subprocess
+
+import pytest
+
+from services.analysis_worker_pool import AnalysisPoolSaturated
+from services.database_service import DatabaseService
+from services.job_service import JobService, JobQueueFull
+
+class StubRecordingService:
+    """Stores recordings in the database and fails analysis saturated_times times"""
+    def __init__(self, db_service, saturated_times=0):
+        self.db_service = db_service
+        self.saturated_times = saturated_times
+        self.stored = 0
+    
+    def store_recording(self, user_id, audio_data, filename=None):
+        self.stored += 1
+        recording = {'id': f'r{self.stored}', 'user_id': user_id, 'filename': filename, 'file_path': filename}
+        self.db_service.save_recording(recording)
+        return {'status': 'success', 'recording_id': recording['id'], 'recording': recording}
+    
+    def analyze_recording(self, recording_id, file_path):
+        if self.saturated_times:
+            self.saturated_times -= 1
+            raise AnalysisPoolSaturated(0.05)
+        return {'primary_emotion': 'Joy'}
+
+class NoOp:
+    def __getattr__(self, name):
+        return lambda *args: None
+
+@pytest.fixture
+def db_service(tmp_path):
+    service = DatabaseService(os.path.join(str(tmp_path), 'emovoice.db'))
+    service.init_database()
+    service.save_user({'id': 'u1', 'name': 'Test'})
+    yield service
+    service.close()
+
+def _wait_for(db_service, job_id, status):
+    for _ in range(100):
+        job = db_service.get_job(job_id)
+        if job['status'] == status:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} is {job['status']}, not {status}")
+
+def test_saturated_analysis_is_retried(db_service):
+    recordings = StubRecordingService(db_service, saturated_times=2)
+    jobs = JobService(db_service, recordings, NoOp(), NoOp(), max_workers=1)
+    
+    job = jobs.submit_upload('u1', b'', 'a.wav')['job']
+    
+    assert _wait_for(db_service, job['id'], 'succeeded')['result']['emotion'] == {'primary_emotion': 'Joy'}
+    jobs.shutdown()
+
+def test_full_queue_rejects_uploads_before_storing(db_service):
+    recordings = StubRecordingService(db_service, saturated_times=1000)
+    jobs = JobService(db_service, recordings, NoOp(), NoOp(), max_workers=1, max_pending=2, retry_after=7)
+    jobs.submit_upload('u1', b'', 'a.wav')
+    jobs.submit_upload('u1', b'', 'b.wav')
+    
+    with pytest.raises(JobQueueFull) as error:
+        jobs.submit_upload('u1', b'', 'c.wav')
+    assert error.value.retry_after == 7
+    assert recordings.stored == 2
+    
+    recordings.saturated_times = 0
+    jobs.shutdown()
+
+def test_jobs_of_exited_processes_are_failed(db_service):
+    exited = subprocess.Popen(['true'])
+    exited.wait()
+    for job_id, owner_pid in (('orphan', exited.pid), ('legacy', None), ('live', os.getpid())):
+        db_service.save_job({'id': job_id, 'user_id': 'u1', 'job_type': 'recording_pipeline',
+                             'status': 'running', 'owner_pid': owner_pid})
+    jobs = JobService(db_service, None, None, None)
+    
+    assert jobs.fail_interrupted_jobs() == 2
+    assert db_service.get_job('orphan')['status'] == 'failed'
+    assert db_service.get_job('legacy')['status'] == 'failed'
+    assert db_service.get_job('live')['status'] == 'running'
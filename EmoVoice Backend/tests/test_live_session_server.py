@@ -0,0 +1,56 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from services.live_emotion_service import LiveEmotionService, LiveSessionLimitReached
+from services.live_session_server import start_live_session_server
+from services.streaming_analysis import SlidingWindowFeatureExtractor
+
+class WindowEmotionService:
+    """Emotion service that labels every window Calm"""
+    sample_rate = 22050
+    
+    def create_live_analyzer(self, decoder):
+        return SlidingWindowFeatureExtractor(decoder)
+    
+    def analyze_features(self, entry):
+        return {'primary_emotion': 'Calm', 'confidence': 1.0}
+
+def _tone(seconds):
+    t = np.arange(int(seconds * 22050)) / 22050.0
+    return (np.sin(2 * np.pi * 220 * t) * 16000).astype('<i2').tobytes()
+
+def _push_from_worker(client, session_id, queue):
+    queue.put(client.push_frames(session_id, _tone(1.0)))
+
+@pytest.fixture(scope='module')
+def client():
+    service = LiveEmotionService(WindowEmotionService(), max_sessions=1, update_interval_ms=500)
+    return start_live_session_server(service)
+
+def test_session_reachable_from_other_processes(client):
+    session_id = client.create_session(sample_rate=22050)['session_id']
+    
+    # A forked process stands in for another server worker
+    queue = multiprocessing.get_context('fork').Queue()
+    worker = multiprocessing.get_context('fork').Process(
+        target=_push_from_worker, args=(client, session_id, queue)
+    )
+    worker.start()
+    result = queue.get(timeout=30)
+    worker.join()
+    
+    assert result['update']['primary_emotion'] == 'Calm'
+    assert client.get_session(session_id)['stream_seconds'] == result['stream_seconds']
+    assert client.close_session(session_id)['session_id'] == session_id
+    assert client.get_session(session_id) is None
+
+def test_session_limit_keeps_retry_after(client):
+    session_id = client.create_session(sample_rate=22050)['session_id']
+    try:
+        with pytest.raises(LiveSessionLimitReached) as error:
+            client.create_session(sample_rate=22050)
+        assert error.value.retry_after >= 1
+    finally:
+        client.close_session(session_id)
@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import sqlite3
+
+import pytest
+
+import manage
+from services.database_service import DatabaseService
+from services.migration_runner import MigrationRunner
+
+@pytest.fixture
+def db_path(tmp_path):
+    return os.path.join(str(tmp_path), 'emovoice.db')
+
+@pytest.fixture
+def db_service(db_path):
+    service = DatabaseService(db_path)
+    yield service
+    service.close()
+
+def _create_baseline(db_path, reports):
+    """
+    Create a database the way the server did before versioned migrations:
+    the initial schema without a schema_version table, with existing reports
+    """
+    runner = MigrationRunner(None)
+    conn = sqlite3.connect(db_path)
+    with open(runner.discover()[0][2], 'r') as f:
+        conn.executescript(f.read())
+    
+    conn.execute("INSERT INTO users (id, name) VALUES ('u1', 'Test')")
+    for report_id, data in reports:
+        conn.execute(
+            "INSERT INTO reports (id, user_id, time_range, data) VALUES (?, 'u1', 'week', ?)",
+            (report_id, data)
+        )
+    conn.commit()
+    conn.close()
+
+def _applied_versions(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute('SELECT version FROM schema_version ORDER BY version')]
+    finally:
+        conn.close()
+
+def _tables(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+
+def test_migrates_an_empty_database(db_service, db_path):
+    runner = MigrationRunner(db_service)
+    migrations = runner.discover()
+    
+    applied = runner.migrate()
+    
+    assert applied == [(version, name) for version, name, _ in migrations]
+    assert _applied_versions(db_path) == [version for version, _, _ in migrations]
+    assert runner.is_current()
+    assert {'users', 'recordings', 'emotions', 'reports', 'jobs', 'emotion_daily_rollup'} <= _tables(db_path)
+
+def test_migrates_a_baseline_database_and_backfills_top_emotion(db_service, db_path):
+    _create_baseline(db_path, [
+        ('rep1', json.dumps({'emotion_counts': {'Joy': 2, 'Sadness': 5, 'Anger': 1}})),
+        # Ties go to the first emotion alphabetically
+        ('rep2', json.dumps({'emotion_counts': {'Surprise': 3, 'Calm': 3}})),
+        ('rep3', json.dumps({'emotion_counts': {}})),
+        ('rep4', 'not json')
+    ])
+    
+    applied = db_service.init_database()
+    
+    assert [version for version, _ in applied] == [version for version, _, _ in MigrationRunner(db_service).discover()]
+    top_emotions = {report['id']: report['top_emotion'] for report in db_service.get_reports('u1')}
+    assert top_emotions == {'rep1': 'Sadness', 'rep2': 'Calm', 'rep3': None, 'rep4': None}
+
+def test_dry_run_applies_nothing(db_path, monkeypatch, capsys):
+    _create_baseline(db_path, [('rep1', json.dumps({'emotion_counts': {'Joy': 1}}))])
+    tables = _tables(db_path)
+    
+    monkeypatch.setattr(sys, 'argv', ['manage.py', '--db', db_path, 'migrate', '--dry-run'])
+    manage.main()
+    
+    output = capsys.readouterr().out
+    assert 'Pending migrations:' in output
+    assert '0007_report_summaries' in output
+    assert _tables(db_path) == tables
+    
+    conn = sqlite3.connect(db_path)
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(reports)')]
+    conn.close()
+    assert 'top_emotion' not in columns
+
+def test_second_run_is_a_no_op(db_service, db_path, monkeypatch, capsys):
+    runner = MigrationRunner(db_service)
+    runner.migrate()
+    versions = _applied_versions(db_path)
+    
+    assert runner.migrate() == []
+    assert runner.pending() == []
+    assert db_service.init_database() == []
+    assert _applied_versions(db_path) == versions
+    
+    capsys.readouterr()
+    monkeypatch.setattr(sys, 'argv', ['manage.py', '--db', db_path, 'migrate'])
+    manage.main()
+    assert capsys.readouterr().out.strip() == 'Database is already at the latest schema version'
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from services import feature_extraction
+from services.feature_sets import create_feature_set
+from services.forest_evaluator import FlatForest
+from services.emotion_detection_service import EmotionDetectionService
+
+POOLED_STATS = create_feature_set('pooled_stats')
+
+def _forest(n_features, feature_schema=None, feature_set=None):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, n_features))
+    y = rng.integers(0, len(feature_extraction.EMOTIONS), size=60)
+    forest = RandomForestClassifier(n_estimators=3, max_depth=3, random_state=0).fit(X, y)
+    forest.feature_schema_ = feature_schema
+    forest.feature_set_ = feature_set
+    forest.labels_ = [feature_extraction.EMOTIONS[i] for i in forest.classes_]
+    return forest
+
+def _service_with_model(tmp_path, forest):
+    """
+    An EmotionDetectionService that loads forest, exported as a flat forest
+    """
+    service = EmotionDetectionService()
+    service.model_path = os.path.join(str(tmp_path), 'emotion_model.joblib')
+    service.flat_model_path = os.path.join(str(tmp_path), 'emotion_model.npz')
+    FlatForest.from_sklearn(forest).save(service.flat_model_path)
+    service._model = None
+    service._model_available = True
+    return service
+
+def _mismatched_schema(**changes):
+    return dict(feature_extraction.feature_schema(POOLED_STATS), **changes)
+
+def test_matching_model_loads(tmp_path):
+    service = _service_with_model(tmp_path, _forest(POOLED_STATS.dimension, feature_extraction.feature_schema(POOLED_STATS)))
+    
+    assert service.load_model()
+    assert service.feature_set.tag == POOLED_STATS.tag
+
+@pytest.mark.parametrize('forest, message', [
+    # Width of a feature set other than the one the model says it was trained on
+    (lambda: _forest(POOLED_STATS.dimension + 1, feature_extraction.feature_schema(POOLED_STATS)),
+     f'model expects {POOLED_STATS.dimension + 1} features but {POOLED_STATS.tag} produces {POOLED_STATS.dimension}'),
+    # No recorded schema: the default feature set is assumed and checked by width
+    (lambda: _forest(POOLED_STATS.dimension),
+     f"model expects {POOLED_STATS.dimension} features but {create_feature_set().tag} produces"),
+    (lambda: _forest(POOLED_STATS.dimension, _mismatched_schema(schema_version=feature_extraction.FEATURE_SCHEMA_VERSION + 1)),
+     'model was trained with feature schema version'),
+    (lambda: _forest(POOLED_STATS.dimension, _mismatched_schema(fingerprint='0' * 64)),
+     'feature fingerprint 000000000000 does not match'),
+    (lambda: _forest(POOLED_STATS.dimension, feature_set='spectrogram'),
+     'Unknown feature set: spectrogram')
+])
+def test_mismatched_model_is_rejected_at_load(tmp_path, capsys, forest, message):
+    service = _service_with_model(tmp_path, forest())
+    
+    with pytest.raises(ValueError, match=message):
+        service._model_contract(FlatForest.load(service.flat_model_path))
+    
+    assert not service.load_model()
+    assert service.model is None
+    assert message in capsys.readouterr().out
+    # The fallback detector keeps the default feature set
+    assert service.feature_set.tag == create_feature_set().tag
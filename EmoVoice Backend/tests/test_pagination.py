@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import base64
+import importlib
+
+import pytest
+
+from services.database_service import DatabaseService, encode_page_cursor, decode_page_cursor, utc_timestamp
+
+@pytest.fixture
+def db_service(tmp_path):
+    service = DatabaseService(os.path.join(str(tmp_path), 'emovoice.db'))
+    service.init_database()
+    service.save_user({'id': 'u1', 'name': 'Test'})
+    yield service
+    service.close()
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    # Import the app against a scratch database and without analysis workers
+    overrides = {
+        'EMOVOICE_DB_PATH': str(tmp_path_factory.mktemp('app') / 'emovoice.db'),
+        'EMOVOICE_ANALYSIS_WORKERS': '0'
+    }
+    saved = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    try:
+        module = importlib.import_module('app')
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    
+    assert module.db_path == overrides['EMOVOICE_DB_PATH']
+    yield module
+    sys.modules.pop('app', None)
+
+def _save_recordings(db_service, user_id, created_ats):
+    for i, created_at in enumerate(created_ats):
+        db_service.save_recording({'id': f'r{i:03d}', 'user_id': user_id, 'filename': f'r{i:03d}.wav',
+                                   'created_at': created_at})
+
+def _all_pages(db_service, limit):
+    pages, cursor = [], None
+    while True:
+        recordings, cursor = db_service.page_recordings('u1', limit, cursor)
+        pages.append([recording['id'] for recording in recordings])
+        if cursor is None:
+            return pages
+
+def test_cursor_round_trip():
+    cursor = encode_page_cursor('2024-03-10 12:00:00', 'r1')
+    assert decode_page_cursor(cursor) == ('2024-03-10 12:00:00', 'r1')
+
+def test_pages_break_ties_on_id(db_service):
+    # Four recordings share a timestamp, so a page boundary falls among them
+    _save_recordings(db_service, 'u1', ['2024-03-10 12:00:00'] * 4 + ['2024-03-09 08:00:00', '2024-03-11 09:00:00'])
+    
+    pages = _all_pages(db_service, 2)
+    assert pages == [['r005', 'r003'], ['r002', 'r001'], ['r000', 'r004']]
+    
+    everything, cursor = db_service.page_recordings('u1', 10)
+    assert cursor is None
+    assert [recording['id'] for recording in everything] == [row for page in pages for row in page]
+
+def test_last_full_page_has_no_cursor(db_service):
+    _save_recordings(db_service, 'u1', ['2024-03-10 12:00:00'] * 2)
+    
+    assert _all_pages(db_service, 2) == [['r001', 'r000']]
+
+def test_emotion_pages_continue_after_recording_time(db_service):
+    _save_recordings(db_service, 'u1', [utc_timestamp()] * 3)
+    for i in range(3):
+        db_service.save_emotion({'id': f'e{i}', 'recording_id': f'r{i:03d}', 'primary_emotion': 'Joy',
+                                 'primary_confidence': 0.8, 'intensity': 0.5})
+    
+    first, cursor = db_service.page_emotions('u1', 'week', 2)
+    rest, end = db_service.page_emotions('u1', 'week', 2, cursor)
+    assert [emotion['id'] for emotion in first + rest] == ['e2', 'e1', 'e0']
+    assert end is None
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor',
+    base64.urlsafe_b64encode(b'not json').decode('ascii'),
+    base64.urlsafe_b64encode(json.dumps(['2024-03-10 12:00:00']).encode('utf-8')).decode('ascii'),
+    base64.urlsafe_b64encode(json.dumps(['2024-03-10 12:00:00', 7]).encode('utf-8')).decode('ascii'),
+    encode_page_cursor('2024-03-10 12:00:00', 'r1')[:-4] + 'é'
+])
+def test_invalid_cursors_are_rejected(db_service, cursor):
+    with pytest.raises(ValueError):
+        db_service.page_recordings('u1', 10, cursor)
+
+def test_invalid_cursor_is_a_bad_request(app_module):
+    client = app_module.app.test_client()
+    
+    response = client.get('/api/users/u1/recordings', query_string={'cursor': 'tampered'})
+    assert response.status_code == 400
+    assert response.get_json() == {'status': 'error', 'message': 'Invalid page cursor'}
+    
+    for path in ('/api/users/u1/emotions', '/api/users/u1/reports', '/api/users/u1/insights'):
+        assert client.get(path, query_string={'cursor': 'tampered'}).status_code == 400
+
+def test_page_size_is_clamped(app_module):
+    db_service = app_module.db_service
+    db_service.save_user({'id': 'u2', 'name': 'Test'})
+    _save_recordings(db_service, 'u2', [utc_timestamp()] * (app_module.MAX_PAGE_SIZE + 5))
+    client = app_module.app.test_client()
+    
+    page = client.get('/api/users/u2/recordings', query_string={'limit': 10000}).get_json()
+    assert len(page['recordings']) == app_module.MAX_PAGE_SIZE
+    assert page['next_cursor'] is not None
+    
+    rest = client.get('/api/users/u2/recordings', query_string={'limit': 10000, 'cursor': page['next_cursor']}).get_json()
+    assert len(rest['recordings']) == 5
+    assert rest['next_cursor'] is None
+    
+    page = client.get('/api/users/u2/recordings', query_string={'limit': 0}).get_json()
+    assert len(page['recordings']) == 1
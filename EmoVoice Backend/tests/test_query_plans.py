@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from services.database_service import DatabaseService, HOT_QUERY_PLANS
+
+@pytest.fixture
+def db_service(tmp_path):
+    service = DatabaseService(os.path.join(str(tmp_path), 'emovoice.db'))
+    service.init_database()
+    yield service
+    service.close()
+
+def test_hot_queries_use_their_indexes(db_service):
+    assert db_service.verify_query_plans() == {}
+
+@pytest.mark.parametrize('name, sql, params, indexes', HOT_QUERY_PLANS, ids=[plan[0] for plan in HOT_QUERY_PLANS])
+def test_query_plan(db_service, name, sql, params, indexes):
+    plan = ' '.join(db_service.explain_query_plan(sql, params))
+    for index in indexes:
+        assert index in plan, f'{name} is planned as: {plan}'
+
+def test_insights_cover_read_and_unread(db_service):
+    names = {plan[0] for plan in HOT_QUERY_PLANS}
+    assert {'get_insights', 'get_insights_all', 'page_insights', 'page_insights_unread'} <= names
+
+def test_missing_index_is_reported(db_service):
+    with db_service.get_connection() as conn:
+        conn.execute('DROP INDEX idx_insights_user_read_created_id')
+    
+    failures = db_service.verify_query_plans()
+    assert failures['get_insights'] == ['idx_insights_user_read_created_id']
+    assert 'page_insights_unread' in failures
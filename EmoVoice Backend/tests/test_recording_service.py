@@ -0,0 +1,14 @@
+import os
+
+from services.recording_service import RecordingService
+
+def test_uploaded_filename_cannot_leave_recordings_dir():
+    service = RecordingService(None, None)
+    
+    recording = service._new_recording('u1', '../../app.py')
+    assert recording['filename'] == 'app.py'
+    assert os.path.dirname(recording['file_path']) == service.recordings_dir
+    
+    recording = service._new_recording('u1', '../..')
+    assert recording['filename'].startswith('u1_')
+    assert os.path.dirname(recording['file_path']) == service.recordings_dir
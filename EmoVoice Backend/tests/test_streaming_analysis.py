@@ -0,0 +1,32 @@
+import numpy as np
+
+from services.streaming_analysis import StreamResampler
+
+def test_block_resampling_matches_whole_signal():
+    sample_rate = 44100
+    t = np.arange(3 * sample_rate) / sample_rate
+    signal = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    
+    whole = StreamResampler(sample_rate, 22050).resample(signal, last=True)
+    
+    resampler = StreamResampler(sample_rate, 22050)
+    block = sample_rate // 10
+    blocks = [resampler.resample(signal[i:i + block]) for i in range(0, len(signal), block)]
+    blocks.append(resampler.resample(np.zeros(0, dtype=np.float32), last=True))
+    streamed = np.concatenate(blocks)
+    
+    assert len(streamed) == len(whole) == len(signal) // 2
+    np.testing.assert_allclose(streamed, whole, atol=1e-6)
+
+def test_live_analysis_needs_streamable_feature_set():
+    from services.emotion_detection_service import EmotionDetectionService
+    from services.feature_sets import create_feature_set
+    from services.streaming_analysis import PcmStreamDecoder
+    
+    # Stand-in for a loaded model trained on pooled statistics
+    service = EmotionDetectionService()
+    service._model = object()
+    service._feature_set = create_feature_set('pooled_stats')
+    
+    assert service.create_live_analyzer(PcmStreamDecoder(22050, 1, 'pcm_s16le')) is None
+    assert service.create_incremental_analyzer() is None
@@ -1,83 +1,80 @@
 import os
+import io
+import json
+import time
+import argparse
 import numpy as np
 import pandas as pd
-import librosa
 import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import classification_report
+from sklearn.metrics import classification_report, accuracy_score
 import matplotlib.pyplot as plt
 import glob
 import tqdm
 
+from services import feature_extraction
+from services.forest_evaluator import FlatForest
+from services.feature_sets import FEATURE_SETS, DEFAULT_FEATURE_SET, create_feature_set
+
 # Define paths
 DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'training')
 MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'emotion_model.joblib')
+FLAT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'emotion_model.npz')
+
+COMPARISON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'feature_set_comparison.json')
+
+# Largest difference from scikit-learn's predict_proba accepted when exporting
+FLAT_MODEL_TOLERANCE = 1e-9
+
+# Test rows timed one at a time when measuring classification latency
+LATENCY_SAMPLE_ROWS = 200
+
+# Clips re-extracted through EmotionDetectionService before training
+PARITY_CHECK_FILES = 5
 
 # Ensure directories exist
 os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
 
-# Define emotions to detect
-emotions = ['Anger', 'Disgust', 'Fear', 'Joy', 'Sadness', 'Surprise', 'Calm']
+# Define emotions to detect; a label's class index is its position here
+emotions = feature_extraction.EMOTIONS
 
-def extract_features(file_path, max_pad_len=174):
+def extract_features(file_path, feature_set):
     """
-    Extract MFCC features from audio file
+    Extract a feature set's vector with services.feature_extraction, the
+    same code EmotionDetectionService runs
     """
     try:
-        # Load audio file
-        y, sr = librosa.load(file_path, sr=22050)
-        
-        # Trim silence
-        y, _ = librosa.effects.trim(y, top_db=25)
-        
-        # Extract MFCCs
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        
-        # Extract additional features
-        spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
-        spectral_contrast = librosa.feature.spectral_contrast(y=y, sr=sr)
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)
-        
-        # Normalize features
-        mfccs = normalize_features(mfccs)
-        
-        # Pad or truncate to fixed length
-        pad_width = max_pad_len - mfccs.shape[1]
-        if pad_width > 0:
-            mfccs = np.pad(mfccs, pad_width=((0, 0), (0, pad_width)), mode='constant')
-        else:
-            mfccs = mfccs[:, :max_pad_len]
-        
-        # Flatten the MFCCs
-        mfccs_flattened = mfccs.flatten()
-        
-        # Add additional features
-        additional_features = np.array([
-            spectral_centroid.mean(),
-            spectral_contrast.mean(),
-            spectral_rolloff.mean()
-        ])
-        
-        # Combine all features
-        combined_features = np.concatenate((mfccs_flattened, additional_features))
-        
-        return combined_features
+        context = feature_extraction.analysis_context(file_path)
+        features, _, _ = feature_extraction.extract_features(context, feature_set)
+        return features
     
     except Exception as e:
         print(f"Error extracting features from {file_path}: {e}")
         return None
 
-def normalize_features(features):
+def check_serving_parity(data_path, feature_set):
     """
-    Normalize features to zero mean and unit variance
+    Check that EmotionDetectionService extracts the same vectors as training
+    for a few clips, read as uploaded bytes
     """
-    mean = features.mean(axis=1, keepdims=True)
-    std = features.std(axis=1, keepdims=True) + 1e-10  # Avoid division by zero
-    return (features - mean) / std
+    from services.emotion_detection_service import EmotionDetectionService
+    service = EmotionDetectionService()
+    
+    files = sorted(glob.glob(os.path.join(data_path, '*', '*.wav')))[:PARITY_CHECK_FILES]
+    for file_path in files:
+        expected = extract_features(file_path, feature_set)
+        with open(file_path, 'rb') as f:
+            served, _, _ = service.extract_features(f.read(), feature_set)
+        
+        if expected is None or served is None:
+            continue
+        if served.shape[1] != len(expected) or not np.allclose(served[0], expected):
+            raise ValueError(f"Serving features differ from training features for {file_path}")
+    
+    print(f"Serving features match training features on {len(files)} clips")
 
-def load_data(data_path):
+def load_data(data_path, feature_set):
     """
     Load audio data and extract features
     """
@@ -105,45 +102,30 @@ def load_data(data_path):
         
         # Process each file
         for file_path in tqdm.tqdm(files):
-            extracted_features = extract_features(file_path)
+            extracted_features = extract_features(file_path, feature_set)
             
             if extracted_features is not None:
                 features.append(extracted_features)
-                labels.append(emotion)
+                labels.append(emotions.index(emotion))
     
     # Convert to numpy arrays
     features = np.array(features)
+    labels = np.array(labels)
     
-    # Encode labels
-    label_encoder = LabelEncoder()
-    labels = label_encoder.fit_transform(labels)
-    
-    # Save label encoder mapping
-    label_mapping = dict(zip(label_encoder.classes_, label_encoder.transform(label_encoder.classes_)))
-    print("Label mapping:", label_mapping)
+    # Labels are indices into emotions, the class order the service assumes
+    print("Label mapping:", {emotion: i for i, emotion in enumerate(emotions)})
     
     return features, labels
 
-def train_model():
+def fit_model(features, labels):
     """
-    Train a Random Forest model for emotion classification
+    Train a Random Forest on a fixed 80/20 split; returns the model and the test set
     """
-    print("Loading data...")
-    features, labels = load_data(DATA_PATH)
-    
-    if features is None or labels is None:
-        print("Failed to load data. Exiting.")
-        return
-    
-    print(f"Data loaded: {features.shape[0]} samples")
-    
     # Split data into training and testing sets
     X_train, X_test, y_train, y_test = train_test_split(
         features, labels, test_size=0.2, random_state=42
     )
     
-    print("Training Random Forest model...")
-    
     # Create and train the model
     model = RandomForestClassifier(
         n_estimators=100,
@@ -155,15 +137,69 @@ def train_model():
     
     model.fit(X_train, y_train)
     
+    return model, X_test, y_test
+
+def evaluate_model(model, X_test, y_test):
+    """
+    Accuracy, single-clip classification latency and artifact sizes of a model
+    """
+    flat_model = FlatForest.from_sklearn(model)
+    
+    # Median latency of classifying one clip with the flat forest, as the service does
+    timings = []
+    for row in X_test[:LATENCY_SAMPLE_ROWS]:
+        start = time.perf_counter()
+        flat_model.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+    
+    joblib_buffer = io.BytesIO()
+    joblib.dump(model, joblib_buffer)
+    flat_buffer = io.BytesIO()
+    flat_model.save(flat_buffer)
+    
+    return {
+        'accuracy': float(accuracy_score(y_test, model.predict(X_test))),
+        'features': int(X_test.shape[1]),
+        'nodes': int(len(flat_model.feature)),
+        'joblib_bytes': len(joblib_buffer.getvalue()),
+        'flat_bytes': len(flat_buffer.getvalue()),
+        'predict_ms': float(np.median(timings) * 1000) if timings else None
+    }
+
+def train_model(feature_set_name=DEFAULT_FEATURE_SET):
+    """
+    Train a Random Forest model for emotion classification
+    """
+    feature_set = create_feature_set(feature_set_name)
+    check_serving_parity(DATA_PATH, feature_set)
+    
+    print(f"Loading data ({feature_set_name} features)...")
+    features, labels = load_data(DATA_PATH, feature_set)
+    
+    if features is None or labels is None:
+        print("Failed to load data. Exiting.")
+        return
+    
+    print(f"Data loaded: {features.shape[0]} samples")
+    
+    print("Training Random Forest model...")
+    model, X_test, y_test = fit_model(features, labels)
+    
+    # Record the feature contract and class labels; the service validates them on load
+    model.feature_schema_ = feature_extraction.feature_schema(feature_set)
+    model.labels_ = [emotions[i] for i in model.classes_]
+    
     # Evaluate the model
     y_pred = model.predict(X_test)
     print("\nModel evaluation:")
-    print(classification_report(y_test, y_pred, target_names=emotions))
+    print(classification_report(y_test, y_pred, labels=model.classes_, target_names=model.labels_))
     
     # Save the model
     joblib.dump(model, MODEL_PATH)
     print(f"Model saved to {MODEL_PATH}")
     
+    export_flat_model(model, X_test)
+    
     # Feature importance
     feature_importance = model.feature_importances_
     
@@ -180,5 +216,86 @@ def train_model():
     plt.savefig(plot_path)
     print(f"Feature importance plot saved to {plot_path}")
 
+def compare_feature_sets():
+    """
+    Train one model per feature set on the same split and report accuracy,
+    extraction and classification latency, and model size. Nothing is saved
+    to MODEL_PATH; the report is written to COMPARISON_PATH.
+    """
+    report = {}
+    for name in sorted(FEATURE_SETS):
+        feature_set = create_feature_set(name)
+        
+        print(f"Loading data ({name} features)...")
+        start = time.perf_counter()
+        features, labels = load_data(DATA_PATH, feature_set)
+        if features is None or len(features) == 0:
+            print("Failed to load data. Exiting.")
+            return
+        extract_ms = (time.perf_counter() - start) * 1000 / len(features)
+        
+        start = time.perf_counter()
+        model, X_test, y_test = fit_model(features, labels)
+        fit_seconds = time.perf_counter() - start
+        
+        report[name] = dict(
+            evaluate_model(model, X_test, y_test),
+            extract_ms=extract_ms,
+            fit_seconds=fit_seconds
+        )
+    
+    print(f"\n{'feature set':<14} {'features':>8} {'accuracy':>9} {'extract ms':>11} "
+          f"{'predict ms':>11} {'joblib MB':>10} {'flat MB':>8}")
+    for name, row in report.items():
+        print(f"{name:<14} {row['features']:>8} {row['accuracy']:>9.3f} {row['extract_ms']:>11.1f} "
+              f"{row['predict_ms']:>11.3f} {row['joblib_bytes'] / 1e6:>10.2f} {row['flat_bytes'] / 1e6:>8.2f}")
+    
+    with open(COMPARISON_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Comparison saved to {COMPARISON_PATH}")
+
+def export_flat_model(model, X_check=None):
+    """
+    Flatten the forest into the arrays EmotionDetectionService evaluates,
+    after checking that it gives the same probabilities as scikit-learn
+    """
+    flat_model = FlatForest.from_sklearn(model)
+    
+    # Without held-out data, check on random rows shaped like normalized features
+    if X_check is None or len(X_check) == 0:
+        X_check = np.random.default_rng(42).normal(size=(256, model.n_features_in_))
+    
+    difference = np.abs(flat_model.predict_proba(X_check) - model.predict_proba(X_check)).max()
+    if difference > FLAT_MODEL_TOLERANCE:
+        raise ValueError(f"Flat forest differs from scikit-learn by {difference:.3g}; not exported")
+    
+    flat_model.save(FLAT_MODEL_PATH)
+    print(f"Flat model saved to {FLAT_MODEL_PATH} "
+          f"({len(flat_model.feature)} nodes, max difference from scikit-learn {difference:.3g})")
+
+def export_existing_model():
+    """
+    Export the saved joblib model without retraining
+    """
+    if not os.path.exists(MODEL_PATH):
+        print(f"Model {MODEL_PATH} does not exist. Train it first.")
+        return
+    
+    export_flat_model(joblib.load(MODEL_PATH))
+
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Train the EmoVoice emotion model')
+    parser.add_argument('--feature-set', default=DEFAULT_FEATURE_SET, choices=sorted(FEATURE_SETS),
+                        help='Features to train on (default: %(default)s)')
+    parser.add_argument('--compare', action='store_true',
+                        help='Compare accuracy, latency and size of every feature set without saving a model')
+    parser.add_argument('--export-only', action='store_true',
+                        help='Export the saved model as flat arrays without retraining')
+    args = parser.parse_args()
+    
+    if args.export_only:
+        export_existing_model()
+    elif args.compare:
+        compare_feature_sets()
+    else:
+        train_model(args.feature_set)
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""
+Production entry point for pre-forking servers: gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app the master imports this module once. It loads the model and
+warms librosa, then freezes the garbage collector, so the workers forked
+afterwards share those pages copy-on-write instead of each holding a copy.
+"""
+import gc
+
+# No collections while loading, so freed objects do not leave holes in
+# pages the workers will share
+gc.disable()
+
+import app as app_module
+from app import app, db_service, emotion_service, startup_timer
+from services.live_session_server import start_live_session_server
+
+emotion_service.warm_up()
+startup_timer.phase('warm_up')
+print(startup_timer.summary())
+
+# Close the connections opened by init_database; a worker inheriting them
+# would close the master's SQLite handles when its atexit hook runs
+db_service.close()
+
+# Move everything loaded so far to the permanent generation; collections in
+# the workers then never write to the inherited objects' headers
+gc.freeze()
+gc.enable()
+
+# Live sessions are kept in one process that every worker calls, so a
+# session's requests may reach any worker
+app_module.live_emotion_service = start_live_session_server(app_module.live_emotion_service)